@@ -1,6 +1,9 @@
 from flask import Flask, jsonify
 from flask_migrate import Migrate
 
+from app import analytics, answer_log, catalog, db_routing, export, http_cache, live_stats, metrics, progress, query_audit, shared_counters, snapshots, timeseries, variants
+from app.commands import register_commands
+from app.serialization import FastJSONProvider
 from app.routes import register_routes
 from config import db
 
@@ -9,23 +12,53 @@ migrate = Migrate()
 
 def create_app():
     application = Flask(__name__)
+    # jsonify 를 orjson 으로 직렬화 (없으면 표준 json)
+    application.json = FastJSONProvider(application)
 
     application.config.from_object("config.Config")
     application.secret_key = "oz_form_secret"
 
+    # 커넥션 풀 측정용 풀 클래스를 엔진 생성(db.init_app) 전에 지정
+    metrics.configure_engine_options(application)
+    # 읽기 전용 replica 엔진도 db.init_app 에서 함께 만들어지도록 bind 로 등록
+    db_routing.configure_binds(application)
     db.init_app(application)
+    metrics.init_app(application)
+    db_routing.init_app(application)
+    query_audit.init_app(application)
+    http_cache.init_app(application)
 
     migrate.init_app(application, db)
 
+    catalog.init_app(application)
+    progress.init_app(application)
+    shared_counters.init_app(application)
+    answer_log.init_app(application)
+    variants.init_app(application)
+    timeseries.init_app(application)
+    snapshots.init_app(application)
+    live_stats.init_app(application)
+    analytics.init_app(application)
+    export.init_app(application)
+
 		# 400 에러 발생 시, JSON 형태로 응답 반환
     @application.errorhandler(400)
     def handle_bad_request(error):
         response = jsonify({"message": error.description})
         response.status_code = 400
+        return response
+
+    # 요청 본문이 허용 크기(업로드 제한 등)를 넘은 경우에도 JSON 형태로 응답 반환
+    @application.errorhandler(413)
+    def handle_request_too_large(error):
+        response = jsonify({"error": error.description})
+        response.status_code = 413
         return response
 
 		# app/route/__init__.py에 블루 브린트를 등록해주세요
     register_routes(application)
 
+    register_commands(application)
+
 
     return application
\ No newline at end of file
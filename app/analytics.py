@@ -0,0 +1,385 @@
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from app.export import answers_export_statement
+from app.models import KST, AgeStatus, GenderStatus
+from app.timeseries import to_kst
+from config import db
+
+try:
+    import numpy as np
+except ImportError:  # numpy 가 없으면 분석 통계 API 만 비활성화
+    np = None
+
+logger = logging.getLogger(__name__)
+
+AGES = [status.value for status in AgeStatus]
+GENDERS = [status.value for status in GenderStatus]
+AGE_CODES = {status: code for code, status in enumerate(AgeStatus)}
+GENDER_CODES = {status: code for code, status in enumerate(GenderStatus)}
+# 인구통계 교차 기준 (age_gender 는 연령대 × 성별 10개 범주)
+DIMENSIONS = ("age", "gender", "age_gender")
+UNANSWERED = -1
+MAX_CHOICES_PER_QUESTION = 127  # int8 코드
+
+
+class AnalyticsUnavailable(RuntimeError):
+    """numpy 가 없거나 분석 데이터를 만들 수 없는 경우 (503 응답)"""
+
+
+def chi2_sf(statistic, dof):
+    """카이제곱 분포 생존함수 P(X >= statistic) = Q(dof/2, statistic/2) (정규화 상부 불완전 감마함수)"""
+    if dof <= 0:
+        return None
+    a, x = dof / 2, statistic / 2
+    if x <= 0:
+        return 1.0
+    log_prefix = a * math.log(x) - x - math.lgamma(a)
+    if x < a + 1:
+        # 급수 전개로 P(a, x) 를 구해서 1 - P
+        term = total = 1 / a
+        for n in range(1, 1000):
+            term *= x / (a + n)
+            total += term
+            if abs(term) < abs(total) * 1e-15:
+                break
+        return max(0.0, 1 - total * math.exp(log_prefix))
+    # 연분수(Lentz) 로 Q(a, x)
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for n in range(1, 1000):
+        an = -n * (n - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return min(1.0, h * math.exp(log_prefix))
+
+
+class AnswerMatrix:
+    """
+    응답을 (사용자 행 × 질문 열) 선택지 코드 행렬(int8, 미응답 -1)로 워커 메모리에 보관한다.
+    answers.id watermark 이후 응답만 keyset chunk 로 읽어 증분 반영하고,
+    통계 결과는 데이터 버전(watermark, 사용자 수)별로 캐시한다.
+    한 질문에 여러 선택지를 고른 경우 가장 마지막 응답(가장 큰 answers.id)만 반영한다.
+    """
+
+    def __init__(self, chunk_size=50000, safety_lag=60, refresh_interval=30):
+        self.chunk_size = chunk_size
+        self.safety_lag = safety_lag
+        self.refresh_interval = refresh_interval
+        self._refresh_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self.last_answer_id = 0
+        self.refreshed_at = None
+        self.refresh_seconds = None
+        self.user_rows = {}  # user_id → 행 번호
+        self.question_columns = {}  # question_id → 열 번호
+        self.question_ids = []  # 열 번호 → question_id
+        self.choice_codes = {}  # choice_id → (열 번호, 코드)
+        self.choice_ids = []  # 열 번호 → [코드별 choice_id]
+        self.codes = np.full((0, 0), UNANSWERED, dtype=np.int8)
+        self.ages = np.zeros(0, dtype=np.int8)
+        self.genders = np.zeros(0, dtype=np.int8)
+        self._results = {}
+        self._results_version = None
+
+    # ---- 증분 로딩 ----
+
+    @property
+    def user_count(self):
+        return len(self.user_rows)
+
+    @property
+    def version(self):
+        return self.last_answer_id, self.user_count
+
+    def _ensure_capacity(self, users, questions):
+        rows, columns = self.codes.shape
+        if users <= rows and questions <= columns:
+            return
+        new_rows = max(users, rows * 2, 1024) if users > rows else rows
+        new_columns = max(questions, columns * 2, 16) if questions > columns else columns
+        codes = np.full((new_rows, new_columns), UNANSWERED, dtype=np.int8)
+        codes[:rows, :columns] = self.codes
+        self.codes = codes
+        if new_rows > rows:
+            self.ages = np.concatenate([self.ages, np.zeros(new_rows - rows, dtype=np.int8)])
+            self.genders = np.concatenate([self.genders, np.zeros(new_rows - rows, dtype=np.int8)])
+
+    def _apply(self, rows):
+        """chunk 하나를 행렬에 반영 (새 사용자/질문/선택지는 먼저 번호를 붙이고, 값 대입은 벡터 연산으로)"""
+        rows = [row for row in rows if row.user_id is not None and row.question_id is not None]
+        if not rows:
+            return
+
+        for row in rows:
+            if row.user_id not in self.user_rows:
+                self.user_rows[row.user_id] = len(self.user_rows)
+            if row.question_id not in self.question_columns:
+                self.question_columns[row.question_id] = len(self.question_ids)
+                self.question_ids.append(row.question_id)
+                self.choice_ids.append([])
+            if row.choice_id not in self.choice_codes:
+                column = self.question_columns[row.question_id]
+                if len(self.choice_ids[column]) >= MAX_CHOICES_PER_QUESTION:
+                    continue
+                self.choice_codes[row.choice_id] = (column, len(self.choice_ids[column]))
+                self.choice_ids[column].append(row.choice_id)
+
+        self._ensure_capacity(len(self.user_rows), len(self.question_ids))
+        rows = [row for row in rows if row.choice_id in self.choice_codes]
+        user_index = np.fromiter((self.user_rows[row.user_id] for row in rows), dtype=np.int64, count=len(rows))
+        positions = [self.choice_codes[row.choice_id] for row in rows]
+        columns = np.fromiter((column for column, _ in positions), dtype=np.int64, count=len(rows))
+        codes = np.fromiter((code for _, code in positions), dtype=np.int8, count=len(rows))
+        # answers.id 순서로 대입하므로 같은 (사용자, 질문) 이 여러 번 나오면 마지막 값이 남는다
+        self.codes[user_index, columns] = codes
+        self.ages[user_index] = [AGE_CODES.get(row.age, 0) for row in rows]
+        self.genders[user_index] = [GENDER_CODES.get(row.gender, 0) for row in rows]
+
+    def refresh(self, force=False):
+        """
+        refresh_interval 이 지났으면 watermark 이후 응답을 읽어 반영한다.
+        다른 스레드가 갱신 중이면 기다리지 않고 현재 데이터로 계산한다.
+        """
+        if not force and self.refreshed_at is not None and time.monotonic() - self.refreshed_at < self.refresh_interval:
+            return False
+        if not self._refresh_lock.acquire(blocking=self.refreshed_at is None):
+            return False
+        try:
+            started = time.perf_counter()
+            cutoff = datetime.now(tz=KST) - timedelta(seconds=self.safety_lag)
+            while True:
+                rows = db.session.execute(
+                    answers_export_statement(self.last_answer_id, limit=self.chunk_size)
+                ).all()
+                reached_cutoff = False
+                for index, row in enumerate(rows):
+                    if to_kst(row.answered_at) > cutoff:
+                        rows, reached_cutoff = rows[:index], True
+                        break
+                if rows:
+                    with self._lock:
+                        self._apply(rows)
+                        self.last_answer_id = rows[-1].answer_id
+                db.session.rollback()
+                if reached_cutoff or len(rows) < self.chunk_size:
+                    break
+            self.refreshed_at = time.monotonic()
+            self.refresh_seconds = round(time.perf_counter() - started, 3)
+            return True
+        finally:
+            self._refresh_lock.release()
+
+    # ---- 결과 캐시 ----
+
+    def cached(self, key, compute):
+        """같은 데이터 버전에서는 한 번만 계산"""
+        with self._lock:
+            if self._results_version != self.version:
+                self._results.clear()
+                self._results_version = self.version
+            if key in self._results:
+                return self._results[key]
+            result = compute()
+            self._results[key] = result
+            return result
+
+    # ---- 통계 (self._lock 안에서 호출) ----
+
+    def _column(self, question_id):
+        column = self.question_columns.get(question_id)
+        if column is None:
+            return None, None
+        return column, self.codes[:self.user_count, column]
+
+    def _dimension_codes(self, dimension):
+        ages, genders = self.ages[:self.user_count], self.genders[:self.user_count]
+        if dimension == "age":
+            return ages.astype(np.int64), AGES
+        if dimension == "gender":
+            return genders.astype(np.int64), GENDERS
+        labels = [f"{age}/{gender}" for age in AGES for gender in GENDERS]
+        return ages.astype(np.int64) * len(GENDERS) + genders, labels
+
+    def chi_square(self, question_id, dimension):
+        """선택지 × 인구통계 분할표의 카이제곱 독립성 검정 (응답한 사용자 기준)"""
+        column, codes = self._column(question_id)
+        if column is None:
+            return None
+        groups, labels = self._dimension_codes(dimension)
+        choices = self.choice_ids[column]
+        answered = codes >= 0
+        observed = np.bincount(
+            codes[answered].astype(np.int64) * len(labels) + groups[answered],
+            minlength=len(choices) * len(labels),
+        ).reshape(len(choices), len(labels)).astype(np.float64)
+
+        total = float(observed.sum())
+        row_totals, column_totals = observed.sum(axis=1), observed.sum(axis=0)
+        # 응답이 없는 선택지/범주는 자유도에서 제외
+        used_rows, used_columns = row_totals > 0, column_totals > 0
+        dof = int((used_rows.sum() - 1) * (used_columns.sum() - 1))
+        statistic = cramers_v = p_value = None
+        if total > 0 and dof > 0:
+            expected = np.outer(row_totals, column_totals) / total
+            mask = expected > 0
+            statistic = float((((observed - expected) ** 2)[mask] / expected[mask]).sum())
+            p_value = chi2_sf(statistic, dof)
+            k = int(min(used_rows.sum(), used_columns.sum())) - 1
+            cramers_v = math.sqrt(statistic / (total * k)) if k > 0 else None
+
+        return {
+            "question_id": question_id,
+            "by": dimension,
+            "respondents": int(total),
+            "chi_square": statistic,
+            "dof": dof,
+            "p_value": p_value,
+            "cramers_v": cramers_v,
+            "categories": labels,
+            "observed": [
+                {"choice_id": choice_id, "counts": observed[code].astype(np.int64).tolist()}
+                for code, choice_id in sorted(enumerate(choices), key=lambda item: item[1])
+            ],
+        }
+
+    def _value_counts(self, codes):
+        """
+        (사용자 × 질문) 코드 행렬에서 질문별 코드 개수 (질문 수 × 최대 선택지 수)
+        코드 값마다 열 방향 합계를 한 번씩 구해서, 전체 행렬을 펼치거나 열을 하나씩 돌지 않는다.
+        """
+        width = max((len(choices) for choices in self.choice_ids), default=0)
+        counts = np.zeros((codes.shape[1], width), dtype=np.int64)
+        for code in range(width):
+            counts[:, code] = np.count_nonzero(codes == code, axis=0)
+        return counts
+
+    def entropy(self):
+        """질문별 응답 분포의 엔트로피(bits)와 정규화 엔트로피(선택지 수 기준 0~1)"""
+        users, questions = self.user_count, len(self.question_ids)
+        if not users or not questions:
+            return []
+        counts = self._value_counts(self.codes[:users, :questions]).astype(np.float64)
+
+        totals = counts.sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            p = counts / totals[:, None]
+            bits = -np.where(p > 0, p * np.log2(p), 0).sum(axis=1)
+        choice_counts = np.array([len(choices) for choices in self.choice_ids], dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            normalized = np.where(choice_counts > 1, bits / np.log2(np.maximum(choice_counts, 2)), 0)
+
+        return [
+            {
+                "question_id": question_id,
+                "respondents": int(totals[column]),
+                "choices": int(choice_counts[column]),
+                "entropy_bits": round(float(bits[column]), 6) if totals[column] else None,
+                "normalized_entropy": round(float(normalized[column]), 6) if totals[column] else None,
+            }
+            for column, question_id in sorted(enumerate(self.question_ids), key=lambda item: item[1])
+        ]
+
+    def cooccurrence(self, choice_id, other_question_id=None):
+        """
+        choice_id 를 고른 사용자가 다른 질문에서 고른 선택지 분포
+        (조건부 비율 P(Y|X) 와 lift = P(Y|X) / P(Y), 두 질문 모두 응답한 사용자 기준)
+        """
+        position = self.choice_codes.get(choice_id)
+        if position is None:
+            return None
+        column, code = position
+        codes = self.codes[:self.user_count, :len(self.question_ids)]
+        source = codes[:, column]
+        picked = source == code
+
+        if other_question_id is not None:
+            other_columns = [self.question_columns.get(other_question_id)]
+            if other_columns[0] is None:
+                return None
+        else:
+            other_columns = [c for c in range(len(self.question_ids)) if c != column]
+
+        # 기준 질문에 응답한 사용자 / choice_id 를 고른 사용자만 남긴 뒤 모든 질문의 분포를 한 번에 센다
+        base = self._value_counts(codes[source >= 0][:, other_columns]).tolist()
+        given = self._value_counts(codes[picked][:, other_columns]).tolist()
+
+        questions = []
+        for index, other in enumerate(other_columns):
+            base_counts, given_counts = base[index], given[index]
+            base_total, given_total = sum(base_counts), sum(given_counts)
+            questions.append({
+                "question_id": self.question_ids[other],
+                "respondents": given_total,
+                "choices": [
+                    {
+                        "choice_id": other_choice_id,
+                        "count": given_counts[other_code],
+                        "conditional_percentage": round(given_counts[other_code] * 100 / given_total, 2)
+                        if given_total else None,
+                        "lift": round((given_counts[other_code] / given_total) / (base_counts[other_code] / base_total), 4)
+                        if given_total and base_counts[other_code] else None,
+                    }
+                    for other_code, other_choice_id in sorted(enumerate(self.choice_ids[other]), key=lambda item: item[1])
+                ],
+            })
+        questions.sort(key=lambda item: item["question_id"])
+        return {
+            "choice_id": choice_id,
+            "question_id": self.question_ids[column],
+            "respondents": int(picked.sum()),
+            "questions": questions,
+        }
+
+    def stats(self):
+        return {
+            "last_answer_id": self.last_answer_id,
+            "users": self.user_count,
+            "questions": len(self.question_ids),
+            "choices": len(self.choice_codes),
+            "matrix_bytes": int(self.codes.nbytes + self.ages.nbytes + self.genders.nbytes),
+            "refresh_seconds": self.refresh_seconds,
+            "cached_results": len(self._results),
+        }
+
+
+def init_app(application):
+    if np is None or not application.config.get("ANALYTICS_ENABLED", True):
+        return
+    application.extensions["analytics"] = AnswerMatrix(
+        chunk_size=application.config.get("ANALYTICS_CHUNK_SIZE", 50000),
+        safety_lag=application.config.get("ANALYTICS_SAFETY_LAG", 60),
+        refresh_interval=application.config.get("ANALYTICS_REFRESH_INTERVAL", 30),
+    )
+
+
+def get_analytics():
+    """watermark 이후 응답을 반영한 AnswerMatrix (numpy 가 없거나 꺼져 있으면 AnalyticsUnavailable)"""
+    matrix = current_app.extensions.get("analytics")
+    if matrix is None:
+        raise AnalyticsUnavailable("분석 통계를 사용하려면 numpy 설치와 ANALYTICS_ENABLED 설정이 필요합니다.")
+    matrix.refresh()
+    return matrix
+
+
+def analytics_result(name, compute, *args):
+    """데이터 버전별로 캐시된 결과 + 응답 메타 정보"""
+    matrix = get_analytics()
+    result = matrix.cached((name, *args), lambda: compute(matrix, *args))
+    return result, {"data_version": {"last_answer_id": matrix.last_answer_id, "users": matrix.user_count}}
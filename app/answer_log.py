@@ -0,0 +1,425 @@
+import atexit
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from flask import current_app
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app.ingest import write_submission_batch
+
+logger = logging.getLogger(__name__)
+
+DEAD_LETTER_FILE = "dead-letter.jsonl"
+# 시작 시 복구에 실패한 세그먼트(DB 연결 실패 등)를 다시 시도하는 간격 (초)
+RECOVER_RETRY_SECONDS = 30
+# 다시 시도해도 성공할 수 없는(데이터 자체가 잘못된) 저장 실패, 연결 끊김 같은 나머지 오류는 계속 재시도한다
+PERMANENT_ERRORS = (IntegrityError, DataError, KeyError, TypeError, ValueError)
+
+
+class AnswerLog:
+    """
+    워커(프로세스)마다 하나씩 쓰는 append-only 로그 세그먼트
+    - 세그먼트 파일은 flock 으로 잠가서, 잠금을 얻을 수 있는 세그먼트 = 주인이 죽은 세그먼트로 판단한다.
+    - offset 은 세그먼트를 교체해도 계속 증가하는 논리 위치 (base + 파일 내 위치)
+    - <세그먼트>.ckpt 에는 DB 에 반영이 끝난 파일 내 위치를 기록한다.
+    """
+
+    def __init__(self, directory, fsync_interval, segment_bytes):
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self.segment_bytes = segment_bytes
+        self.path = None
+        self._fd = None
+        self._base = 0
+        self._written = 0
+        self._synced = 0
+        self._syncing = False
+        self._cond = threading.Condition()
+
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, f"segment-{os.getpid()}-{time.time_ns()}.log")
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        self._base = self._written
+
+    def append(self, record):
+        """레코드 한 줄을 기록하고 그 끝 위치(offset)를 반환 (호출한 쪽에서 순서를 보장해야 함)"""
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+        os.write(self._fd, line)
+        self._written += len(line)
+        return self._written
+
+    def wait_durable(self, offset):
+        """
+        offset 까지 디스크에 fsync 될 때까지 대기
+        먼저 온 요청이 대표로 fsync_interval 만큼 모은 뒤 한 번에 fsync 하고 나머지는 결과만 기다린다.
+        """
+        with self._cond:
+            while self._synced < offset:
+                if self._syncing:
+                    self._cond.wait()
+                    continue
+
+                self._syncing = True
+                self._cond.release()
+                synced = None
+                try:
+                    time.sleep(self.fsync_interval)
+                    target = self._written
+                    os.fsync(self._fd)
+                    synced = target
+                finally:
+                    self._cond.acquire()
+                    if synced is not None:
+                        self._synced = max(self._synced, synced)
+                    self._syncing = False
+                    self._cond.notify_all()
+
+    def checkpoint(self, offset):
+        write_checkpoint(self.path, offset - self._base)
+
+    def rotate_if_flushed(self, flushed_offset):
+        """세그먼트가 충분히 커졌고 전부 DB 에 반영됐으면 새 세그먼트로 교체 (버퍼 잠금 안에서 호출)"""
+        if flushed_offset != self._written or self._written - self._base < self.segment_bytes:
+            return
+        with self._cond:
+            # 진행 중인 fsync 가 끝난 뒤에 교체해야 닫힌 fd 를 fsync 하지 않는다
+            while self._syncing:
+                self._cond.wait()
+            old_fd, old_path = self._fd, self.path
+            os.fsync(old_fd)
+            self.open()
+            self._synced = self._written
+        os.close(old_fd)
+        remove_segment(old_path)
+
+    def close(self):
+        if self._fd is not None:
+            os.fsync(self._fd)
+            os.close(self._fd)
+            self._fd = None
+
+
+def write_checkpoint(segment_path, position):
+    tmp_path = f"{segment_path}.ckpt.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(str(position))
+    os.replace(tmp_path, f"{segment_path}.ckpt")
+
+
+def read_checkpoint(segment_path):
+    try:
+        with open(f"{segment_path}.ckpt") as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def remove_segment(segment_path):
+    for path in (segment_path, f"{segment_path}.ckpt"):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def read_unflushed_records(segment_path):
+    """체크포인트 이후의 레코드를 읽는다. 마지막 줄이 중간에 잘렸으면(기록 중 종료) 버린다."""
+    with open(segment_path, "rb") as f:
+        f.seek(read_checkpoint(segment_path))
+        data = f.read()
+
+    records = []
+    for line in data.split(b"\n")[:-1]:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            logger.warning("answer log %s: 손상된 레코드를 건너뜁니다.", segment_path)
+    return records
+
+
+class AnswerBuffer:
+    """
+    write-behind 모드의 /submit 버퍼
+    요청은 로그에 기록(fsync 묶음 처리)된 뒤 바로 응답하고,
+    백그라운드 스레드가 ANSWER_FLUSH_INTERVAL_MS 또는 ANSWER_FLUSH_MAX_ROWS 마다
+    쌓인 제출을 한 트랜잭션의 multi-row INSERT 로 저장한다.
+    """
+
+    def __init__(self, application):
+        config = application.config
+        self.app = application
+        self.log_dir = config["ANSWER_LOG_DIR"]
+        self.flush_interval = config["ANSWER_FLUSH_INTERVAL_MS"] / 1000
+        self.max_rows = config["ANSWER_FLUSH_MAX_ROWS"]
+        self.fsync_interval = config["ANSWER_LOG_FSYNC_INTERVAL_MS"] / 1000
+        self.segment_bytes = config["ANSWER_LOG_SEGMENT_BYTES"]
+        self.max_attempts = config.get("ANSWER_FLUSH_MAX_ATTEMPTS", 3)
+        self.dead_letter_path = os.path.join(self.log_dir, DEAD_LETTER_FILE)
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._pid = None
+        self._thread = None
+        self.log = None
+
+        self._queue = []
+        self._pending_keys = set()
+        self._pending_rows = 0
+        self._attempts = {}  # 멱등 키별 영구 오류 횟수
+
+        self.flushed_records = 0
+        self.flushed_rows = 0
+        self.flush_count = 0
+        self.flush_failures = 0
+        self.recovered_records = 0
+        self.dead_letter_records = 0
+        self.last_flush_ms = None
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def ensure_started(self):
+        """gunicorn 워커마다(fork 이후) 처음 사용할 때 세그먼트를 열고 복구/flush 스레드를 시작"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self.log = AnswerLog(self.log_dir, self.fsync_interval, self.segment_bytes)
+            self.log.open()
+            self._pid = os.getpid()
+
+        self.recover()
+
+        self._thread = threading.Thread(target=self._run, name="answer-buffer-flusher", daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def submit(self, rows, question_ids, idempotency_key=None):
+        """
+        검증이 끝난 제출을 로그에 기록하고 fsync 될 때까지 기다린다.
+        같은 멱등 키가 아직 버퍼에 남아 있으면 False (DB 에 이미 있는 키는 flush 때 걸러진다)
+        """
+        self.ensure_started()
+        record = {
+            "key": idempotency_key or f"wb-{uuid.uuid4().hex}",
+            "rows": rows,
+            "question_ids": {str(choice_id): question_id for choice_id, question_id in question_ids.items()},
+        }
+
+        with self._lock:
+            if record["key"] in self._pending_keys:
+                return False
+            # 로그 기록과 큐 추가를 같은 잠금 안에서 해야 큐 순서 = 로그 순서가 보장된다
+            offset = self.log.append(record)
+            self._queue.append((offset, record))
+            self._pending_keys.add(record["key"])
+            self._pending_rows += len(rows)
+            if self._pending_rows >= self.max_rows:
+                self._wake.set()
+
+        self.log.wait_durable(offset)
+        return True
+
+    def flush(self):
+        """큐에 쌓인 제출을 max_rows 단위로 DB 에 반영. 실패하면 큐에 남겨두고 다음 주기에 재시도"""
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch, rows = [], 0
+                    for item in self._queue:
+                        if batch and rows + len(item[1]["rows"]) > self.max_rows:
+                            break
+                        batch.append(item)
+                        rows += len(item[1]["rows"])
+                if not batch:
+                    return
+
+                started = time.perf_counter()
+                try:
+                    with self.app.app_context():
+                        write_submission_batch([record for _, record in batch])
+                except Exception:
+                    self.flush_failures += 1
+                    logger.exception("answer buffer flush 실패 (%d건), 한 건씩 다시 저장합니다.", len(batch))
+                    # 잘못된 제출 하나 때문에 뒤의 제출까지 막히지 않도록 앞에서부터 처리된 만큼만 큐에서 뺀다
+                    handled = self._write_isolated([record for _, record in batch])
+                    if not handled:
+                        return
+                    batch = batch[:handled]
+                    rows = sum(len(record["rows"]) for _, record in batch)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+
+                flushed_offset = batch[-1][0]
+                self.log.checkpoint(flushed_offset)
+                with self._lock:
+                    del self._queue[:len(batch)]
+                    self._pending_keys.difference_update(record["key"] for _, record in batch)
+                    self._pending_rows -= rows
+                    self.log.rotate_if_flushed(flushed_offset)
+
+                self.flush_count += 1
+                self.flushed_records += len(batch)
+                self.flushed_rows += rows
+                self.last_flush_ms = elapsed_ms
+                self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+                self._total_flush_ms += elapsed_ms
+
+    def _write_isolated(self, records):
+        """
+        묶음 저장이 실패했을 때 제출을 한 건씩 저장한다.
+        데이터 오류로 max_attempts 번 실패한 제출은 dead letter 파일로 옮기고 건너뛴다.
+        반환값: 앞에서부터 처리가 끝난(저장했거나 dead letter 로 옮긴) 제출 수
+        """
+        for index, record in enumerate(records):
+            try:
+                with self.app.app_context():
+                    write_submission_batch([record])
+            except PERMANENT_ERRORS as e:
+                attempts = self._attempts.get(record["key"], 0) + 1
+                if attempts < self.max_attempts:
+                    self._attempts[record["key"]] = attempts
+                    logger.warning("제출 %s 저장 실패 (%d/%d): %s", record["key"], attempts, self.max_attempts, e)
+                    return index
+                self._attempts.pop(record["key"], None)
+                self._dead_letter(record, e)
+            except Exception:
+                logger.exception("제출 %s 저장 실패, 다음 주기에 재시도합니다.", record["key"])
+                return index
+            else:
+                self._attempts.pop(record["key"], None)
+        return len(records)
+
+    def _dead_letter(self, record, error):
+        """저장할 수 없는 제출을 dead letter 파일에 남긴다. (확인 후 수동으로 처리)"""
+        line = json.dumps(
+            {"record": record, "error": str(error), "failed_at": time.time()},
+            ensure_ascii=False, separators=(",", ":"),
+        )
+        fd = os.open(self.dead_letter_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, (line + "\n").encode("utf-8"))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self.dead_letter_records += 1
+        logger.error("제출 %s 를 dead letter 로 옮겼습니다: %s", record["key"], error)
+
+    def recover(self):
+        """
+        다른(종료된) 워커가 남긴 세그먼트 중 DB 에 반영되지 않은 부분을 재생하고 삭제
+        반환값: 복구에 실패해서 남겨 둔 세그먼트 수
+        """
+        own_path = self.log.path if self.log is not None else None
+        try:
+            names = sorted(os.listdir(self.log_dir))
+        except FileNotFoundError:
+            return 0
+
+        failed = 0
+        for name in names:
+            path = os.path.join(self.log_dir, name)
+            if not name.endswith(".log") or path == own_path:
+                continue
+
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # 살아 있는 워커가 쓰고 있는 세그먼트
+
+                records = read_unflushed_records(path)
+                for start in range(0, len(records), self.max_rows):
+                    self._recover_batch(records[start:start + self.max_rows])
+                self.recovered_records += len(records)
+                remove_segment(path)
+                if records:
+                    logger.info("answer log %s: 미반영 제출 %d건을 복구했습니다.", path, len(records))
+            except Exception:
+                failed += 1
+                logger.exception("answer log %s 복구 실패, 다시 시도합니다.", path)
+            finally:
+                os.close(fd)
+        return failed
+
+    def recover_on_start(self):
+        """
+        워커 시작 시 백그라운드에서 남은 세그먼트를 복구한다. (write-behind 가 꺼져 있어도 실행)
+        이미 202 로 응답한 제출이 재시작 후 첫 write-behind 요청을 기다리지 않고 DB 에 반영되도록,
+        실패한 세그먼트가 없어질 때까지 RECOVER_RETRY_SECONDS 마다 다시 시도한다.
+        """
+        def run():
+            while self.recover():
+                time.sleep(RECOVER_RETRY_SECONDS)
+
+        threading.Thread(target=run, name="answer-log-recovery", daemon=True).start()
+
+    def _recover_batch(self, records):
+        try:
+            with self.app.app_context():
+                write_submission_batch(records)
+            return
+        except Exception:
+            logger.exception("answer log 복구 중 저장 실패 (%d건), 한 건씩 다시 저장합니다.", len(records))
+        for _ in range(self.max_attempts):
+            records = records[self._write_isolated(records):]
+            if not records:
+                return
+        raise RuntimeError(f"제출 {len(records)}건을 저장하지 못했습니다.")
+
+    def shutdown(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval * 10)
+        self.flush()
+        if self.log is not None and not self._queue:
+            # 전부 반영됐으면 세그먼트를 지워서 다음 시작 시 복구할 것이 없게 한다
+            self.log.close()
+            remove_segment(self.log.path)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def stats(self):
+        with self._lock:
+            queue_records, queue_rows = len(self._queue), self._pending_rows
+        return {
+            "enabled": True,
+            "queue_records": queue_records,
+            "queue_rows": queue_rows,
+            "flushed_records": self.flushed_records,
+            "flushed_rows": self.flushed_rows,
+            "flush_count": self.flush_count,
+            "flush_failures": self.flush_failures,
+            "recovered_records": self.recovered_records,
+            "dead_letter_records": self.dead_letter_records,
+            "last_flush_ms": round(self.last_flush_ms, 3) if self.last_flush_ms is not None else None,
+            "max_flush_ms": round(self.max_flush_ms, 3),
+            "avg_flush_ms": round(self._total_flush_ms / self.flush_count, 3) if self.flush_count else None,
+        }
+
+
+def init_app(application):
+    buffer = AnswerBuffer(application)
+    if application.config.get("ANSWER_WRITE_BEHIND"):
+        application.extensions["answer_buffer"] = buffer
+    # write-behind 를 끈 뒤에 재시작해도 이전에 기록된 제출이 남지 않도록 항상 복구한다
+    buffer.recover_on_start()
+
+
+def get_answer_buffer():
+    """write-behind 모드가 꺼져 있으면 None"""
+    return current_app.extensions.get("answer_buffer")
@@ -0,0 +1,361 @@
+import re
+import time
+from http.cookies import CookieError, SimpleCookie
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import metrics, query_audit
+from app.catalog import (
+    active_choices_statement,
+    active_question_count_statement,
+    build_question_payload,
+    build_survey_payload,
+    question_statement,
+    survey_choices_statement,
+    survey_questions_statement,
+)
+from app.db_routing import STICKY_COOKIE, sticky_to_primary
+from app.http_cache import CACHED_ENDPOINTS, cache_control_header
+from app.serialization import dumps, rows_as_dicts
+from app.snapshots import snapshot_headers
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:  # asgiref 가 없으면 ASGI 모드를 쓸 수 없음 (create_asgi_app 에서 안내)
+    WsgiToAsgi = None
+
+# 동기 드라이버 → async 드라이버
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def _async_uri(uri):
+    url = make_url(uri)
+    if url.drivername not in ASYNC_DRIVERS:
+        raise RuntimeError(f"async 드라이버를 알 수 없는 DB 입니다: {url.drivername} (ASYNC_DATABASE_URI 를 설정해주세요)")
+    return url.set(drivername=ASYNC_DRIVERS[url.drivername]).render_as_string(hide_password=False)
+
+
+def async_database_uri(config):
+    """ASYNC_DATABASE_URI 가 없으면 SQLALCHEMY_DATABASE_URI 의 드라이버만 async 용으로 바꿔서 사용"""
+    if config.get("ASYNC_DATABASE_URI"):
+        return config["ASYNC_DATABASE_URI"]
+    return _async_uri(config["SQLALCHEMY_DATABASE_URI"])
+
+
+def _header(scope, name):
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return ""
+
+
+def _cookie(scope, name):
+    try:
+        morsel = SimpleCookie(_header(scope, b"cookie")).get(name)
+    except CookieError:
+        return None
+    return morsel.value if morsel is not None else None
+
+
+def _accepts_gzip(scope):
+    for part in _header(scope, b"accept-encoding").split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*") and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            return True
+    return False
+
+
+def _etag_matches(scope, etag):
+    header = _header(scope, b"if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    tags = [tag.strip().removeprefix("W/").strip('"') for tag in header.split(",")]
+    return etag in tags
+
+
+class AsyncReadApp:
+    """
+    ASGI 진입점
+    조회가 많은 질문/선택지/통계 GET 라우트는 async 엔진으로 직접 처리하고 (요청이 DB 를 기다리는 동안
+    워커/커넥션을 붙잡지 않음), 나머지 요청은 기존 Flask 앱(WsgiToAsgi, 스레드풀)으로 넘긴다.
+    - 카탈로그 캐시/테이블 버전/통계 스냅샷은 Flask 라우트와 같은 객체를 사용하므로 ETag 와 무효화도 같다.
+      (If-None-Match 가 맞으면 캐시나 DB 를 보지 않고 304, 200/304 에는 Flask 와 같은 Cache-Control/Vary)
+    - 캐시에 없으면 async 엔진으로 읽는다. replica 는 Flask 의 ReplicaRouter 상태로 고르고
+      (쓰기 직후 쿠키/방금 바뀐 테이블은 primary), 쿼리는 metrics/query_audit 에 같은 엔드포인트 이름으로 기록된다.
+    """
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+        self.catalog = flask_app.extensions["catalog"]
+        self.snapshots = flask_app.extensions["stats_snapshots"]
+        self.table_versions = flask_app.extensions["table_versions"]
+        self.metrics = flask_app.extensions.get("metrics")
+        self.router = flask_app.extensions.get("replica_router")
+
+        config = flask_app.config
+        self.cache_control = cache_control_header(config) if config.get("HTTP_CACHE_ENABLED", True) else None
+        self.audit_enabled = config.get("QUERY_AUDIT_ENABLED", False)
+        self.read_blueprints = set(config.get("REPLICA_READ_BLUEPRINTS", ()))
+
+        self.engine = self._create_engine(async_database_uri(config))
+        # Flask 의 replica_0, replica_1, ... 과 같은 이름으로 만들어서 ReplicaRouter 가 고른 replica 를 그대로 사용
+        self.replica_engines = {}
+        for index, uri in enumerate(config.get("REPLICA_DATABASE_URIS") or []):
+            self.replica_engines[f"replica_{index}"] = self._create_engine(_async_uri(uri))
+        if self.router is not None:
+            for replica in self.router.replicas:
+                self._mark_down_on_error(replica)
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+
+        # (경로, Flask 엔드포인트 이름(헤더/측정값에 사용), 처리 함수)
+        self.routes = [
+            (re.compile(r"/questions/(\d+)"), "questions.get_question_by_sqe", self.question_by_sqe),
+            (re.compile(r"/questions/count"), "questions.question_count", self.question_count),
+            (re.compile(r"/questions/all"), "questions.get_all_questions", self.all_questions),
+            (re.compile(r"/choices/question/(\d+)"), "choices.get_choices_by_question", self.choices_by_question),
+            (re.compile(r"/stats/(answer_rate_by_choice)"), "stats_routes.user_answer_rate", self.stats_snapshot),
+            (re.compile(r"/stats/(answer_count_by_question)"), "stats_routes.question_answer_distribution", self.stats_snapshot),
+        ]
+
+    def _create_engine(self, uri):
+        config = self.flask_app.config
+        pool_options = {}
+        if not make_url(uri).drivername.startswith("sqlite"):
+            # 로컬 테스트용 aiosqlite 는 커넥션 풀 크기 설정을 받지 않는다
+            pool_options = {
+                "pool_size": config.get("ASYNC_POOL_SIZE", 20),
+                "max_overflow": config.get("ASYNC_MAX_OVERFLOW", 10),
+                "pool_recycle": config.get("SQLALCHEMY_ENGINE_OPTIONS", {}).get("pool_recycle", 1800),
+                "pool_pre_ping": True,
+            }
+        engine = create_async_engine(uri, **pool_options)
+        # 이벤트는 sync_engine 에 등록한다 (Flask 엔진과 같은 쿼리 시간/풀 측정값, 요청별 SQL 집계)
+        metrics.instrument_engine(self.flask_app, engine.sync_engine)
+        query_audit.instrument_engine(engine.sync_engine)
+        return engine
+
+    def _mark_down_on_error(self, replica):
+        """Flask 의 replica 엔진처럼 연결 오류가 나면 바로 빼고 다음 요청부터 primary 를 사용"""
+        engine = self.replica_engines.get(replica.name)
+        if engine is None:
+            return
+
+        def on_error(context):
+            if isinstance(context.sqlalchemy_exception, exc.OperationalError):
+                self.router.mark_down(replica, context.original_exception)
+
+        event.listen(engine.sync_engine, "handle_error", on_error)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+
+        if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            for pattern, endpoint, handler in self.routes:
+                match = pattern.fullmatch(scope["path"])
+                if match:
+                    started = time.perf_counter()
+                    if self.metrics is not None:
+                        self.metrics.start_flushing()
+                    token = metrics.current_endpoint.set(endpoint)
+                    try:
+                        if self.audit_enabled:
+                            with query_audit.audit_context() as audit:
+                                result = self._not_modified(scope, endpoint) or await handler(scope, *match.groups())
+                            if result is not None:
+                                result = self._audited(endpoint, audit, started, *result)
+                        else:
+                            result = self._not_modified(scope, endpoint) or await handler(scope, *match.groups())
+                    finally:
+                        metrics.current_endpoint.reset(token)
+                    if result is not None:
+                        if scope.get("db_replica"):
+                            result[2]["X-DB-Route"] = scope["db_replica"]
+                        await self._send(scope, send, *result)
+                        self._observe(scope, endpoint, started)
+                        return
+                    break
+
+        await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                if self.router is not None:
+                    self.router.start_health_checks()
+                if self.metrics is not None:
+                    self.metrics.start_flushing()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                for engine in (self.engine, *self.replica_engines.values()):
+                    await engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _send(self, scope, send, status, body, headers):
+        headers = {"Content-Type": "application/json", **headers}
+        headers["Content-Length"] = str(len(body))
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(key.lower().encode("latin-1"), value.encode("latin-1")) for key, value in headers.items()],
+        })
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+
+    def _observe(self, scope, endpoint, started):
+        # Flask 의 observe_request 와 같은 이름/라벨로 기록해서 /metrics 에서 경로와 상관없이 합산되게 한다
+        if self.metrics is not None:
+            self.metrics.observe(
+                "http_request_duration_seconds",
+                {"endpoint": endpoint, "method": scope["method"]},
+                time.perf_counter() - started,
+            )
+
+    def _audited(self, endpoint, audit, started, status, body, headers):
+        """query_audit 의 finish_query_audit 와 같이 예산 초과를 기록하고 Server-Timing 을 붙인다"""
+        problems = query_audit.audit_problems(self.flask_app.config, endpoint, audit)
+        if problems and self.flask_app.config.get("QUERY_AUDIT_STRICT", False):
+            status, body, headers = self._json(
+                endpoint, {"error": "쿼리 예산 초과", "endpoint": endpoint, "problems": problems}, 500
+            )
+        headers["Server-Timing"] = f"{audit.server_timing()}, app;dur={(time.perf_counter() - started) * 1000:.2f}"
+        return status, body, headers
+
+    def _cache_headers(self, endpoint, etag=None):
+        """http_cache.add_cache_headers 와 같은 ETag/Cache-Control/Vary (etag 가 있으면 라우트가 붙인 ETag)"""
+        if self.cache_control is None or endpoint not in CACHED_ENDPOINTS:
+            return {"ETag": f'"{etag}"', "Vary": "Accept-Encoding"} if etag else {}
+        if etag is None:
+            etag = f'W/"{self.table_versions.etag(CACHED_ENDPOINTS[endpoint])[0]}"'
+        else:
+            etag = f'"{etag}"'
+        return {"ETag": etag, "Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+
+    def _not_modified(self, scope, endpoint):
+        """http_cache.check_not_modified 와 같이 테이블 버전 ETag 가 맞으면 캐시를 보지 않고 304"""
+        if self.cache_control is None or endpoint not in CACHED_ENDPOINTS:
+            return None
+        etag, _ = self.table_versions.etag(CACHED_ENDPOINTS[endpoint])
+        if not _etag_matches(scope, etag):
+            return None
+        return 304, b"", self._cache_headers(endpoint)
+
+    def _json(self, endpoint, data, status=200):
+        headers = self._cache_headers(endpoint) if status == 200 else {}
+        return status, dumps(data, sort_keys=self.flask_app.json.sort_keys) + b"\n", headers
+
+    def _choose_engine(self, scope, endpoint, version):
+        """
+        db_routing.route_reads/read_after 와 같은 기준으로 읽을 엔진을 고른다.
+        쓰기 직후(STICKY_COOKIE)이거나 카탈로그/테이블이 REPLICA_MAX_LAG 이내에 바뀌었으면 primary
+        """
+        router = self.router
+        if router is None or endpoint.split(".")[0] not in self.read_blueprints:
+            return self.engine
+        router.start_health_checks()
+        if sticky_to_primary(_cookie(scope, STICKY_COOKIE)):
+            return self.engine
+        if not router.caught_up(version[1] / 1e9 if version else None):
+            return self.engine
+        if endpoint in CACHED_ENDPOINTS and not router.caught_up(self.table_versions.etag(CACHED_ENDPOINTS[endpoint])[1]):
+            return self.engine
+        replica = router.choose()
+        if replica is None:
+            return self.engine
+        scope["db_replica"] = replica.name
+        return self.replica_engines[replica.name]
+
+    async def _cached(self, scope, endpoint, key, loader):
+        """Flask 라우트와 같은 카탈로그 캐시 키로 조회하고, 없으면 async 엔진으로 읽어서 저장"""
+        found, value, version = self.catalog.lookup(key)
+        if found:
+            return value
+        engine = self._choose_engine(scope, endpoint, version)
+        async with self.sessionmaker(bind=engine) as session:
+            value = await loader(session)
+        self.catalog.store(key, version, value)
+        return value
+
+    async def question_by_sqe(self, scope, question_sqe):
+        question_sqe = int(question_sqe)
+
+        async def load(session):
+            question = (await session.scalars(question_statement(question_sqe))).first()
+            if not question:
+                return None
+            choices = rows_as_dicts(await session.execute(active_choices_statement(question.id)))
+            # srcset 이 없으면 파생 이미지 생성을 예약하므로 Flask 앱 컨텍스트 안에서 만든다
+            with self.flask_app.app_context():
+                return build_question_payload(question, choices)
+
+        endpoint = "questions.get_question_by_sqe"
+        payload = await self._cached(scope, endpoint, ("question", question_sqe), load)
+        if not payload:
+            return self._json(endpoint, {"error": "존재하지 않는 질문입니다."}, 404)
+        return self._json(endpoint, payload)
+
+    async def question_count(self, scope):
+        async def load(session):
+            return await session.scalar(active_question_count_statement())
+
+        endpoint = "questions.question_count"
+        return self._json(endpoint, {"total": await self._cached(scope, endpoint, ("question_count",), load)})
+
+    async def choices_by_question(self, scope, question_id):
+        question_id = int(question_id)
+
+        async def load(session):
+            return rows_as_dicts(await session.execute(active_choices_statement(question_id)))
+
+        endpoint = "choices.get_choices_by_question"
+        return self._json(endpoint, {"choices": await self._cached(scope, endpoint, ("choices", question_id), load)})
+
+    async def all_questions(self, scope):
+        async def load(session):
+            questions = (await session.scalars(survey_questions_statement())).all()
+            choices = (
+                rows_as_dicts(await session.execute(survey_choices_statement([question.id for question in questions])))
+                if questions else []
+            )
+            return build_survey_payload(questions, choices)
+
+        endpoint = "questions.get_all_questions"
+        survey = await self._cached(scope, endpoint, ("survey",), load)
+        use_gzip = _accepts_gzip(scope)
+        etag = survey.gzip_etag if use_gzip else survey.etag
+        headers = self._cache_headers(endpoint, etag)
+
+        if _etag_matches(scope, etag):
+            return 304, b"", headers
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+        return 200, survey.gzip_body if use_gzip else survey.body, headers
+
+    async def stats_snapshot(self, scope, name):
+        # 신선한 스냅샷만 여기서 바로 응답하고, 갱신이 필요하면 Flask 라우트(스냅샷 잠금/백그라운드 갱신)로 넘긴다
+        snapshot = self.snapshots.peek(name)
+        if snapshot is None:
+            return None
+        return 200, snapshot.body, snapshot_headers(self.snapshots, snapshot)
+
+
+def create_asgi_app(flask_app=None):
+    if WsgiToAsgi is None:
+        raise RuntimeError("ASGI 모드에는 asgiref 가 필요합니다. (pip install asgiref uvicorn aiomysql)")
+    if flask_app is None:
+        from app import create_app
+
+        flask_app = create_app()
+    return AsyncReadApp(flask_app)
@@ -0,0 +1,281 @@
+import gzip
+import hashlib
+import threading
+
+from flask import current_app
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.db_routing import read_after
+from app.models import Choices, Image, ImageStatus, Question
+from app.serialization import dumps, rows_as_dicts
+from app.variants import build_srcset
+from app.versioning import VersionStamp, stamp_path
+from config import db
+
+
+class SerializedPayload:
+    """한 번 직렬화한 JSON 본문과 gzip 압축본, ETag 를 함께 보관"""
+
+    def __init__(self, data):
+        self.body = dumps(data)
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        self.gzip_etag = f"{self.etag}-gz"
+
+
+class CatalogCache:
+    """
+    질문/선택지처럼 관리자가 수정할 때만 바뀌는 설문 데이터를 워커 메모리에 캐시한다.
+    수정 API 가 invalidate() 를 호출하면 공유 버전 스탬프가 바뀌고,
+    다른 워커들도 다음 조회 때 스탬프 변경을 보고 자기 캐시를 비운다.
+    """
+
+    def __init__(self, stamp, max_entries=1024):
+        self.stamp = stamp
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def lookup(self, key):
+        """
+        캐시 조회만 한다. 반환값: (찾았는지, 값, 조회 시점 버전)
+        못 찾은 경우 호출한 쪽이 값을 만든 뒤 그 버전으로 store() 한다. (async 라우트용)
+        """
+        version = self.stamp.current()
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            if key in self._entries:
+                self.hits += 1
+                return True, self._entries[key], version
+            self.misses += 1
+            return False, None, version
+
+    def store(self, key, version, value):
+        with self._lock:
+            # 로딩 중에 버전이 바뀌었으면 오래된 값일 수 있으니 저장하지 않는다
+            if value is not None and self._version == version and len(self._entries) < self.max_entries:
+                self._entries[key] = value
+
+    def get(self, key, loader):
+        found, value, version = self.lookup(key)
+        if found:
+            return value
+        # 방금 수정된 데이터를 아직 반영하지 못한 replica 에서 읽어 캐시에 오래 남기지 않도록
+        with read_after(version[1] / 1e9 if version else None):
+            value = loader()
+        self.store(key, version, value)
+        return value
+
+    def invalidate(self):
+        version = self.stamp.bump()
+        with self._lock:
+            self._entries.clear()
+            self._version = version
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+            }
+
+
+def init_app(application):
+    application.extensions["catalog"] = CatalogCache(
+        VersionStamp(stamp_path(application, "catalog")),
+        max_entries=application.config.get("CATALOG_CACHE_MAX_ENTRIES", 1024),
+    )
+
+
+def get_catalog():
+    return current_app.extensions["catalog"]
+
+
+def invalidate_catalog():
+    get_catalog().invalidate()
+
+
+# 아래 쿼리/페이로드 함수는 Flask 라우트(동기 세션), app/asgi.py(async 세션), query_plan 검사(HOT_QUERIES)가 같이 사용한다
+
+# 선택지 응답에 들어가는 컬럼 (Choices.to_dict() 와 같은 키, ORM 객체 없이 튜플로 조회)
+CHOICE_COLUMNS = (
+    Choices.id,
+    Choices.content,
+    Choices.is_active,
+    Choices.sqe,
+    Choices.question_id,
+    Choices.created_at,
+    Choices.updated_at,
+)
+
+
+def active_choices_statement(question_id):
+    return select(*CHOICE_COLUMNS).filter_by(question_id=question_id, is_active=True).order_by(Choices.sqe)
+
+
+def question_statement(question_sqe):
+    return (
+        select(Question)
+        .options(joinedload(Question.image).selectinload(Image.variants))
+        .filter_by(sqe=question_sqe, is_active=True)
+        .limit(1)
+    )
+
+
+def active_question_count_statement():
+    return select(func.count(Question.id)).where(Question.is_active == True)
+
+
+def survey_questions_statement():
+    return (
+        select(Question)
+        .options(joinedload(Question.image).load_only(Image.url))
+        .filter_by(is_active=True)
+        .order_by(Question.sqe)
+    )
+
+
+def survey_choices_statement(question_ids):
+    return (
+        select(*CHOICE_COLUMNS)
+        .where(Choices.question_id.in_(question_ids))
+        .filter_by(is_active=True)
+        .order_by(Choices.question_id, Choices.sqe)
+    )
+
+
+def main_image_statement():
+    return (
+        select(Image)
+        .options(selectinload(Image.variants))
+        .filter_by(type=ImageStatus.main)
+        .order_by(Image.id.desc())
+        .limit(1)
+    )
+
+
+def question_order_statement():
+    return select(Question.id, Question.sqe).filter_by(is_active=True).order_by(Question.sqe)
+
+
+def active_choice_map_statement():
+    return select(Choices.id, Choices.question_id).filter_by(is_active=True)
+
+
+def build_question_payload(question, choices):
+    """choices: rows_as_dicts(active_choices_statement 결과)"""
+    return {
+        "id": question.id,
+        "title": question.title,
+        "image": question.image.url if question.image else None,
+        "srcset": build_srcset(question.image),
+        "choices": choices,
+    }
+
+
+def build_survey_payload(questions, choices):
+    """choices: rows_as_dicts(survey_choices_statement 결과)"""
+    choices_by_question = {question.id: [] for question in questions}
+    for choice in choices:
+        choices_by_question[choice["question_id"]].append(choice)
+
+    return SerializedPayload({
+        "total": len(questions),
+        "questions": [
+            {
+                "id": question.id,
+                "title": question.title,
+                "sqe": question.sqe,
+                "image": question.image.url if question.image else None,
+                "choices": choices_by_question[question.id],
+            }
+            for question in questions
+        ],
+    })
+
+
+def _load_active_choices(question_id):
+    return rows_as_dicts(db.session.execute(active_choices_statement(question_id)))
+
+
+def get_question_payload(question_sqe):
+    """sqe 기준 질문 1개 + 이미지 URL + 활성 선택지 목록 (없으면 None)"""
+
+    def load():
+        question = db.session.scalars(question_statement(question_sqe)).first()
+        if not question:
+            return None
+        return build_question_payload(question, _load_active_choices(question.id))
+
+    return get_catalog().get(("question", question_sqe), load)
+
+
+def get_main_image_payload():
+    """가장 최근 main 이미지의 URL + srcset (없으면 None)"""
+
+    def load():
+        image = db.session.scalars(main_image_statement()).first()
+        if not image:
+            return None
+        return {"image": image.url, "srcset": build_srcset(image)}
+
+    return get_catalog().get(("main_image",), load)
+
+
+def get_active_question_count():
+    return get_catalog().get(
+        ("question_count",), lambda: db.session.scalar(active_question_count_statement())
+    )
+
+
+def get_choices_payload(question_id):
+    return get_catalog().get(("choices", question_id), lambda: _load_active_choices(question_id))
+
+
+def get_question_order():
+    """활성 질문의 (question_id, sqe) 목록 (sqe 순, 이어서 응답하기 계산용)"""
+
+    def load():
+        rows = db.session.execute(question_order_statement()).all()
+        return [(question_id, sqe) for question_id, sqe in rows]
+
+    return get_catalog().get(("question_order",), load)
+
+
+def get_active_choice_map():
+    """활성 선택지 전체의 {choice_id: question_id} (submit 검증용, 쿼리 1번)"""
+
+    def load():
+        rows = db.session.execute(active_choice_map_statement()).all()
+        return {choice_id: question_id for choice_id, question_id in rows}
+
+    return get_catalog().get(("active_choices",), load)
+
+
+def get_survey_payload():
+    """
+    활성 질문 전체 + 이미지 URL + 선택지 목록을 한 번에 직렬화한 SerializedPayload
+    질문(이미지 join) 1번, 선택지 1번, 총 2번의 쿼리로 만든다.
+    """
+
+    def load():
+        questions = db.session.scalars(survey_questions_statement()).all()
+        choices = (
+            rows_as_dicts(db.session.execute(survey_choices_statement([question.id for question in questions])))
+            if questions else []
+        )
+        return build_survey_payload(questions, choices)
+
+    return get_catalog().get(("survey",), load)
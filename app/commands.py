@@ -0,0 +1,191 @@
+import click
+from flask.cli import AppGroup
+
+stats_cli = AppGroup("stats", help="통계 집계 테이블 관리 명령")
+catalog_cli = AppGroup("catalog", help="질문/선택지 카탈로그 캐시 관리 명령")
+check_cli = AppGroup("check", help="CI 용 점검 명령")
+export_cli = AppGroup("export", help="분석용 데이터 내보내기 명령")
+
+
+@stats_cli.command("rebuild-tallies")
+@click.option("--dry-run", is_flag=True, help="차이만 출력하고 반영하지 않음")
+def rebuild_tallies_command(dry_run):
+    """answers/users 를 다시 집계해 모든 집계 테이블을 재구성/보정한다."""
+    from app.tallies import rebuild_tallies
+
+    action = "발견" if dry_run else "보정"
+    for table, diffs in rebuild_tallies(dry_run=dry_run).items():
+        for key, before, after in diffs:
+            key = ", ".join(str(getattr(value, "value", value)) for value in key)
+            click.echo(f"{table} ({key}): {before} -> {after}")
+        click.echo(f"{table}: {len(diffs)}개 집계 불일치 {action}")
+
+
+@stats_cli.command("compact-timeseries")
+@click.option("--reset", is_flag=True, help="기존 롤업을 지우고 answers 처음부터 다시 집계")
+@click.option("--safety-lag", type=int, default=None, help="이 초보다 최근 응답은 다음 작업으로 미룸 (기본: TIMESERIES_SAFETY_LAG)")
+def compact_timeseries_command(reset, safety_lag):
+    """watermark 이후의 응답을 시간대별(hour/day) 롤업에 반영한다. (cron 으로 주기 실행)"""
+    from flask import current_app
+
+    from app.timeseries import compact_answer_timeseries, reset_answer_timeseries
+
+    if reset:
+        reset_answer_timeseries()
+        click.echo("시간대별 롤업을 초기화했습니다.")
+
+    config = current_app.config
+    processed = compact_answer_timeseries(
+        batch_size=config.get("TIMESERIES_BATCH_SIZE", 50000),
+        safety_lag=config.get("TIMESERIES_SAFETY_LAG", 60) if safety_lag is None else safety_lag,
+    )
+    click.echo(f"응답 {processed}건을 시간대별 롤업에 반영했습니다.")
+
+
+@stats_cli.command("reconcile-counters")
+@click.option("--force", is_flag=True, help="두 번 연속 확인하지 않고 모든 차이를 바로 보정 (rebuild-tallies 직후 등)")
+def reconcile_counters_command(force):
+    """응답 수 공유 배열(answer_counts.bin)을 choice_tallies 와 대조해서 보정한다."""
+    from app.shared_counters import get_shared_counters
+
+    counters = get_shared_counters()
+    if counters is None:
+        raise click.ClickException("SHARED_COUNTERS_ENABLED 설정이 꺼져 있습니다.")
+    corrected = counters.reconcile(force=force)
+    if corrected is None:
+        click.echo("다른 워커가 대조 중입니다.")
+        return
+    click.echo(f"선택지 {corrected}개 응답 수를 보정했습니다.")
+
+
+@catalog_cli.command("invalidate")
+def invalidate_catalog_command():
+    """DB 를 직접 수정한 뒤 모든 워커의 카탈로그 캐시를 비우고 HTTP 응답 ETag 를 바꾼다."""
+    from app.catalog import invalidate_catalog
+    from app.http_cache import bump_table_versions
+
+    invalidate_catalog()
+    bump_table_versions()
+    click.echo("카탈로그 캐시 버전과 HTTP 응답 ETag 가 갱신되었습니다.")
+
+
+@check_cli.command("query-plans")
+@click.option("--sqlite", is_flag=True, help="설정된 DB 대신 모델 스키마로 만든 임시 SQLite DB 에서 검사")
+def check_query_plans_command(sqlite):
+    """주요 라우트 쿼리를 EXPLAIN 해서 전체 테이블 스캔이 있으면 실패(exit 1)한다."""
+    from sqlalchemy import create_engine
+
+    from app.query_plans import check_query_plans
+    from config import db
+
+    if sqlite:
+        engine = create_engine("sqlite://")
+        db.metadata.create_all(engine)
+    else:
+        engine = db.engine
+
+    with engine.connect() as connection:
+        results = check_query_plans(connection)
+
+    for name, details, ok in results:
+        click.echo(f"[{'OK' if ok else 'FULL SCAN'}] {name}")
+        for detail in details:
+            click.echo(f"    {detail}")
+
+    failed = [name for name, _, ok in results if not ok]
+    if failed:
+        click.echo(f"전체 스캔으로 실행되는 쿼리 {len(failed)}개: {', '.join(failed)}")
+        raise SystemExit(1)
+    click.echo(f"쿼리 {len(results)}개 모두 인덱스를 사용합니다.")
+
+
+@check_cli.command("query-budgets")
+@click.option("--repeat-threshold", type=int, default=None, help="같은 형태의 SQL 이 이 횟수 이상이면 N+1 로 판단 (기본: QUERY_AUDIT_REPEAT_THRESHOLD)")
+def check_query_budgets_command(repeat_threshold):
+    """QUERY_BUDGETS 의 GET 엔드포인트를 캐시를 비운 상태로 호출해서 SQL 수가 예산을 넘거나 N+1 이 있으면 실패(exit 1)한다."""
+    from flask import current_app
+
+    from app.catalog import invalidate_catalog
+    from app.progress import get_user_progress
+    from app.query_audit import check_query_budgets
+
+    def clear_worker_caches():
+        # 캐시가 채워진 상태로 재면 이전 호출 덕분에 SQL 수가 적게 나오므로 엔드포인트마다 워커 캐시를 모두 비운다
+        invalidate_catalog()
+        get_user_progress().clear()
+
+    config = current_app.config
+    if repeat_threshold is None:
+        repeat_threshold = config.get("QUERY_AUDIT_REPEAT_THRESHOLD", 5)
+    results = check_query_budgets(
+        current_app.test_client(), config.get("QUERY_BUDGETS", {}), repeat_threshold,
+        current_app.url_map, before_each=clear_worker_caches,
+    )
+
+    for endpoint, path, status, count, problems in results:
+        click.echo(f"[{'FAIL' if problems else 'OK'}] {endpoint} GET {path} -> {status}, SQL {count}개")
+        for problem in problems:
+            click.echo(f"    {problem}")
+
+    failed = [endpoint for endpoint, _, _, _, problems in results if problems]
+    if failed:
+        click.echo(f"쿼리 예산을 넘은 엔드포인트 {len(failed)}개: {', '.join(failed)}")
+        raise SystemExit(1)
+    click.echo(f"엔드포인트 {len(results)}개 모두 쿼리 예산 안에서 실행됩니다.")
+
+
+@export_cli.command("answers")
+@click.option("--output", default=None, help="내보낼 폴더 (기본: EXPORT_DIR)")
+@click.option("--name", default="default", show_default=True, help="watermark 이름 (내보내기 작업별로 따로 관리)")
+@click.option("--format", "fmt", type=click.Choice(["auto", "parquet", "csv"]), default="auto", show_default=True,
+              help="auto 는 pyarrow 가 있으면 parquet, 없으면 gzip CSV")
+@click.option("--full", is_flag=True, help="watermark 를 무시하고 처음부터 내보냄")
+@click.option("--source", type=click.Choice(["replica", "primary"]), default="replica", show_default=True,
+              help="replica 가 설정되어 있고 사용할 수 있으면 replica 에서 읽음")
+def export_answers_command(output, name, fmt, full, source):
+    """마지막으로 내보낸 answers.id 이후의 응답을 columnar 파일로 내보낸다. (nightly cron 용)"""
+    from flask import current_app
+
+    from app.db_routing import get_replica_router
+    from app.export import export_incremental
+
+    config = current_app.config
+    bind = None
+    router = get_replica_router()
+    if router is not None and source == "replica":
+        router.check()
+        replica = router.choose()
+        if replica is not None:
+            bind = replica.engine
+            click.echo(f"{replica.name} 에서 읽습니다.")
+        else:
+            click.echo("사용할 수 있는 replica 가 없어 primary 에서 읽습니다.")
+
+    try:
+        summary = export_incremental(
+            output or config.get("EXPORT_DIR", "./var/exports"),
+            name=name,
+            fmt=fmt,
+            full=full,
+            chunk_size=config.get("EXPORT_CHUNK_SIZE", 50000),
+            safety_lag=config.get("EXPORT_SAFETY_LAG", 60),
+            bind=bind,
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    if not summary["rows"]:
+        click.echo(f"answers.id {summary['after_id']} 이후 새 응답이 없습니다.")
+        return
+    click.echo(
+        f"응답 {summary['rows']}건 (id {summary['first_answer_id']}~{summary['last_answer_id']}) → {summary['path']}"
+    )
+    if summary.get("watermark_conflict"):
+        raise click.ClickException("다른 내보내기 작업이 watermark 를 먼저 옮겨서 갱신하지 않았습니다.")
+
+
+def register_commands(application):
+    application.cli.add_command(stats_cli)
+    application.cli.add_command(catalog_cli)
+    application.cli.add_command(check_cli)
+    application.cli.add_command(export_cli)
@@ -0,0 +1,295 @@
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, exc, text
+
+from config import db
+
+logger = logging.getLogger(__name__)
+
+BALANCING = ("round_robin", "least_connections")
+# 쓰기 직후 같은 클라이언트의 읽기를 primary 로 보내는 기한을 저장하는 쿠키 (쓰기 요청 응답에만 설정)
+STICKY_COOKIE = "db_primary_until"
+# MySQL 복제 지연 조회 (8.0.22+ 는 REPLICA, 이전 버전은 SLAVE)
+MYSQL_LAG_QUERIES = (
+    ("SHOW REPLICA STATUS", "Seconds_Behind_Source"),
+    ("SHOW SLAVE STATUS", "Seconds_Behind_Master"),
+)
+
+
+class Replica:
+    """읽기 전용 복제 DB 하나의 엔진과 상태 (상태 확인 전까지는 사용하지 않는다)"""
+
+    def __init__(self, name, engine):
+        self.name = name
+        self.engine = engine
+        self.healthy = False
+        self.lag = None
+        self.error = None
+        self.checked_at = None
+
+    def connections(self):
+        pool = self.engine.pool
+        return pool.checkedout() if hasattr(pool, "checkedout") else 0
+
+
+class ReplicaRouter:
+    """
+    읽기 전용 라우트를 replica 로 보내고, 지연되거나 연결이 안 되는 replica 는 빼고 고른다.
+    사용할 수 있는 replica 가 없으면 None → primary 사용
+    """
+
+    def __init__(self, replicas, balancing="round_robin", max_lag=5, lag_query=None, health_interval=5):
+        if balancing not in BALANCING:
+            raise ValueError(f"REPLICA_BALANCING 은 {BALANCING} 중 하나여야 합니다: {balancing}")
+        self.replicas = replicas
+        self.balancing = balancing
+        self.max_lag = max_lag
+        self.lag_query = lag_query
+        self.health_interval = health_interval
+        self._counter = itertools.count()
+        self._health_pid = None
+        self._health_lock = threading.Lock()
+        self.routed = {replica.name: 0 for replica in replicas}
+        self.fallbacks = 0
+
+    def start_health_checks(self):
+        """워커(프로세스)마다 한 번 health_interval 초마다 check() 하는 스레드를 시작한다. (fork 이후에 호출)"""
+        if self._health_pid == os.getpid():
+            return
+        with self._health_lock:
+            if self._health_pid == os.getpid():
+                return
+
+            def run():
+                while True:
+                    try:
+                        self.check()
+                    except Exception:
+                        logger.exception("replica 상태 확인 실패")
+                    time.sleep(self.health_interval)
+
+            threading.Thread(target=run, name="replica-health", daemon=True).start()
+            self._health_pid = os.getpid()
+
+    def caught_up(self, changed_at):
+        """changed_at(epoch 초, 바뀐 적이 없으면 None)의 변경이 replica 에 반영되었다고 볼 수 있는지 (허용 지연 기준)"""
+        return changed_at is None or time.time() - changed_at > self.max_lag
+
+    def choose(self):
+        candidates = [replica for replica in self.replicas if replica.healthy]
+        if not candidates:
+            self.fallbacks += 1
+            return None
+        if self.balancing == "least_connections":
+            replica = min(candidates, key=Replica.connections)
+        else:
+            replica = candidates[next(self._counter) % len(candidates)]
+        self.routed[replica.name] += 1
+        return replica
+
+    def _measure_lag(self, connection):
+        """복제 지연(초). 복제가 멈췄으면 None"""
+        if self.lag_query:
+            return connection.execute(text(self.lag_query)).scalar()
+        if connection.dialect.name != "mysql":
+            # 로컬 SQLite 등 복제 상태를 알 수 없는 DB 는 연결만 확인 (REPLICA_LAG_QUERY 로 지정 가능)
+            connection.execute(text("SELECT 1"))
+            return 0
+        for query, column in MYSQL_LAG_QUERIES:
+            try:
+                row = connection.execute(text(query)).mappings().first()
+            except exc.ProgrammingError:
+                continue
+            if row is None:
+                # 복제 설정이 없는 DB (로컬 MySQL 컨테이너 두 개로 시험하는 경우)
+                return 0
+            return row.get(column)
+        return 0
+
+    def check(self):
+        for replica in self.replicas:
+            was_healthy = replica.healthy
+            try:
+                with replica.engine.connect() as connection:
+                    lag = self._measure_lag(connection)
+            except Exception as e:
+                replica.healthy, replica.lag, replica.error = False, None, str(e)
+            else:
+                replica.lag = lag
+                replica.healthy = lag is not None and lag <= self.max_lag
+                replica.error = None if replica.healthy else "복제 지연" if lag is not None else "복제 중단"
+            replica.checked_at = time.time()
+            # 상태가 바뀔 때만 기록
+            if was_healthy and not replica.healthy:
+                logger.warning("replica %s 제외: %s", replica.name, replica.error)
+            elif replica.healthy and not was_healthy:
+                logger.info("replica %s 사용 (지연 %s초)", replica.name, replica.lag)
+
+    def mark_down(self, replica, error):
+        replica.healthy = False
+        replica.error = str(error)
+
+    def stats(self):
+        return {
+            "balancing": self.balancing,
+            "max_lag": self.max_lag,
+            "fallbacks": self.fallbacks,
+            "replicas": [
+                {
+                    "name": replica.name,
+                    "url": replica.engine.url.render_as_string(hide_password=True),
+                    "healthy": replica.healthy,
+                    "lag": replica.lag,
+                    "error": replica.error,
+                    "checked_at": replica.checked_at,
+                    "connections": replica.connections(),
+                    "routed": self.routed[replica.name],
+                }
+                for replica in self.replicas
+            ],
+        }
+
+
+class RoutingSession(Session):
+    """
+    요청에서 replica 를 골랐으면(g.db_replica) 읽기 쿼리를 그 엔진으로 보낸다.
+    flush 와 INSERT/UPDATE/DELETE 문, 요청 밖(백그라운드 스레드, CLI)의 쿼리는 항상 primary 를 사용한다.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not getattr(clause, "is_dml", False):
+            replica = _request_replica()
+            if replica is not None:
+                return replica.engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def sticky_to_primary(cookie_value):
+    """STICKY_COOKIE 값(쓰기 후 primary 에서 읽을 기한)이 아직 지나지 않았는지"""
+    try:
+        return float(cookie_value or 0) > time.time()
+    except ValueError:
+        return False
+
+
+def _request_replica():
+    if not has_request_context() or g.get("db_use_primary"):
+        return None
+    return g.get("db_replica")
+
+
+@contextmanager
+def read_after(changed_at):
+    """
+    changed_at(epoch 초, 바뀐 적이 없으면 None)에 바뀐 데이터를 읽는 구간
+    replica 허용 지연(REPLICA_MAX_LAG)보다 최근 변경이면 replica 에 아직 반영되지 않았을 수 있으므로 primary 를 사용한다.
+    (카탈로그 캐시처럼 읽은 값을 오래 보관하는 곳에서 사용)
+    """
+    router = get_replica_router() if has_request_context() else None
+    if router is None or g.get("db_use_primary") or router.caught_up(changed_at):
+        yield
+        return
+    g.db_use_primary = True
+    try:
+        yield
+    finally:
+        g.db_use_primary = False
+
+
+def configure_binds(application):
+    """
+    REPLICA_DATABASE_URIS 를 SQLALCHEMY_BINDS(replica_0, replica_1, ...) 로 등록한다. (db.init_app 전에 호출)
+    모델에는 bind_key 가 없으므로 create_all/마이그레이션은 그대로 primary 에만 적용된다.
+    """
+    uris = application.config.get("REPLICA_DATABASE_URIS") or []
+    options = dict(application.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+    # 내려간 replica 의 끊긴 커넥션은 꺼낼 때 확인해서 버린다
+    options.setdefault("pool_pre_ping", True)
+    binds = dict(application.config.get("SQLALCHEMY_BINDS") or {})
+    for index, uri in enumerate(uris):
+        binds[f"replica_{index}"] = {"url": uri, **options}
+    application.config["SQLALCHEMY_BINDS"] = binds
+
+
+def init_app(application):
+    """
+    REPLICA_DATABASE_URIS 가 있으면 REPLICA_READ_BLUEPRINTS 의 GET 요청을 replica 로 보낸다. (db.init_app 이후에 호출)
+    - 같은 클라이언트(STICKY_COOKIE 쿠키)가 쓰기 요청을 한 뒤 REPLICA_STICKY_SECONDS 동안은 primary 에서 읽는다.
+    - 워커마다 REPLICA_HEALTH_INTERVAL 초마다 연결/복제 지연을 확인해서 REPLICA_MAX_LAG 를 넘거나
+      연결이 안 되는 replica 는 뺀다. (쿼리 중 연결 오류가 나도 바로 빼고 다음 요청부터 primary 사용)
+    """
+    uris = application.config.get("REPLICA_DATABASE_URIS") or []
+    if not uris:
+        return
+
+    # db = SQLAlchemy() 는 config.py 에 있어 생성 시점에 session 클래스를 넘길 수 없으므로 여기서 교체
+    db.session.session_factory.class_ = RoutingSession
+
+    with application.app_context():
+        replicas = [Replica(f"replica_{index}", db.engines[f"replica_{index}"]) for index in range(len(uris))]
+    router = ReplicaRouter(
+        replicas,
+        balancing=application.config.get("REPLICA_BALANCING", "round_robin"),
+        max_lag=application.config.get("REPLICA_MAX_LAG", 5),
+        lag_query=application.config.get("REPLICA_LAG_QUERY"),
+        health_interval=application.config.get("REPLICA_HEALTH_INTERVAL", 5),
+    )
+    application.extensions["replica_router"] = router
+
+    for replica in replicas:
+        def on_error(context, replica=replica):
+            if isinstance(context.sqlalchemy_exception, exc.OperationalError):
+                router.mark_down(replica, context.original_exception)
+
+        event.listen(replica.engine, "handle_error", on_error)
+
+    @event.listens_for(RoutingSession, "after_flush")
+    def remember_flush(db_session, flush_context):
+        if has_request_context():
+            g.db_wrote = True
+
+    @event.listens_for(RoutingSession, "do_orm_execute")
+    def remember_dml(orm_execute_state):
+        if has_request_context() and (
+            orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete
+        ):
+            g.db_wrote = True
+
+    read_blueprints = set(application.config.get("REPLICA_READ_BLUEPRINTS", ()))
+    sticky_seconds = application.config.get("REPLICA_STICKY_SECONDS", 5)
+    sticky_samesite = application.config.get("REPLICA_STICKY_COOKIE_SAMESITE", "Lax")
+    sticky_secure = application.config.get("REPLICA_STICKY_COOKIE_SECURE", False)
+    @application.before_request
+    def route_reads():
+        router.start_health_checks()
+        if request.method not in ("GET", "HEAD") or request.blueprint not in read_blueprints:
+            return
+        # Flask session 을 읽으면 모든 응답에 Vary: Cookie 가 붙어 프록시 캐시를 못 쓰므로 별도 쿠키를 직접 읽는다
+        if sticky_to_primary(request.cookies.get(STICKY_COOKIE)):
+            return
+        replica = router.choose()
+        if replica is not None:
+            g.db_replica = replica
+
+    @application.after_request
+    def stick_to_primary(response):
+        # 쓰기 요청에만 쿠키를 설정한다 (GET 응답은 쿠키 없이 캐시될 수 있게)
+        if g.get("db_wrote") and request.method not in ("GET", "HEAD"):
+            response.set_cookie(
+                STICKY_COOKIE, f"{time.time() + sticky_seconds:.3f}", max_age=sticky_seconds,
+                httponly=True, samesite=sticky_samesite, secure=sticky_secure,
+            )
+        if g.get("db_replica") is not None:
+            response.headers["X-DB-Route"] = g.db_replica.name
+        return response
+
+
+def get_replica_router():
+    return current_app.extensions.get("replica_router")
@@ -0,0 +1,384 @@
+import csv
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import insert, select, update
+
+from app.db_routing import get_replica_router
+from app.models import KST, AgeStatus, Answer, Choices, GenderStatus, Question, RollupWatermark, User
+from app.timeseries import to_kst
+from config import db
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow 가 없으면 gzip CSV 로만 내보냄
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+# 분석용 내보내기 컬럼 (질문 제목/선택지 내용 같은 텍스트는 행마다 반복되지 않도록 id/sqe 만 포함)
+EXPORT_COLUMNS = (
+    "answer_id", "answered_at", "user_id", "age", "gender",
+    "question_id", "question_sqe", "choice_id", "choice_sqe",
+)
+# Enum 컬럼은 고정된 사전(dictionary)으로 인코딩해서 모든 row group 이 같은 코드 값을 쓰게 한다
+ENUM_DICTIONARIES = {
+    "age": [status.value for status in AgeStatus],
+    "gender": [status.value for status in GenderStatus],
+}
+WATERMARK_PREFIX = "export:"
+
+
+def answers_export_statement(after_id, until_id=None, limit=None):
+    """answers.id 기준 keyset 페이지 (users 인구통계, choices/questions 순서 정보 join)"""
+    stmt = (
+        select(
+            Answer.id.label("answer_id"),
+            Answer.created_at.label("answered_at"),
+            Answer.user_id,
+            User.age,
+            User.gender,
+            Choices.question_id,
+            Question.sqe.label("question_sqe"),
+            Answer.choice_id,
+            Choices.sqe.label("choice_sqe"),
+        )
+        .outerjoin(User, User.id == Answer.user_id)
+        .outerjoin(Choices, Choices.id == Answer.choice_id)
+        .outerjoin(Question, Question.id == Choices.question_id)
+        .where(Answer.id > after_id)
+        .order_by(Answer.id)
+    )
+    if until_id is not None:
+        stmt = stmt.where(Answer.id <= until_id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+class ParquetExportWriter:
+    """chunk 마다 row group 하나씩 쓰는 Parquet writer (zstd 압축)"""
+
+    extension = "parquet"
+    mimetype = "application/vnd.apache.parquet"
+
+    def __init__(self, path, compression="zstd"):
+        self.schema = pa.schema([
+            ("answer_id", pa.int64()),
+            ("answered_at", pa.timestamp("us", tz="Asia/Seoul")),
+            ("user_id", pa.int64()),
+            ("age", pa.dictionary(pa.int8(), pa.string())),
+            ("gender", pa.dictionary(pa.int8(), pa.string())),
+            ("question_id", pa.int64()),
+            ("question_sqe", pa.int32()),
+            ("choice_id", pa.int64()),
+            ("choice_sqe", pa.int32()),
+        ])
+        self._dictionaries = {column: pa.array(values) for column, values in ENUM_DICTIONARIES.items()}
+        self._codes = {
+            column: {value: code for code, value in enumerate(values)} for column, values in ENUM_DICTIONARIES.items()
+        }
+        self._writer = pq.ParquetWriter(path, self.schema, compression=compression)
+
+    def write(self, columns):
+        arrays = []
+        for field in self.schema:
+            values = columns[field.name]
+            if field.name in self._codes:
+                codes = self._codes[field.name]
+                indices = pa.array([None if value is None else codes[value] for value in values], pa.int8())
+                arrays.append(pa.DictionaryArray.from_arrays(indices, self._dictionaries[field.name]))
+            else:
+                arrays.append(pa.array(values, field.type))
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+
+
+class CsvExportWriter:
+    """gzip 압축 CSV (pyarrow 가 없을 때)"""
+
+    extension = "csv.gz"
+    mimetype = "application/gzip"
+
+    def __init__(self, path):
+        self._file = gzip.open(path, "wt", encoding="utf-8", newline="", compresslevel=6)
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(EXPORT_COLUMNS)
+
+    def write(self, columns):
+        answered_at = [value.isoformat() for value in columns["answered_at"]]
+        self._writer.writerows(zip(*(
+            answered_at if column == "answered_at" else columns[column] for column in EXPORT_COLUMNS
+        )))
+
+    def close(self):
+        self._file.close()
+
+
+FORMATS = {"parquet": ParquetExportWriter, "csv": CsvExportWriter}
+
+
+def resolve_format(name="auto"):
+    if name == "auto":
+        return "parquet" if pq is not None else "csv"
+    if name not in FORMATS:
+        raise ValueError(f"format 은 auto, {', '.join(FORMATS)} 중 하나여야 합니다: {name}")
+    if name == "parquet" and pq is None:
+        raise ValueError("Parquet 로 내보내려면 pyarrow 를 설치해야 합니다.")
+    return name
+
+
+def _columns(rows):
+    columns = {column: [] for column in EXPORT_COLUMNS}
+    for row in rows:
+        columns["answer_id"].append(row.answer_id)
+        columns["answered_at"].append(to_kst(row.answered_at))
+        columns["user_id"].append(row.user_id)
+        columns["age"].append(row.age.value if row.age is not None else None)
+        columns["gender"].append(row.gender.value if row.gender is not None else None)
+        columns["question_id"].append(row.question_id)
+        columns["question_sqe"].append(row.question_sqe)
+        columns["choice_id"].append(row.choice_id)
+        columns["choice_sqe"].append(row.choice_sqe)
+    return columns
+
+
+def export_answers(path, fmt="auto", after_id=0, until_id=None, max_rows=None,
+                   chunk_size=50000, yield_per=5000, safety_lag=60, bind=None):
+    """
+    answers.id > after_id 인 응답을 chunk_size 건씩 keyset 으로 읽어 path 에 columnar 파일로 쓴다.
+    - chunk 마다 새 연결/짧은 트랜잭션에서 server-side cursor(stream_results) 로 yield_per 건씩 읽어서
+      긴 트랜잭션이나 결과 전체 버퍼링 없이 진행한다.
+    - safety_lag 초보다 최근 응답은 아직 커밋되지 않은 앞 번호 id 가 있을 수 있으므로 그 앞에서 멈춘다.
+    - bind 가 없으면 현재 세션의 엔진(요청 안에서는 replica 일 수 있음)을 사용한다.
+    파일은 임시 파일에 쓴 뒤 교체하며, 내보낼 응답이 없으면 만들지 않는다.
+    반환값: {"path", "format", "rows", "first_answer_id", "last_answer_id"}
+    """
+    fmt = resolve_format(fmt)
+    engine = bind if bind is not None else db.session.get_bind()
+    cutoff = datetime.now(tz=KST) - timedelta(seconds=safety_lag)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    writer = None
+    summary = {"path": None, "format": fmt, "rows": 0, "first_answer_id": None, "last_answer_id": None}
+    last_id = after_id
+    try:
+        while max_rows is None or summary["rows"] < max_rows:
+            limit = chunk_size if max_rows is None else min(chunk_size, max_rows - summary["rows"])
+            with engine.connect() as connection:
+                result = connection.execution_options(stream_results=True, yield_per=yield_per).execute(
+                    answers_export_statement(last_id, until_id, limit)
+                )
+                rows = []
+                reached_cutoff = False
+                for row in result:
+                    if to_kst(row.answered_at) > cutoff:
+                        reached_cutoff = True
+                        break
+                    rows.append(row)
+                result.close()
+
+            if rows:
+                if writer is None:
+                    writer = FORMATS[fmt](tmp_path)
+                writer.write(_columns(rows))
+                last_id = rows[-1].answer_id
+                summary["rows"] += len(rows)
+                summary["first_answer_id"] = summary["first_answer_id"] or rows[0].answer_id
+                summary["last_answer_id"] = last_id
+            if reached_cutoff or len(rows) < limit:
+                break
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    if writer is not None:
+        writer.close()
+        os.replace(tmp_path, path)
+        summary["path"] = path
+    return summary
+
+
+def get_export_watermark(name):
+    return db.session.scalar(
+        select(RollupWatermark.last_answer_id).where(RollupWatermark.name == f"{WATERMARK_PREFIX}{name}")
+    ) or 0
+
+
+def _advance_export_watermark(name, expected, last_answer_id):
+    """다른 내보내기가 그 사이에 watermark 를 옮겼으면 False (compare-and-set)"""
+    watermark_name = f"{WATERMARK_PREFIX}{name}"
+    if expected == 0 and db.session.scalar(
+        select(RollupWatermark.id).where(RollupWatermark.name == watermark_name)
+    ) is None:
+        db.session.execute(insert(RollupWatermark).values(name=watermark_name, last_answer_id=last_answer_id))
+        db.session.commit()
+        return True
+    updated = db.session.execute(
+        update(RollupWatermark)
+        .where(RollupWatermark.name == watermark_name, RollupWatermark.last_answer_id == expected)
+        .values(last_answer_id=last_answer_id, updated_at=datetime.now(tz=KST))
+    ).rowcount
+    db.session.commit()
+    return updated == 1
+
+
+def export_incremental(folder, name="default", fmt="auto", full=False, **options):
+    """
+    이름별 watermark(rollup_watermarks 의 "export:<name>" 행) 이후의 응답만 folder 에 새 파일로 내보낸 뒤 watermark 를 옮긴다.
+    (nightly 작업이 새 응답만 읽도록) full=True 면 처음부터 내보내고 watermark 를 다시 설정한다.
+    """
+    fmt = resolve_format(fmt)
+    after_id = 0 if full else get_export_watermark(name)
+    db.session.rollback()  # watermark 조회 트랜잭션을 내보내는 동안 열어두지 않는다
+
+    stamp = datetime.now(tz=KST).strftime("%Y%m%dT%H%M%S")
+    path = os.path.join(folder, name, f"answers-{stamp}-after-{after_id}.{FORMATS[fmt].extension}")
+    summary = export_answers(path, fmt, after_id=after_id, **options)
+    if summary["rows"]:
+        expected = get_export_watermark(name) if full else after_id
+        if not _advance_export_watermark(name, expected, summary["last_answer_id"]):
+            logger.warning("다른 내보내기 작업이 watermark 를 먼저 옮겼습니다: %s", name)
+            summary["watermark_conflict"] = True
+    summary["after_id"] = after_id
+    return summary
+
+
+class ExportJobs:
+    """
+    /stats/export/answers API 의 내보내기를 요청 스레드가 아닌 백그라운드 스레드에서 실행하고 상태를 파일로 남긴다.
+    - 상태: <folder>/<job_id>.json (running → done / empty / failed), 결과: <folder>/<job_id>.<확장자>
+    - 어느 워커로 조회가 들어와도 같은 상태를 읽을 수 있고, 실행하던 워커가 죽은 running 작업은 failed 로 보여준다.
+    - 워커마다 동시에 하나만 실행하고, ttl 초가 지난 상태/결과 파일은 새 작업을 시작할 때 지운다.
+    """
+
+    def __init__(self, application, folder, ttl):
+        self.app = application
+        self.folder = folder
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._running = None
+
+    def _path(self, job_id, extension="json"):
+        return os.path.join(self.folder, f"{job_id}.{extension}")
+
+    def _write(self, job):
+        path = self._path(job["job_id"])
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def _cleanup(self):
+        """ttl 초 동안 바뀌지 않은 파일 삭제 (오래 걸리는 running 작업의 상태 파일은 남긴다)"""
+        cutoff = time.time() - self.ttl
+        for entry in os.scandir(self.folder):
+            try:
+                if not entry.is_file() or entry.stat().st_mtime >= cutoff:
+                    continue
+                job_id, _, extension = entry.name.partition(".")
+                if extension == "json" and (self.get(job_id) or {}).get("status") == "running":
+                    continue
+                os.remove(entry.path)
+            except (FileNotFoundError, ValueError):
+                continue
+
+    def get(self, job_id):
+        """작업 상태 dict (없으면 None)"""
+        try:
+            with open(self._path(job_id), encoding="utf-8") as f:
+                job = json.load(f)
+        except FileNotFoundError:
+            return None
+        if job["status"] == "running" and not _is_alive(job["pid"]):
+            job.update(status="failed", error="내보내기를 실행하던 워커가 종료되었습니다.")
+        return job
+
+    def file_path(self, job):
+        return self._path(job["job_id"], FORMATS[job["format"]].extension)
+
+    def start(self, fmt, after_id, max_rows, chunk_size, safety_lag):
+        """
+        내보내기 작업을 시작하고 상태 dict 를 반환 (이 워커에서 이미 실행 중이면 None)
+        replica 가 설정되어 있으면 시작할 때 고른 replica 에서 읽는다.
+        """
+        with self._lock:
+            if self._running is not None:
+                return None
+            job_id = uuid.uuid4().hex
+            self._running = job_id
+
+        os.makedirs(self.folder, exist_ok=True)
+        self._cleanup()
+        router = get_replica_router()
+        replica = router.choose() if router is not None else None
+        job = {
+            "job_id": job_id, "status": "running", "pid": os.getpid(),
+            "format": fmt, "after_id": after_id, "max_rows": max_rows,
+            "rows": 0, "first_answer_id": None, "last_answer_id": None, "error": None,
+            "created_at": time.time(), "finished_at": None,
+        }
+        self._write(job)
+
+        def run():
+            try:
+                with self.app.app_context():
+                    try:
+                        summary = export_answers(
+                            self.file_path(job), fmt, after_id=after_id, max_rows=max_rows,
+                            chunk_size=chunk_size, safety_lag=safety_lag,
+                            bind=replica.engine if replica is not None else None,
+                        )
+                    finally:
+                        db.session.remove()
+                job.update(
+                    status="done" if summary["rows"] else "empty", rows=summary["rows"],
+                    first_answer_id=summary["first_answer_id"], last_answer_id=summary["last_answer_id"],
+                )
+            except Exception as e:
+                logger.exception("응답 내보내기 작업 %s 실패", job_id)
+                job.update(status="failed", error=str(e))
+            finally:
+                job["finished_at"] = time.time()
+                self._write(job)
+                with self._lock:
+                    self._running = None
+
+        threading.Thread(target=run, name=f"export-{job_id}", daemon=True).start()
+        return job
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def init_app(application):
+    application.extensions["export_jobs"] = ExportJobs(
+        application,
+        os.path.join(application.config.get("EXPORT_DIR", "./var/exports"), "api"),
+        ttl=application.config.get("EXPORT_JOB_TTL", 3600),
+    )
+
+
+def get_export_jobs():
+    return current_app.extensions["export_jobs"]
@@ -0,0 +1,149 @@
+import hashlib
+import os
+
+from flask import current_app, g, request
+from sqlalchemy import event
+
+from app.db_routing import get_replica_router
+from app.versioning import VersionStamp
+from config import db
+
+# 엔드포인트별 응답 내용을 결정하는 테이블 (이 테이블에 쓰기가 커밋되면 ETag 가 바뀜)
+CACHED_ENDPOINTS = {
+    "questions.get_question_by_sqe": ("questions", "choices", "images", "image_variants"),
+    "questions.get_all_questions": ("questions", "choices", "images", "image_variants"),
+    "questions.question_count": ("questions",),
+    "choices.get_choices_by_question": ("choices",),
+    "image.list_images": ("images",),
+    "image.get_images_by_type": ("images",),
+    "image.get_main_image": ("images", "image_variants"),
+}
+TRACKED_TABLES = sorted({table for tables in CACHED_ENDPOINTS.values() for table in tables})
+
+# 세션 이벤트는 db.session(모든 앱이 공유) 에 등록하므로 한 번만 등록한다
+_session_events = {"registered": False}
+
+
+class TableVersions:
+    """
+    테이블별 공유 버전 스탬프 (STATE_DIR/tables/<테이블>.version)
+    세션이 TRACKED_TABLES 에 쓰고 커밋하면 그 테이블의 스탬프만 바뀌어 모든 워커의 ETag 가 함께 바뀐다.
+    """
+
+    def __init__(self, folder):
+        self.stamps = {table: VersionStamp(os.path.join(folder, f"{table}.version")) for table in TRACKED_TABLES}
+
+    def etag(self, tables):
+        """tables 스탬프 조합으로 만든 약한(weak) ETag 값과 가장 최근 변경 시각(epoch 초, 없으면 None)"""
+        versions = [self.stamps[table].current() for table in tables]
+        digest = hashlib.sha1(repr(versions).encode()).hexdigest()[:20]
+        changed_at = max((version[1] for version in versions if version), default=None)
+        return digest, changed_at / 1e9 if changed_at else None
+
+    def bump(self, tables):
+        for table in tables:
+            if table in self.stamps:
+                self.stamps[table].bump()
+
+
+def cache_control_header(config):
+    return (
+        f"public, max-age={config.get('HTTP_CACHE_MAX_AGE', 10)}, "
+        f"stale-while-revalidate={config.get('HTTP_CACHE_STALE_WHILE_REVALIDATE', 30)}"
+    )
+
+
+def _remember_tables(db_session, tables):
+    tables = {table for table in tables if table in TRACKED_TABLES}
+    if tables:
+        db_session.info.setdefault("http_cache_tables", set()).update(tables)
+
+
+def _register_session_events():
+    if _session_events["registered"]:
+        return
+    _session_events["registered"] = True
+
+    @event.listens_for(db.session, "after_flush")
+    def remember_flushed_tables(db_session, flush_context):
+        # after_flush 시점에도 new/dirty/deleted 는 flush 이전 상태를 가지고 있다
+        _remember_tables(
+            db_session,
+            (instance.__table__.name for instance in (*db_session.new, *db_session.dirty, *db_session.deleted)),
+        )
+
+    @event.listens_for(db.session, "do_orm_execute")
+    def remember_dml_tables(orm_execute_state):
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            table = getattr(orm_execute_state.statement, "table", None)
+            if table is not None:
+                _remember_tables(orm_execute_state.session, (table.name,))
+
+    @event.listens_for(db.session, "after_commit")
+    def bump_committed_tables(db_session):
+        tables = db_session.info.pop("http_cache_tables", None)
+        versions = current_app.extensions.get("table_versions")
+        if tables and versions is not None:
+            versions.bump(tables)
+
+    @event.listens_for(db.session, "after_rollback")
+    def forget_rolled_back_tables(db_session):
+        db_session.info.pop("http_cache_tables", None)
+
+
+def init_app(application):
+    """
+    CACHED_ENDPOINTS 의 GET 응답에 테이블 버전으로 만든 약한 ETag 와 Cache-Control/Vary 를 붙이고,
+    If-None-Match 가 맞으면 라우트(쿼리)를 실행하지 않고 304 를 반환한다. (db_routing.init_app 이후에 호출)
+    ASGI 모드(app/asgi.py)의 async 조회 경로도 같은 TableVersions/Cache-Control 을 사용한다.
+    nginx proxy_cache 가 max-age 동안 응답을 재사용하고, 그 뒤에는 If-None-Match 로 재검증한다. (scripts/form.conf)
+    """
+    application.extensions["table_versions"] = TableVersions(
+        os.path.join(application.config.get("STATE_DIR", "./var"), "tables")
+    )
+    _register_session_events()
+    if not application.config.get("HTTP_CACHE_ENABLED", True):
+        return
+    cache_control = cache_control_header(application.config)
+
+    @application.before_request
+    def check_not_modified():
+        tables = CACHED_ENDPOINTS.get(request.endpoint)
+        if tables is None or request.method not in ("GET", "HEAD"):
+            return None
+        etag, changed_at = get_table_versions().etag(tables)
+        g.http_cache_etag = etag
+
+        if request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+            response.set_etag(etag, weak=True)
+            response.headers["Cache-Control"] = cache_control
+            response.vary.add("Accept-Encoding")
+            return response
+
+        # 방금 바뀐 테이블을 replica 에서 읽어 오래된 내용에 새 ETag 가 붙지 않도록 primary 에서 읽는다
+        router = get_replica_router()
+        if router is not None and not router.caught_up(changed_at):
+            g.db_use_primary = True
+        return None
+
+    @application.after_request
+    def add_cache_headers(response):
+        etag = g.pop("http_cache_etag", None)
+        if etag is None or response.status_code not in (200, 304):
+            return response
+        # /questions/all 처럼 본문 해시로 직접 ETag 를 붙이는 라우트는 그대로 둔다
+        if "ETag" not in response.headers:
+            response.set_etag(etag, weak=True)
+        response.headers["Cache-Control"] = cache_control
+        response.vary.add("Accept-Encoding")
+        return response
+
+
+def get_table_versions():
+    return current_app.extensions["table_versions"]
+
+
+def bump_table_versions(tables=TRACKED_TABLES):
+    """DB 를 직접 수정한 경우 등 세션 밖에서 바뀐 테이블의 ETag 를 바꾼다."""
+    get_table_versions().bump(tables)
@@ -0,0 +1,163 @@
+import logging
+from datetime import datetime
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app.catalog import get_active_choice_map
+from app.models import KST, Answer, AnswerSubmission, User
+from app.progress import invalidate_user_progress
+from app.shared_counters import record_answer_counts
+from app.tallies import increment_choice_tallies, increment_demographic_tallies
+from config import db
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_MAX_LENGTH = 64
+
+
+class SubmissionError(ValueError):
+    """요청 본문이 잘못된 경우 (400 응답)"""
+
+
+def parse_answers(data):
+    """
+    [{ "user_id": 1, "choice_id": 2 }, ...] 형태를 검사해서
+    [{"user_id": 1, "choice_id": 2}, ...] (int 변환된 dict 목록) 로 반환
+    """
+    if not isinstance(data, list) or not data:
+        raise SubmissionError("응답 목록이 비어 있거나 배열 형식이 아닙니다.")
+
+    try:
+        return [{"user_id": int(i["user_id"]), "choice_id": int(i["choice_id"])} for i in data]
+    except (KeyError, TypeError, ValueError) as e:
+        raise SubmissionError(f"잘못된 응답 형식입니다: {e}")
+
+
+def validate_choices(rows):
+    """
+    모든 choice_id 가 활성 선택지인지 카탈로그(캐시, 미스 시 쿼리 1번)로 한 번에 검사
+    반환값: {choice_id: question_id}
+    """
+    active_choices = get_active_choice_map()
+    unknown = sorted({row["choice_id"] for row in rows} - active_choices.keys())
+    if unknown:
+        raise SubmissionError(f"존재하지 않거나 비활성화된 선택지입니다: {unknown}")
+    return {row["choice_id"]: active_choices[row["choice_id"]] for row in rows}
+
+
+def validate_users(rows):
+    """
+    모든 user_id 가 존재하는지 쿼리 1번으로 검사
+    (write-behind 모드는 DB 저장 전에 202 로 응답하므로, 저장할 수 없는 제출을 미리 걸러야 한다)
+    마지막에 rollback 해서 커넥션을 반납하므로 DB 를 읽는 다른 검사(validate_choices)보다 뒤에 호출한다.
+    """
+    user_ids = {row["user_id"] for row in rows}
+    existing = set(db.session.scalars(select(User.id).where(User.id.in_(user_ids))))
+    db.session.rollback()  # fsync 를 기다리는 동안 커넥션을 잡고 있지 않도록
+    unknown = sorted(user_ids - existing)
+    if unknown:
+        raise SubmissionError(f"존재하지 않는 사용자입니다: {unknown}")
+
+
+def validate_idempotency_key(key):
+    if key is not None and not 0 < len(key) <= IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise SubmissionError(f"Idempotency-Key 는 1~{IDEMPOTENCY_KEY_MAX_LENGTH}자여야 합니다.")
+    return key
+
+
+def insert_answers(rows, question_ids):
+    """
+    응답 행들을 ORM 객체 생성 없이 executemany(multi-row INSERT) 로 저장하고
+    선택지/인구통계 집계를 같은 트랜잭션에서 증가시킨다. commit 은 호출한 쪽에서 한다.
+    """
+    now = datetime.now(tz=KST)
+    db.session.execute(
+        insert(Answer),
+        [{**row, "created_at": now, "updated_at": now} for row in rows],
+    )
+    increment_choice_tallies([row["choice_id"] for row in rows], question_ids)
+    increment_demographic_tallies(rows, question_ids)
+
+
+def _after_commit(rows, question_ids):
+    """
+    커밋 후 공유 응답 수 증가/진행 캐시 무효화 (best-effort)
+    응답은 이미 저장됐으므로 실패해도 기록만 하고 성공으로 처리한다. (공유 응답 수는 다음 대조 때 보정)
+    """
+    record_answer_counts([row["choice_id"] for row in rows], question_ids)
+    try:
+        invalidate_user_progress(row["user_id"] for row in rows)
+    except Exception:
+        logger.exception("사용자 진행 캐시 무효화 실패")
+
+
+def submit_answers(rows, idempotency_key=None):
+    """
+    검증 → (멱등 키 기록) → 일괄 INSERT → commit
+    같은 멱등 키로 이미 저장된 요청이면 아무것도 저장하지 않고 False 반환
+    """
+    question_ids = validate_choices(rows)
+
+    if idempotency_key is not None:
+        # 멱등 키를 먼저 기록해서, 같은 키의 동시 재시도는 unique 제약에서 걸리게 한다
+        try:
+            db.session.execute(
+                insert(AnswerSubmission).values(
+                    idempotency_key=idempotency_key,
+                    user_id=rows[0]["user_id"],
+                    answer_count=len(rows),
+                )
+            )
+        except IntegrityError:
+            db.session.rollback()
+            return False
+
+    insert_answers(rows, question_ids)
+    db.session.commit()
+    _after_commit(rows, question_ids)
+    return True
+
+
+def existing_submission_keys_statement(keys):
+    return select(AnswerSubmission.idempotency_key).where(AnswerSubmission.idempotency_key.in_(keys))
+
+
+def write_submission_batch(records):
+    """
+    write-behind 버퍼에 쌓인 제출 여러 건을 한 트랜잭션으로 저장 (group commit)
+    records: [{"key": 멱등 키, "rows": [...], "question_ids": {...}}, ...]
+    이미 저장된 멱등 키는 건너뛰므로 같은 로그를 다시 재생해도 중복 저장되지 않는다.
+    반환값: 실제로 저장한 제출 건수
+    """
+    records = list({record["key"]: record for record in records}.values())
+    existing = set(db.session.scalars(existing_submission_keys_statement([record["key"] for record in records])))
+    records = [record for record in records if record["key"] not in existing]
+    if not records:
+        db.session.rollback()
+        return 0
+
+    now = datetime.now(tz=KST)
+    db.session.execute(
+        insert(AnswerSubmission),
+        [
+            {
+                "idempotency_key": record["key"],
+                "user_id": record["rows"][0]["user_id"],
+                "answer_count": len(record["rows"]),
+                "created_at": now,
+                "updated_at": now,
+            }
+            for record in records
+        ],
+    )
+
+    question_ids = {}
+    for record in records:
+        question_ids.update({int(choice_id): question_id for choice_id, question_id in record["question_ids"].items()})
+    rows = [row for record in records for row in record["rows"]]
+    insert_answers(rows, question_ids)
+
+    db.session.commit()
+    _after_commit(rows, question_ids)
+    return len(records)
@@ -0,0 +1,201 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from flask import current_app
+
+from app.shared_counters import load_choice_counts
+
+logger = logging.getLogger(__name__)
+
+
+class SubscriberDropped(Exception):
+    """느린 클라이언트라서 구독이 끊김"""
+
+
+class LiveStatsSubscriber:
+    """
+    SSE 연결 하나의 대기 이벤트 큐
+    보내지 못한 이벤트가 max_pending 개를 넘으면(느린 클라이언트) 큐를 비우고 연결을 끊는다.
+    """
+
+    def __init__(self, max_pending):
+        self.max_pending = max_pending
+        self.dropped = False
+        self._events = deque()
+        self._cond = threading.Condition()
+
+    def push(self, event):
+        with self._cond:
+            if self.dropped:
+                return False
+            if len(self._events) >= self.max_pending:
+                self.dropped = True
+                self._events.clear()
+                self._cond.notify_all()
+                return False
+            self._events.append(event)
+            self._cond.notify_all()
+            return True
+
+    def next(self, timeout):
+        """다음 이벤트 (timeout 동안 없으면 None, 끊긴 구독이면 SubscriberDropped)"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._events or self.dropped, timeout)
+            if self._events:
+                return self._events.popleft()
+            if self.dropped:
+                raise SubscriberDropped()
+            return None
+
+
+class LiveStatsFeed:
+    """
+    워커마다 하나의 폴링 스레드가 interval 초마다 choice_tallies 를 한 번 읽어
+    직전 값과의 차이(선택지별 증가분)를 모든 구독자에게 보낸다.
+    구독자 수와 상관없이 쿼리는 워커당 interval 마다 1번이고, 그 사이의 응답은 한 이벤트로 합쳐진다.
+    (다른 워커나 write-behind flush 로 저장된 응답도 집계 테이블을 통해 같이 반영된다)
+    구독자가 없으면 스레드는 종료된다.
+    """
+
+    def __init__(self, application, interval, max_pending, max_clients):
+        self.app = application
+        self.interval = interval
+        self.max_pending = max_pending
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._counts = None
+        self._seq = 0
+        self._thread = None
+        self._pid = None
+        self.dropped = 0
+
+    @staticmethod
+    def _load_counts():
+        return {
+            row.choice_id: (row.question_id, row.answer_count)
+            for row in load_choice_counts()
+        }
+
+    def subscribe(self):
+        """
+        구독자 등록 후 (구독자, 현재 전체 집계 이벤트) 반환
+        워커당 최대 연결 수를 넘으면 (None, None)
+        """
+        with self._lock:
+            counts = self._counts
+        if counts is None:
+            counts = self._load_counts()
+
+        subscriber = LiveStatsSubscriber(self.max_pending)
+        with self._lock:
+            if len(self._subscribers) >= self.max_clients:
+                return None, None
+            self._subscribers.add(subscriber)
+            # 이후 delta 이벤트는 폴링 스레드가 가진 값 기준이므로 전체 집계도 같은 값으로 보낸다
+            if self._counts is None:
+                self._counts = counts
+            snapshot = {"seq": self._seq, "counts": self._rows(self._counts)}
+
+            if self._pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="live-stats-feed", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+        return subscriber, snapshot
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    @staticmethod
+    def _rows(counts):
+        return [
+            {"question_id": question_id, "choice_id": choice_id, "answer_count": answer_count}
+            for choice_id, (question_id, answer_count) in sorted(counts.items())
+        ]
+
+    def _poll(self):
+        with self.app.app_context():
+            counts = self._load_counts()
+
+        with self._lock:
+            previous = self._counts or {}
+            deltas = [
+                {
+                    "question_id": question_id,
+                    "choice_id": choice_id,
+                    "delta": answer_count - previous.get(choice_id, (question_id, 0))[1],
+                    "answer_count": answer_count,
+                }
+                for choice_id, (question_id, answer_count) in sorted(counts.items())
+                if previous.get(choice_id, (None, 0))[1] != answer_count
+            ]
+            self._counts = counts
+            if not deltas:
+                return
+
+            self._seq += 1
+            event = {"seq": self._seq, "deltas": deltas}
+            for subscriber in list(self._subscribers):
+                if not subscriber.push(event):
+                    self._subscribers.discard(subscriber)
+                    self.dropped += 1
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._subscribers:
+                    # 다음 첫 구독자는 새 전체 집계부터 시작
+                    self._counts = None
+                    self._thread = None
+                    return
+            try:
+                self._poll()
+            except Exception:
+                logger.exception("실시간 통계 집계 조회 실패")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "seq": self._seq,
+                "dropped": self.dropped,
+                "interval": self.interval,
+            }
+
+
+def init_app(application):
+    """
+    스트림 연결은 끝날 때까지 gthread 워커 스레드 하나를 점유하므로,
+    STATS_STREAM_MAX_CLIENTS 를 워커 스레드 수(WORKER_THREADS)의 1/4 이하로 제한해서 일반 요청이 쓸 스레드를 남긴다.
+    """
+    max_clients = application.config.get("STATS_STREAM_MAX_CLIENTS", 8)
+    thread_limit = max(1, application.config.get("WORKER_THREADS", 32) // 4)
+    if max_clients > thread_limit:
+        logger.warning(
+            "STATS_STREAM_MAX_CLIENTS(%d) 가 워커 스레드 수에 비해 커서 %d 로 제한합니다.", max_clients, thread_limit
+        )
+        max_clients = thread_limit
+    application.extensions["live_stats"] = LiveStatsFeed(
+        application,
+        interval=application.config.get("STATS_STREAM_INTERVAL", 1.0),
+        max_pending=application.config.get("STATS_STREAM_MAX_PENDING", 32),
+        max_clients=max_clients,
+    )
+
+
+def get_live_stats():
+    return current_app.extensions["live_stats"]
+
+
+def sse_event(event, data, event_id=None):
+    """SSE 형식 이벤트 문자열"""
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
@@ -0,0 +1,420 @@
+import atexit
+import fcntl
+import glob
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from config import db
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("app.slow_query")
+
+# Flask 요청 밖에서 처리하는 요청(ASGI 모드 빠른 경로)의 엔드포인트 이름 (쿼리 측정값 라벨에 사용)
+current_endpoint = ContextVar("metrics_endpoint", default=None)
+
+# 종료된 워커의 카운터/히스토그램 누적값 (워커 파일을 지우기 전에 여기에 더해서 합계가 줄어들지 않게 한다)
+ARCHIVE_FILE = "archive.dat"
+ARCHIVE_LOCK_FILE = "archive.lock"
+
+# 히스토그램 구간 (초)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# (이름, 종류, 설명)
+METRICS = (
+    ("db_pool_checkout_wait_seconds", "histogram", "커넥션 풀에서 커넥션을 얻기까지 기다린 시간"),
+    ("db_pool_timeouts_total", "counter", "커넥션 풀 대기 시간 초과(풀 고갈) 횟수"),
+    ("db_pool_size", "gauge", "커넥션 풀 기본 크기 (워커별)"),
+    ("db_pool_checked_out", "gauge", "사용 중인 커넥션 수 (워커별)"),
+    ("db_pool_overflow", "gauge", "기본 크기를 넘어 추가로 연 커넥션 수 (워커별, 음수면 아직 열지 않은 여유분)"),
+    ("db_query_duration_seconds", "histogram", "정규화한 SQL 문장별 실행 시간"),
+    ("db_endpoint_query_duration_seconds", "histogram", "엔드포인트별 SQL 실행 시간"),
+    ("db_slow_queries_total", "counter", "METRICS_SLOW_QUERY_MS 보다 오래 걸린 SQL 수"),
+    ("http_request_duration_seconds", "histogram", "엔드포인트별 요청 처리 시간"),
+)
+
+_IN_LIST = re.compile(r"\(\s*(?:%s|\?|:\w+)(?:\s*,\s*(?:%s|\?|:\w+))*\s*\)")
+_VALUES_LIST = re.compile(r"(\(\?\))(?:\s*,\s*\(\?\))+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_statement(statement, max_length=300):
+    """
+    SQL 문장의 값/바인드 파라미터 목록을 ? 로 합쳐서 같은 형태의 쿼리를 한 라벨로 모은다.
+    예) SELECT ... WHERE id IN (%s, %s, %s) LIMIT 10 → SELECT ... WHERE id IN (?) LIMIT ?
+    """
+    statement = _STRING.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _SPACES.sub(" ", statement).strip()
+    statement = _IN_LIST.sub("(?)", statement)
+    statement = _VALUES_LIST.sub(r"\1", statement)
+    return statement[:max_length]
+
+
+class MetricsRegistry:
+    """
+    워커(프로세스)별 측정값 저장소
+    STATE_DIR/metrics/<pid>-<토큰>.json 파일에 주기적으로 기록하고, /metrics 는 모든 워커 파일을 합쳐서 보여준다.
+    """
+
+    def __init__(self, folder, max_statements, flush_interval=5):
+        self.folder = folder
+        self.max_statements = max_statements
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_pid = None
+        self._histograms = {}
+        self._counters = {}
+        self._statements = set()
+        self._engines = []
+        self._pid = os.getpid()
+        self._path = self._new_path()
+
+    def _new_path(self):
+        return os.path.join(self.folder, f"{self._pid}-{uuid.uuid4().hex[:8]}.json")
+
+    def observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+            histogram[bisect_left(BUCKETS, value)] += 1
+            histogram[-1] += value
+
+    def increment(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def statement_label(self, statement):
+        """라벨 종류가 무한히 늘지 않도록 max_statements 개를 넘는 새 문장은 "other" 로 묶는다."""
+        normalized = normalize_statement(statement)
+        with self._lock:
+            if normalized in self._statements:
+                return normalized
+            if len(self._statements) < self.max_statements:
+                self._statements.add(normalized)
+                return normalized
+        return "other"
+
+    def start_flushing(self):
+        """워커(프로세스)마다 한 번 flush_interval 초마다 flush() 하는 스레드를 시작하고, 종료 시 remove() 를 등록한다."""
+        if self._flush_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flush_pid == os.getpid():
+                return
+
+            def run():
+                while True:
+                    time.sleep(self.flush_interval)
+                    try:
+                        self.flush()
+                    except Exception:
+                        logger.exception("metrics 기록 실패")
+
+            threading.Thread(target=run, name="metrics-flush", daemon=True).start()
+            atexit.register(self.remove)
+            self._flush_pid = os.getpid()
+
+    def watch_engine(self, engine):
+        self._engines.append(engine)
+
+    def _gauges(self):
+        gauges = []
+        for engine in self._engines:
+            pool = engine.pool
+            if not isinstance(pool, QueuePool):
+                continue
+            labels = (("engine", engine.url.render_as_string(hide_password=True)),)
+            gauges.append(("db_pool_size", labels, pool.size()))
+            gauges.append(("db_pool_checked_out", labels, pool.checkedout()))
+            gauges.append(("db_pool_overflow", labels, pool.overflow()))
+        return gauges
+
+    def flush(self):
+        """이 워커의 현재 값을 파일로 기록 (fork 된 워커는 새 파일을 사용)"""
+        if self._pid != os.getpid():
+            # (gunicorn --preload 등) fork 이전 부모 프로세스 값은 부모 파일에 있으므로 이어받지 않는다
+            with self._lock:
+                self._histograms.clear()
+                self._counters.clear()
+            self._pid = os.getpid()
+            self._path = self._new_path()
+
+        with self._lock:
+            data = {
+                "pid": self._pid,
+                "histograms": [[name, labels, values] for (name, labels), values in self._histograms.items()],
+                "counters": [[name, labels, value] for (name, labels), value in self._counters.items()],
+            }
+        data["gauges"] = self._gauges()
+
+        os.makedirs(self.folder, exist_ok=True)
+        tmp_path = f"{self._path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path)
+
+    def remove(self):
+        """워커 종료 시 마지막 값을 기록한 뒤 아카이브에 합치고 이 워커의 파일을 지운다. (파일이 쌓이지 않도록)"""
+        if self._pid != os.getpid():
+            return
+        try:
+            self.flush()
+            self._archive([self._path])
+        except OSError:
+            logger.exception("metrics 아카이브 기록 실패")
+
+    def _archive(self, paths):
+        """
+        종료된 워커 파일의 카운터/히스토그램을 ARCHIVE_FILE 에 더하고 파일을 지운다. (게이지는 버림)
+        워커들이 동시에 같은 파일을 합치지 않도록 잠금 안에서 파일을 다시 읽는다.
+        (prometheus_client multiprocess 모드처럼 합계가 줄어들어 카운터 리셋으로 보이지 않게 한다)
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        with open(os.path.join(self.folder, ARCHIVE_LOCK_FILE), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            histograms, counters = {}, {}
+            _merge_file(os.path.join(self.folder, ARCHIVE_FILE), histograms, counters)
+            merged = [path for path in paths if _merge_file(path, histograms, counters)]
+            if not merged:
+                return
+
+            archive_path = os.path.join(self.folder, ARCHIVE_FILE)
+            with open(f"{archive_path}.tmp", "w", encoding="utf-8") as f:
+                json.dump({
+                    "histograms": [[name, labels, values] for (name, labels), values in histograms.items()],
+                    "counters": [[name, labels, value] for (name, labels), value in counters.items()],
+                }, f, ensure_ascii=False)
+            os.replace(f"{archive_path}.tmp", archive_path)
+            for path in merged:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def collect(self):
+        """
+        아카이브(종료된 워커 누적값) + 살아 있는 워커 파일을 합친다.
+        비정상 종료 등으로 남은 죽은 워커의 파일은 아카이브에 합친 뒤 지운다. (게이지만 버림)
+        """
+        histograms, counters, gauges = {}, {}, []
+        dead = []
+        for path in glob.glob(os.path.join(self.folder, "*.json")):
+            data = _read_file(path)
+            if data is None:
+                continue
+            if not _is_alive(data["pid"]):
+                dead.append(path)
+                continue
+            _merge_data(data, histograms, counters)
+            for name, labels, value in data["gauges"]:
+                gauges.append((name, tuple(map(tuple, labels)) + (("pid", str(data["pid"])),), value))
+
+        if dead:
+            self._archive(dead)
+        _merge_file(os.path.join(self.folder, ARCHIVE_FILE), histograms, counters)
+        return histograms, counters, gauges
+
+
+def _read_file(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _merge_data(data, histograms, counters):
+    for name, labels, values in data["histograms"]:
+        key = (name, tuple(map(tuple, labels)))
+        merged = histograms.setdefault(key, [0] * len(values))
+        histograms[key] = [a + b for a, b in zip(merged, values)]
+    for name, labels, value in data["counters"]:
+        key = (name, tuple(map(tuple, labels)))
+        counters[key] = counters.get(key, 0) + value
+
+
+def _merge_file(path, histograms, counters):
+    """path 의 카운터/히스토그램을 더한다. 파일이 없거나 읽을 수 없으면 False"""
+    data = _read_file(path)
+    if data is None:
+        return False
+    _merge_data(data, histograms, counters)
+    return True
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in items) + "}"
+
+
+def render_prometheus(histograms, counters, gauges):
+    """Prometheus text exposition format (0.0.4)"""
+    lines = []
+    for name, kind, description in METRICS:
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == "histogram":
+            for (metric, labels), values in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ("+Inf",), values[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {values[-1]}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        elif kind == "counter":
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+        else:
+            for metric, labels, value in sorted(gauges):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class InstrumentedQueuePool(QueuePool):
+    """커넥션을 얻기까지 기다린 시간과 풀 고갈(대기 시간 초과)을 기록하는 QueuePool"""
+
+    # engine.dispose() 때 풀 객체가 새로 만들어지므로 인스턴스가 아닌 클래스에 둔다 (init_app 에서 설정)
+    registry = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            if self.registry is not None:
+                self.registry.increment("db_pool_timeouts_total", {})
+            raise
+        finally:
+            if self.registry is not None:
+                self.registry.observe("db_pool_checkout_wait_seconds", {}, time.perf_counter() - started)
+
+
+def _endpoint_label():
+    if has_request_context():
+        return request.endpoint or "unknown"
+    return current_endpoint.get() or "background"
+
+
+def configure_engine_options(application):
+    """
+    db.init_app 전에 호출해서 기본 엔진이 InstrumentedQueuePool 을 사용하게 한다.
+    (메모리 SQLite 처럼 QueuePool 을 쓰지 않는 DB 나 poolclass 를 직접 지정한 경우는 그대로 둔다)
+    """
+    if not application.config.get("METRICS_ENABLED", True):
+        return
+    url = make_url(application.config["SQLALCHEMY_DATABASE_URI"])
+    if url.drivername.startswith("sqlite") and url.database in (None, "", ":memory:"):
+        return
+    options = dict(application.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+    options.setdefault("poolclass", InstrumentedQueuePool)
+    application.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+
+
+def _instrument_engine(registry, engine, slow_query_seconds):
+    if isinstance(engine.pool, InstrumentedQueuePool):
+        InstrumentedQueuePool.registry = registry
+    registry.watch_engine(engine)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        endpoint = _endpoint_label()
+        label = registry.statement_label(statement)
+        registry.observe("db_query_duration_seconds", {"statement": label}, elapsed)
+        registry.observe("db_endpoint_query_duration_seconds", {"endpoint": endpoint}, elapsed)
+
+        if elapsed >= slow_query_seconds:
+            registry.increment("db_slow_queries_total", {"endpoint": endpoint})
+            # 파라미터에는 개인정보(email 등)가 있을 수 있어 정규화한 문장만 남긴다
+            slow_query_logger.warning(
+                "slow query %.1fms endpoint=%s executemany=%s sql=%s",
+                elapsed * 1000, endpoint, executemany, normalize_statement(statement, max_length=2000),
+            )
+
+
+def instrument_engine(application, engine):
+    """engine 의 쿼리 시간/풀 상태를 측정값에 포함 (ASGI 모드 async 엔진처럼 db.engines 밖에서 만든 엔진은 sync_engine 을 넘김)"""
+    registry = application.extensions.get("metrics")
+    if registry is not None:
+        _instrument_engine(registry, engine, application.config.get("METRICS_SLOW_QUERY_MS", 200) / 1000)
+
+
+def init_app(application):
+    """
+    SQLAlchemy 엔진/풀 이벤트로 쿼리 시간, 커넥션 대기 시간을 측정하고
+    워커마다 METRICS_FLUSH_INTERVAL 초마다 STATE_DIR/metrics 에 기록한다. (db.init_app 이후에 호출)
+    """
+    if not application.config.get("METRICS_ENABLED", True):
+        return
+
+    registry = MetricsRegistry(
+        os.path.join(application.config.get("STATE_DIR", "./var"), "metrics"),
+        max_statements=application.config.get("METRICS_MAX_STATEMENTS", 500),
+        flush_interval=application.config.get("METRICS_FLUSH_INTERVAL", 5),
+    )
+    application.extensions["metrics"] = registry
+
+    with application.app_context():
+        for engine in db.engines.values():
+            instrument_engine(application, engine)
+
+    @application.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+        registry.start_flushing()
+
+    @application.after_request
+    def observe_request(response):
+        if "request_started" in g:
+            registry.observe(
+                "http_request_duration_seconds",
+                {"endpoint": request.endpoint or "unknown", "method": request.method},
+                time.perf_counter() - g.request_started,
+            )
+        return response
+
+
+def get_metrics():
+    return current_app.extensions.get("metrics")
@@ -42,6 +42,8 @@ class User(CommonModel):
     age = db.Column(db.Enum(AgeStatus), nullable=False)
     gender = db.Column(db.Enum(GenderStatus), nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
+    # 일괄 가입의 이메일 중복 조회(lower(email) IN (...)) 용 함수 인덱스 (DB collation 과 상관없이 대소문자 무시)
+    __table_args__ = (db.Index("ix_users_email_lower", db.func.lower(email)),)
 
     def to_dict(self):
         return {
@@ -59,10 +61,17 @@ class User(CommonModel):
 
 class Image(CommonModel):
     __tablename__ = "images"
+    __table_args__ = (db.Index("ix_images_type_id", "type", "id"),)
     url = db.Column(db.String(255), nullable=False)
     type = db.Column(db.Enum(ImageStatus), nullable=False)
+    # 업로드 파일 내용의 sha256 (같은 파일 재업로드 시 기존 행 재사용, URL 로 등록한 이미지는 NULL)
+    sha256 = db.Column(db.String(64), unique=True, nullable=True)
 
     questions = db.relationship("Question", back_populates="image")
+    variants = db.relationship(
+        "ImageVariant", back_populates="image", order_by="ImageVariant.width",
+        cascade="all, delete-orphan",
+    )
 
     def to_dict(self):
         return {
@@ -76,6 +85,7 @@ class Image(CommonModel):
 
 class Question(CommonModel):
     __tablename__ = "questions"
+    __table_args__ = (db.Index("ix_questions_sqe_is_active", "sqe", "is_active"),)
     title = db.Column(db.String(100), nullable=False)
     is_active = db.Column(db.Boolean, nullable=False, default=True)
     sqe = db.Column(db.Integer, nullable=False)
@@ -98,6 +108,9 @@ class Question(CommonModel):
 
 class Choices(CommonModel):
     __tablename__ = "choices"
+    __table_args__ = (
+        db.Index("ix_choices_question_id_is_active_sqe", "question_id", "is_active", "sqe"),
+    )
     content = db.Column(db.String(255), nullable=False)
     is_active = db.Column(db.Boolean, nullable=False, default=True)
     sqe = db.Column(db.Integer, nullable=False)
@@ -118,6 +131,10 @@ class Choices(CommonModel):
 
 class Answer(CommonModel):
     __tablename__ = "answers"
+    __table_args__ = (
+        db.Index("ix_answers_choice_id", "choice_id"),
+        db.Index("ix_answers_user_id_choice_id", "user_id", "choice_id"),
+    )
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
     choice_id = db.Column(db.Integer, db.ForeignKey("choices.id"))
 
@@ -128,4 +145,164 @@ class Answer(CommonModel):
             "choice_id": self.choice_id,
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat(),
-        }
\ No newline at end of file
+        }
+
+
+class ChoiceTally(CommonModel):
+    # 선택지별 누적 응답 수 (submit 시 같은 트랜잭션에서 갱신, /stats 조회용)
+    __tablename__ = "choice_tallies"
+    __table_args__ = (
+        db.Index(
+            "ix_choice_tallies_question_id_choice_id_answer_count",
+            "question_id", "choice_id", "answer_count",
+        ),
+    )
+    choice_id = db.Column(
+        db.Integer, db.ForeignKey("choices.id"), unique=True, nullable=False
+    )
+    question_id = db.Column(
+        db.Integer, db.ForeignKey("questions.id"), nullable=False
+    )
+    answer_count = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "choice_id": self.choice_id,
+            "question_id": self.question_id,
+            "answer_count": self.answer_count,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+
+class ChoiceDemographicTally(CommonModel):
+    # 선택지 × 연령대 × 성별 누적 응답 수 (submit 시 같은 트랜잭션에서 갱신, /stats/demographics 조회용)
+    __tablename__ = "choice_demographic_tallies"
+    __table_args__ = (
+        db.UniqueConstraint("choice_id", "age", "gender"),
+        db.Index("ix_choice_demographic_tallies_question_id_choice_id", "question_id", "choice_id"),
+    )
+    choice_id = db.Column(db.Integer, db.ForeignKey("choices.id"), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey("questions.id"), nullable=False)
+    age = db.Column(db.Enum(AgeStatus), nullable=False)
+    gender = db.Column(db.Enum(GenderStatus), nullable=False)
+    answer_count = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "choice_id": self.choice_id,
+            "question_id": self.question_id,
+            "age": self.age.value if hasattr(self.age, "value") else self.age,
+            "gender": (
+                self.gender.value if hasattr(self.gender, "value") else self.gender
+            ),
+            "answer_count": self.answer_count,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+
+class UserDemographicTally(CommonModel):
+    # 연령대 × 성별 가입자 수 (signup 시 같은 트랜잭션에서 갱신, 응답률 분모용)
+    __tablename__ = "user_demographic_tallies"
+    __table_args__ = (db.UniqueConstraint("age", "gender"),)
+    age = db.Column(db.Enum(AgeStatus), nullable=False)
+    gender = db.Column(db.Enum(GenderStatus), nullable=False)
+    user_count = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "age": self.age.value if hasattr(self.age, "value") else self.age,
+            "gender": (
+                self.gender.value if hasattr(self.gender, "value") else self.gender
+            ),
+            "user_count": self.user_count,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+
+class AnswerTimeRollup(CommonModel):
+    # 선택지별 시간대(hour/day) 응답 수 롤업 (백그라운드 작업이 answers.id 기준으로 증분 반영)
+    __tablename__ = "answer_time_rollups"
+    __table_args__ = (
+        db.UniqueConstraint("granularity", "bucket_start", "choice_id"),
+        db.Index("ix_answer_time_rollups_question_id_granularity_bucket_start", "question_id", "granularity", "bucket_start"),
+    )
+    granularity = db.Column(db.String(4), nullable=False)  # "hour" | "day"
+    bucket_start = db.Column(db.DateTime, nullable=False)  # KST 기준 구간 시작 시각
+    choice_id = db.Column(db.Integer, db.ForeignKey("choices.id"), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey("questions.id"), nullable=False)
+    answer_count = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "granularity": self.granularity,
+            "bucket_start": self.bucket_start.replace(tzinfo=KST).isoformat(),
+            "choice_id": self.choice_id,
+            "question_id": self.question_id,
+            "answer_count": self.answer_count,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+
+class RollupWatermark(CommonModel):
+    # 롤업 작업별로 어디까지(answers.id) 반영했는지 기록
+    __tablename__ = "rollup_watermarks"
+    name = db.Column(db.String(50), unique=True, nullable=False)
+    last_answer_id = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "last_answer_id": self.last_answer_id,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+
+class AnswerSubmission(CommonModel):
+    # /submit 재시도 시 중복 저장을 막기 위한 멱등 키 기록
+    __tablename__ = "answer_submissions"
+    idempotency_key = db.Column(db.String(64), unique=True, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"))
+    answer_count = db.Column(db.Integer, nullable=False)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "idempotency_key": self.idempotency_key,
+            "user_id": self.user_id,
+            "answer_count": self.answer_count,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+
+class ImageVariant(CommonModel):
+    # 원본 이미지를 너비별로 줄이고 WebP 로 다시 압축한 파생 이미지 (파일명은 내용 해시 기반이라 변하지 않음)
+    __tablename__ = "image_variants"
+    __table_args__ = (db.UniqueConstraint("image_id", "width", "format"),)
+    image_id = db.Column(db.Integer, db.ForeignKey("images.id"), nullable=False)
+    width = db.Column(db.Integer, nullable=False)
+    format = db.Column(db.String(10), nullable=False)
+    url = db.Column(db.String(255), nullable=False)
+
+    image = db.relationship("Image", back_populates="variants")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "image_id": self.image_id,
+            "width": self.width,
+            "format": self.format,
+            "url": self.url,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+        }
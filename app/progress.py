@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import select
+
+from app.catalog import get_question_order
+from app.models import Answer, Choices, User
+from app.versioning import VersionStamp
+from config import db
+
+
+class UserProgressCache:
+    """
+    사용자별 응답 목록(question_id, choice_id)을 워커 메모리에 캐시한다.
+    submit 이 저장 후 invalidate() 를 호출하면 그 사용자가 속한 버킷(user_id % buckets)의 공유 버전 스탬프가 바뀌고,
+    다른 워커들도 다음 조회 때 스탬프 변경을 보고 다시 읽는다. (사용자마다 파일을 만들지 않도록 버킷 단위로 관리)
+    """
+
+    def __init__(self, folder, ttl=300, max_entries=10000, buckets=256):
+        self.folder = folder
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.buckets = buckets
+        self._stamps = [VersionStamp(os.path.join(folder, f"{bucket}.version")) for bucket in range(buckets)]
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _stamp(self, user_id):
+        return self._stamps[user_id % self.buckets]
+
+    def get(self, user_id, loader):
+        version = self._stamp(user_id).current()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] == version and entry[1] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+
+        value = loader()
+        with self._lock:
+            # 없는 사용자는 (곧 가입할 수 있으므로) 저장하지 않는다
+            if value is not None and self._stamp(user_id).current() == version:
+                self._entries[user_id] = (version, now + self.ttl, value)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, user_ids):
+        user_ids = set(user_ids)
+        for bucket in {user_id % self.buckets for user_id in user_ids}:
+            self._stamps[bucket].bump()
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+            self.invalidations += 1
+
+    def clear(self):
+        """이 워커의 캐시만 비운다 (버전 스탬프는 그대로라서 다른 워커 캐시에는 영향 없음)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+            }
+
+
+def init_app(application):
+    application.extensions["user_progress"] = UserProgressCache(
+        os.path.join(application.config.get("STATE_DIR", "./var"), "user_progress"),
+        ttl=application.config.get("USER_PROGRESS_TTL", 300),
+        max_entries=application.config.get("USER_PROGRESS_MAX_ENTRIES", 10000),
+    )
+
+
+def get_user_progress():
+    return current_app.extensions["user_progress"]
+
+
+def invalidate_user_progress(user_ids):
+    get_user_progress().invalidate(user_ids)
+
+
+def user_answers_statement(user_id):
+    return (
+        select(Choices.question_id, Answer.choice_id)
+        .join(Choices, Choices.id == Answer.choice_id)
+        .where(Answer.user_id == user_id)
+        .distinct()
+        .order_by(Choices.question_id, Answer.choice_id)
+    )
+
+
+def _load_user_answers(user_id):
+    """
+    answers(user_id, choice_id) 인덱스만 읽고 choices 는 PK 로 join 하는 쿼리 1번
+    응답이 없으면 사용자가 있는지 확인해서 없는 사용자는 None
+    """
+    rows = db.session.execute(user_answers_statement(user_id)).all()
+    if not rows and db.session.get(User, user_id) is None:
+        return None
+    return [(question_id, choice_id) for question_id, choice_id in rows]
+
+
+def get_user_answers(user_id):
+    """사용자가 응답한 (question_id, choice_id) 목록, 없는 사용자는 None"""
+    return get_user_progress().get(user_id, lambda: _load_user_answers(user_id))
+
+
+def get_resume_point(user_id):
+    """
+    활성 질문 중 아직 응답하지 않은 첫 질문의 sqe (캐시된 응답 목록 + 카탈로그의 질문 순서로 계산)
+    없는 사용자는 None
+    """
+    answers = get_user_answers(user_id)
+    if answers is None:
+        return None
+
+    answered = {question_id for question_id, _ in answers}
+    order = get_question_order()
+    remaining = [sqe for question_id, sqe in order if question_id not in answered]
+    return {
+        "user_id": user_id,
+        "next_sqe": remaining[0] if remaining else None,
+        "answered_count": len(order) - len(remaining),
+        "total_count": len(order),
+        "completed": not remaining,
+    }
@@ -0,0 +1,186 @@
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import g, has_request_context, jsonify, request
+from sqlalchemy import event
+
+from app.metrics import normalize_statement
+from config import db
+
+logger = logging.getLogger(__name__)
+
+# query_budget() 블록마다 쌓이는 기록기 (테스트 클라이언트 요청도 같은 스레드에서 실행되므로 함께 집계됨)
+_local = threading.local()
+# Flask 요청 밖에서 처리하는 요청(ASGI 모드 빠른 경로) 하나의 기록기 (asyncio 태스크마다 따로)
+_context_audit = ContextVar("query_audit", default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryAudit:
+    """요청(또는 query_budget 블록) 하나에서 실행된 SQL 수, DB 시간, 정규화한 문장 형태별 실행 횟수"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement, elapsed):
+        self.count += 1
+        self.duration += elapsed
+        self.shapes[normalize_statement(statement, max_length=2000)] += 1
+
+    def repeated(self, threshold):
+        """같은 형태의 문장이 threshold 번 이상 실행된 목록 (N+1 의심), 많이 실행된 순"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def problems(self, max_queries=None, repeat_threshold=None):
+        problems = []
+        if max_queries is not None and self.count > max_queries:
+            problems.append(f"SQL {self.count}개 실행 (예산 {max_queries}개)")
+        if repeat_threshold is not None:
+            for shape, count in self.repeated(repeat_threshold):
+                problems.append(f"같은 형태의 SQL {count}번 실행 (N+1 의심): {shape}")
+        return problems
+
+    def server_timing(self):
+        return f'db;dur={self.duration * 1000:.2f};desc="{self.count} queries"'
+
+
+def _active_audits():
+    audits = list(getattr(_local, "stack", ()))
+    if has_request_context() and "query_audit" in g:
+        audits.append(g.query_audit)
+    if _context_audit.get() is not None:
+        audits.append(_context_audit.get())
+    return audits
+
+
+def instrument_engine(engine):
+    """engine 의 SQL 을 집계 대상에 포함 (ASGI 모드 async 엔진처럼 db.engines 밖에서 만든 엔진은 sync_engine 을 넘김)"""
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_audit_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_audit_started"].pop()
+        for audit in _active_audits():
+            audit.record(statement, elapsed)
+
+
+@contextmanager
+def audit_context():
+    """Flask 요청 밖(ASGI 모드 빠른 경로)에서 요청 하나의 SQL 을 집계하는 블록 (await 중에 다른 요청과 섞이지 않음)"""
+    audit = QueryAudit()
+    token = _context_audit.set(audit)
+    try:
+        yield audit
+    finally:
+        _context_audit.reset(token)
+
+
+def audit_problems(config, endpoint, audit):
+    """endpoint 의 QUERY_BUDGETS 예산 초과/N+1 의심 문장 목록 (있으면 로그로 남김)"""
+    problems = audit.problems(
+        config.get("QUERY_BUDGETS", {}).get(endpoint), config.get("QUERY_AUDIT_REPEAT_THRESHOLD", 5)
+    )
+    if problems:
+        logger.warning("쿼리 예산 초과 endpoint=%s %s", endpoint, " / ".join(problems))
+    return problems
+
+
+@contextmanager
+def query_budget(max_queries=None, repeat_threshold=None):
+    """
+    블록 안에서 실행된 SQL 을 세고, 예산을 넘거나 같은 형태의 문장이 repeat_threshold 번 이상 실행되면
+    QueryBudgetExceeded(AssertionError) 를 발생시킨다. (테스트/CI 용)
+
+        with query_budget(max_queries=3, repeat_threshold=3):
+            client.get("/questions/all")
+    """
+    audit = QueryAudit()
+    stack = _local.__dict__.setdefault("stack", [])
+    stack.append(audit)
+    try:
+        yield audit
+    finally:
+        stack.remove(audit)
+    problems = audit.problems(max_queries, repeat_threshold)
+    if problems:
+        raise QueryBudgetExceeded("\n".join(problems))
+
+
+def init_app(application):
+    """
+    모든 엔진에 SQL 집계용 이벤트를 등록한다. (db.init_app 이후에 호출)
+    QUERY_AUDIT_ENABLED 면 요청마다 SQL 수/DB 시간을 Server-Timing 헤더로 내려주고,
+    QUERY_BUDGETS 예산 초과나 N+1 의심 문장을 로그로 남긴다. (QUERY_AUDIT_STRICT 면 500 응답으로 바꿔서 CI 에서 실패하게 함)
+    """
+    with application.app_context():
+        for engine in db.engines.values():
+            instrument_engine(engine)
+
+    if not application.config.get("QUERY_AUDIT_ENABLED", False):
+        return
+    strict = application.config.get("QUERY_AUDIT_STRICT", False)
+
+    @application.before_request
+    def start_query_audit():
+        g.query_audit = QueryAudit()
+        g.query_audit_started = time.perf_counter()
+
+    @application.after_request
+    def finish_query_audit(response):
+        audit = g.pop("query_audit", None)
+        if audit is None:
+            return response
+        elapsed = time.perf_counter() - g.pop("query_audit_started")
+        endpoint = request.endpoint or "unknown"
+
+        problems = audit_problems(application.config, endpoint, audit)
+        if problems and strict:
+            response = jsonify({"error": "쿼리 예산 초과", "endpoint": endpoint, "problems": problems})
+            response.status_code = 500
+
+        response.headers.add("Server-Timing", audit.server_timing())
+        response.headers.add("Server-Timing", f"app;dur={elapsed * 1000:.2f}")
+        return response
+
+
+def check_query_budgets(client, budgets, repeat_threshold, url_map, before_each=None):
+    """
+    QUERY_BUDGETS 에 있는 GET 엔드포인트를 (정수 인자는 1 로 채워서) 한 번씩 호출하고
+    (엔드포인트, URL, 상태 코드, SQL 수, 문제 목록) 목록을 반환한다.
+    before_each 로 캐시를 비워서 캐시가 없을 때의 쿼리 수를 잰다.
+    """
+    results = []
+    for rule in sorted(url_map.iter_rules(), key=lambda rule: rule.rule):
+        if rule.endpoint not in budgets or "GET" not in rule.methods:
+            continue
+        if rule.rule.count("<int:") != len(rule.arguments):
+            continue
+        path = rule.build({name: 1 for name in rule.arguments}, append_unknown=False)[1]
+        if before_each is not None:
+            before_each()
+        try:
+            with query_budget(budgets[rule.endpoint], repeat_threshold) as audit:
+                status = client.get(path).status_code
+            problems = []
+        except QueryBudgetExceeded as e:
+            problems = str(e).splitlines()
+        results.append((rule.endpoint, path, status, audit.count, problems))
+    return results
+
+
+def get_query_audit():
+    """현재 요청의 QueryAudit (QUERY_AUDIT_ENABLED 가 꺼져 있으면 None)"""
+    if has_request_context():
+        return g.get("query_audit")
+    return _context_audit.get()
@@ -0,0 +1,89 @@
+from datetime import datetime
+
+from app.catalog import (
+    active_choice_map_statement,
+    active_choices_statement,
+    active_question_count_statement,
+    main_image_statement,
+    question_order_statement,
+    question_statement,
+    survey_choices_statement,
+    survey_questions_statement,
+)
+from app.ingest import existing_submission_keys_statement
+from app.models import ImageStatus
+from app.progress import user_answers_statement
+from app.routes.images import image_list_statement, image_page_statement
+from app.signup_import import existing_emails_statement
+from app.tallies import choice_tallies_statement
+from app.timeseries import timeseries_statement
+
+# (이름, 쿼리 생성 함수, 허용하는 전체 스캔: None / "covering"(커버링 인덱스만) / "any"(활성 질문 전체처럼 원래 다 읽는 쿼리))
+# 라우트/캐시 로더가 실행하는 것과 같은 statement 생성 함수를 사용해서, 쿼리가 바뀌면 검사 대상도 함께 바뀐다.
+HOT_QUERIES = [
+    ("questions.get_question_by_sqe", lambda: question_statement(1), None),
+    ("choices.get_choices_by_question", lambda: active_choices_statement(1), None),
+    ("questions.question_count", active_question_count_statement, "covering"),
+    ("questions.get_all_questions (questions)", survey_questions_statement, "any"),
+    ("questions.get_all_questions (choices)", lambda: survey_choices_statement([1, 2, 3]), None),
+    ("users.user_resume (question order)", question_order_statement, "covering"),
+    ("answers.submit_answer (active choices)", active_choice_map_statement, "covering"),
+    ("images.get_main_image", main_image_statement, None),
+    ("images.list_images (keyset)", lambda: image_page_statement(image_list_statement(), 100, 100), None),
+    (
+        "images.get_images_by_type (keyset)",
+        lambda: image_page_statement(image_list_statement(ImageStatus.main), 100, 100),
+        None,
+    ),
+    ("answers.submit_answer (idempotency keys)", lambda: existing_submission_keys_statement(["key"]), None),
+    ("users.user_answers", lambda: user_answers_statement(1), None),
+    ("users.bulk_signup (existing emails)", lambda: existing_emails_statement(["a@b.c"]), None),
+    ("stats_routes (choice_tallies)", choice_tallies_statement, "covering"),
+    (
+        "stats_routes.answer_timeseries (question)",
+        lambda: timeseries_statement("hour", datetime(2025, 1, 1), datetime(2025, 1, 8), question_id=1),
+        None,
+    ),
+]
+
+
+def explain(connection, statement):
+    """
+    statement 의 실행 계획을 조회한다.
+    반환값: (계획 설명 목록, 전체 테이블 스캔 목록, 커버링 인덱스 전체 스캔 목록)
+    """
+    sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+    dialect = connection.dialect.name
+
+    if dialect == "sqlite":
+        details = [row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+        scans = [detail for detail in details if detail.startswith("SCAN ")]
+        covering = [detail for detail in scans if "COVERING INDEX" in detail]
+    elif dialect == "mysql":
+        rows = connection.exec_driver_sql(f"EXPLAIN {sql}").mappings().all()
+        details = [
+            f"{row['table']}: type={row['type']} key={row['key']} rows={row['rows']} extra={row['Extra']}"
+            for row in rows
+        ]
+        scans = [detail for row, detail in zip(rows, details) if row["type"] in ("ALL", "index")]
+        covering = [detail for row, detail in zip(rows, details) if row["type"] == "index"]
+    else:
+        raise RuntimeError(f"실행 계획 검사는 MySQL/SQLite 만 지원합니다 (현재 DB: {dialect})")
+
+    return details, [scan for scan in scans if scan not in covering], covering
+
+
+def check_query_plans(connection):
+    """
+    HOT_QUERIES 전체를 EXPLAIN 해서 (이름, 계획, 통과 여부) 목록을 반환
+    전체 테이블 스캔이 있거나, 허용되지 않은 인덱스 전체 스캔이 있으면 실패
+    """
+    results = []
+    for name, build, allowed_scan in HOT_QUERIES:
+        details, full_scans, covering_scans = explain(connection, build())
+        if allowed_scan == "any":
+            ok = True
+        else:
+            ok = not full_scans and (allowed_scan == "covering" or not covering_scans)
+        results.append((name, details, ok))
+    return results
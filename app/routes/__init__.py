@@ -6,6 +6,7 @@ from .questions import questions_blp
 from .stats_routes import stats_routes_blp
 from .users import user_blp
 from .images import images_blp
+from .metrics import metrics_blp
 
 
 def register_routes(application):
@@ -14,4 +15,5 @@ def register_routes(application):
     application.register_blueprint(questions_blp)
     application.register_blueprint(stats_routes_blp)
     application.register_blueprint(user_blp)
-    application.register_blueprint(images_blp)
\ No newline at end of file
+    application.register_blueprint(images_blp)
+    application.register_blueprint(metrics_blp)
\ No newline at end of file
@@ -1,5 +1,13 @@
 from flask import Blueprint, request, jsonify
-from app.models import Answer
+from app.answer_log import get_answer_buffer
+from app.ingest import (
+    SubmissionError,
+    parse_answers,
+    submit_answers,
+    validate_choices,
+    validate_idempotency_key,
+    validate_users,
+)
 from config import db
 
 answers_blp = Blueprint("answers", __name__)
@@ -7,6 +15,10 @@ answers_blp = Blueprint("answers", __name__)
 @answers_blp.route("/submit", methods=["POST"])
 def submit_answer():
     """
+    Request Header (선택):
+    Idempotency-Key: <클라이언트가 만든 고유값, 최대 64자>
+    같은 키로 재시도하면 다시 저장하지 않고 200 을 반환합니다.
+
     Request Body:
     [
       { "user_id": 1, "choice_id": 2 },
@@ -17,13 +29,30 @@ def submit_answer():
     {
       "message": "User: 1's answers Success Create"
     }
+
+    ANSWER_WRITE_BEHIND 설정이 켜져 있으면 로컬 로그에 기록한 뒤 202 로 바로 응답하고,
+    DB 저장은 백그라운드에서 여러 제출을 묶어서 처리합니다.
     """
     data = request.get_json()
     try:
-        answers = [Answer(user_id=int(i["user_id"]), choice_id=int(i["choice_id"])) for i in data]
-        db.session.add_all(answers)
-        db.session.commit()
-        return jsonify({"message": f"User: {data[0]['user_id']}'s answers Success Create"}), 201
+        rows = parse_answers(data)
+        idempotency_key = validate_idempotency_key(request.headers.get("Idempotency-Key"))
+
+        answer_buffer = get_answer_buffer()
+        if answer_buffer is not None:
+            # 카탈로그 캐시 미스로 선택지를 조회해도 validate_users 의 rollback 에서 커넥션을 반납한 뒤 로그에 기록한다
+            question_ids = validate_choices(rows)
+            validate_users(rows)
+            if not answer_buffer.submit(rows, question_ids, idempotency_key):
+                return jsonify({"message": f"User: {rows[0]['user_id']}'s answers Already Created"}), 200
+            return jsonify({"message": f"User: {rows[0]['user_id']}'s answers Success Accept"}), 202
+
+        if not submit_answers(rows, idempotency_key):
+            return jsonify({"message": f"User: {rows[0]['user_id']}'s answers Already Created"}), 200
+
+        return jsonify({"message": f"User: {rows[0]['user_id']}'s answers Success Create"}), 201
+    except SubmissionError as e:
+        return jsonify({"message": str(e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({"message": str(e)}), 400
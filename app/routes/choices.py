@@ -1,4 +1,5 @@
 from flask import Blueprint, jsonify, request
+from app.catalog import get_choices_payload, invalidate_catalog
 from app.models import Choices
 from config import db
 
@@ -7,8 +8,7 @@ choices_blp = Blueprint("choices", __name__, url_prefix="/choices")
 
 @choices_blp.route("/question/<int:question_id>", methods=["GET"])
 def get_choices_by_question(question_id):
-    choices = Choices.query.filter_by(question_id=question_id, is_active=True).order_by(Choices.sqe).all()
-    result = [choice.to_dict() for choice in choices]
+    result = get_choices_payload(question_id)
     return jsonify({"choices": result})
 
 
@@ -23,6 +23,7 @@ def create_choice():
     )
     db.session.add(choice)
     db.session.commit()
+    invalidate_catalog()
     return jsonify({"message": f"Content: {choice.content} choice Success Create"}), 201
 
 # @choices_blp.route('/choice', methods=['POST'])
@@ -1,19 +1,94 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, stream_with_context
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from werkzeug.utils import secure_filename
 import os
-from app.models import Image  # SQLAlchemy 모델
+from app.catalog import get_main_image_payload, invalidate_catalog
+from app.models import Image, ImageStatus  # SQLAlchemy 모델
+from app.serialization import dumps
+from app.storage import UploadTooLarge, discard_duplicate, store_stream, stored_path
+from app.variants import schedule_variants
 from config import db        # DB 세션
 
 images_blp = Blueprint('image', __name__, url_prefix='/image')
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500  # 스트리밍 시 서버 사이드 커서에서 한 번에 가져올 행 수
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def _save_upload(stream, filename, image_type):
+    """
+    업로드 스트림을 청크 단위로 sha256 경로에 저장하고 Image 행을 만든다.
+    같은 내용의 이미지가 이미 있으면 (확장자가 달라도) 행을 새로 만들지 않고 기존 행을 재사용하고,
+    다른 확장자로 새로 저장된 파일은 지운다. 기존 행과 요청한 타입이 다르면 409 를 반환한다.
+    """
+    if image_type not in ImageStatus.__members__:
+        return jsonify({'error': f'존재하지 않는 이미지 타입입니다: {image_type}'}), 400
+
+    upload_folder = current_app.config.get('UPLOAD_FOLDER', './static/uploads')
+    max_bytes = current_app.config.get('MAX_UPLOAD_BYTES', 10 * 1024 * 1024)
+    extension = filename.rsplit('.', 1)[1].lower()
+
+    try:
+        sha256, relative_path, _ = store_stream(stream, upload_folder, extension, max_bytes)
+    except UploadTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+
+    image = Image.query.filter_by(sha256=sha256).first()
+    deduplicated = image is not None
+    if image:
+        discard_duplicate(upload_folder, relative_path, image.url)
+    else:
+        image = Image(
+            url=f"{request.host_url}static/uploads/{relative_path}",
+            type=image_type,
+            sha256=sha256
+        )
+        try:
+            db.session.add(image)
+            db.session.commit()
+            invalidate_catalog()
+            # 모바일용 축소/WebP 파생 이미지는 요청 스레드 밖에서 생성
+            schedule_variants(image)
+        except IntegrityError:
+            # 같은 파일이 동시에 업로드된 경우: 먼저 저장된 행을 사용
+            db.session.rollback()
+            image = Image.query.filter_by(sha256=sha256).first()
+            deduplicated = True
+            discard_duplicate(upload_folder, relative_path, image.url)
+
+    if deduplicated and image.type.name != image_type:
+        # sha256 은 이미지 행마다 unique 이므로 같은 파일을 다른 타입으로 또 등록할 수 없다
+        return jsonify({
+            'error': f'같은 파일이 이미 {image.type.value} 타입으로 등록되어 있습니다.',
+            'id': image.id,
+            'url': image.url,
+            'type': image.type.value,
+        }), 409
+
+    return jsonify({
+        'message': 'File uploaded and saved to DB successfully',
+        'filename': filename,
+        'url': image.url,
+        'id': image.id,
+        'type': image.type.value,
+        'sha256': sha256,
+        'deduplicated': deduplicated
+    }), 200 if deduplicated else 201
+
+
 @images_blp.route('/upload', methods=['POST'])
 def upload_image():
+    max_bytes = current_app.config.get('MAX_UPLOAD_BYTES', 10 * 1024 * 1024)
+    # multipart 헤더 여유분만 더해서, 본문을 읽기 전에 Content-Length 로 먼저 거른다
+    request.max_content_length = max_bytes + 64 * 1024
+
     if 'file' not in request.files:
         return jsonify({'error': 'No file part in the request'}), 400
 
@@ -24,41 +99,110 @@ def upload_image():
     image_type = request.form.get('type', 'etc')  # 기본값
 
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-
-        upload_folder = current_app.config.get('UPLOAD_FOLDER', './static/uploads')
-        os.makedirs(upload_folder, exist_ok=True)
-        file_path = os.path.join(upload_folder, filename)
-        file.save(file_path)
+        return _save_upload(file.stream, secure_filename(file.filename), image_type)
+    else:
+        return jsonify({'error': 'File type not allowed'}), 400
 
-        image_url = f"{request.host_url}static/uploads/{filename}"
 
-        image = Image(url=image_url, type=image_type)
-        db.session.add(image)
-        db.session.commit()
+@images_blp.route('/upload/stream', methods=['POST', 'PUT'])
+def upload_image_stream():
+    """
+    POST /image/upload/stream?filename=<원본 파일명>&type=<main|sub>
+    설명: multipart 없이 요청 본문(raw bytes) 자체를 이미지로 받아서
+          전체를 메모리/임시 파일에 올리지 않고 청크 단위로 해시 + 저장
+    """
+    max_bytes = current_app.config.get('MAX_UPLOAD_BYTES', 10 * 1024 * 1024)
+    if request.content_length is not None and request.content_length > max_bytes:
+        return jsonify({'error': f'파일 크기는 {max_bytes} bytes 를 넘을 수 없습니다.'}), 413
 
-        return jsonify({
-            'message': 'File uploaded and saved to DB successfully',
-            'filename': filename,
-            'url': image_url,
-            'id': image.id,
-            'type': image_type
-        }), 201
-    else:
+    filename = secure_filename(request.args.get('filename', ''))
+    if not filename or not allowed_file(filename):
         return jsonify({'error': 'File type not allowed'}), 400
 
+    return _save_upload(request.stream, filename, request.args.get('type', 'etc'))
+
+
+def _image_row(row):
+    return {'id': row.id, 'url': row.url, 'type': row.type.value}
+
+
+def _typed_image_row(row):
+    # /image/type/<type> 는 원래 응답처럼 type 없이 id, url 만 내려준다
+    return {'id': row.id, 'url': row.url}
+
+
+def image_list_statement(image_type=None):
+    stmt = select(Image.id, Image.url, Image.type)
+    if image_type is not None:
+        stmt = stmt.where(Image.type == image_type)
+    return stmt
+
+
+def image_page_statement(stmt, cursor, limit):
+    """id 기준 keyset 페이지 (다음 페이지 존재 여부를 알 수 있게 limit + 1 개)"""
+    return stmt.where(Image.id > cursor).order_by(Image.id).limit(limit + 1)
+
+
+def _list_response(stmt, image_row=_image_row):
+    """
+    이미지 목록 응답
+    - 파라미터 없음: 기존과 같이 전체 목록 {"images": [...]}
+    - ?limit=<1~1000>&cursor=<이전 응답의 next_cursor> : id 기준 keyset 페이지 (next_cursor 포함)
+    - ?stream=ndjson | json : 페이지 없이 전체를 서버 사이드 커서로 나눠 읽으며 스트리밍
+    """
+    stream = request.args.get('stream')
+    if stream is not None:
+        if stream not in ('ndjson', 'json'):
+            return jsonify({'error': 'stream 은 ndjson 또는 json 이어야 합니다.'}), 400
+        return _stream_response(stmt, stream, image_row)
+
+    if 'limit' not in request.args and 'cursor' not in request.args:
+        rows = db.session.execute(stmt.order_by(Image.id)).all()
+        return jsonify({'images': [image_row(row) for row in rows]})
+
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        cursor = int(request.args.get('cursor', 0))
+    except ValueError:
+        return jsonify({'error': 'limit, cursor 는 정수여야 합니다.'}), 400
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({'error': f'limit 은 1~{MAX_PAGE_SIZE} 사이여야 합니다.'}), 400
+
+    # 한 개 더 가져와서 다음 페이지 존재 여부를 판단한다
+    rows = db.session.execute(image_page_statement(stmt, cursor, limit)).all()
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+
+    return jsonify({
+        'images': [image_row(row) for row in rows[:limit]],
+        'next_cursor': next_cursor
+    })
+
+
+def _stream_response(stmt, stream, image_row):
+    def generate():
+        result = db.session.execute(
+            stmt.order_by(Image.id).execution_options(stream_results=True, yield_per=STREAM_BATCH_SIZE)
+        )
+        if stream == 'ndjson':
+            for rows in result.partitions():
+                yield b''.join(dumps(image_row(row)) + b'\n' for row in rows)
+            return
+
+        yield b'{"images":['
+        first = True
+        for rows in result.partitions():
+            chunk = b','.join(dumps(image_row(row)) for row in rows)
+            yield chunk if first else b',' + chunk
+            first = False
+        yield b']}'
+
+    mimetype = 'application/x-ndjson' if stream == 'ndjson' else 'application/json'
+    return current_app.response_class(stream_with_context(generate()), mimetype=mimetype)
+
 
 @images_blp.route('/', methods=['GET'])
 def list_images():
-    images = Image.query.all()
-    results = []
-    for img in images:
-        results.append({
-            'id': img.id,
-            'url': img.url,
-            'type': img.type
-        })
-    return jsonify({'images': results})
+    return _list_response(image_list_statement())
 
 
 @images_blp.route('/<int:image_id>', methods=['DELETE'])
@@ -68,25 +212,28 @@ def delete_image(image_id):
         return jsonify({'error': 'Image not found'}), 404
 
     try:
-        filename = os.path.basename(image.url)
         upload_folder = current_app.config.get('UPLOAD_FOLDER', './static/uploads')
-        file_path = os.path.join(upload_folder, filename)
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        for url in [image.url] + [variant.url for variant in image.variants]:
+            file_path = stored_path(upload_folder, url)
+            if file_path and os.path.exists(file_path):
+                os.remove(file_path)
     except Exception as e:
         return jsonify({'error': f'File delete error: {str(e)}'}), 500
 
     db.session.delete(image)
     db.session.commit()
+    invalidate_catalog()
 
     return jsonify({'message': f'Image id {image_id} and file deleted successfully'})
 
 
 @images_blp.route('/type/<image_type>', methods=['GET'])
 def get_images_by_type(image_type):
-    images = Image.query.filter_by(type=image_type).all()
-    results = [{'id': img.id, 'url': img.url} for img in images]
-    return jsonify({'images': results})
+    if image_type not in ImageStatus.__members__:
+        return jsonify({'error': f'존재하지 않는 이미지 타입입니다: {image_type}'}), 400
+
+    # (type, id) 인덱스로 해당 타입만 id 순서대로 읽는다
+    return _list_response(image_list_statement(ImageStatus[image_type]), _typed_image_row)
 
 
 @images_blp.route('', methods=['POST'])
@@ -103,6 +250,7 @@ def create_image():
         image = Image(url=url, type=image_type)
         db.session.add(image)
         db.session.commit()
+        invalidate_catalog()
 
         return jsonify({
             'message': f"ID: {image.id} Image Success Create"
@@ -115,10 +263,10 @@ def create_image():
 
 @images_blp.route('/main', methods=['GET'])
 def get_main_image():
-    image = Image.query.filter_by(type='main').order_by(Image.id.desc()).first()
+    image = get_main_image_payload()
     if not image:
         return jsonify({"image": None}), 404
 
-    return jsonify({"image": image.url}), 200
+    return jsonify(image), 200
 
 
@@ -0,0 +1,22 @@
+from flask import Blueprint, current_app, jsonify
+from app.metrics import get_metrics, render_prometheus
+
+metrics_blp = Blueprint("metrics", __name__)
+
+
+@metrics_blp.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """
+    GET /metrics
+    설명: 모든 gunicorn 워커의 커넥션 풀/쿼리/요청 시간 측정값을 합쳐 Prometheus 텍스트 형식으로 반환
+    (각 워커 값은 METRICS_FLUSH_INTERVAL 초마다 갱신, nginx 에서 외부 접근은 막아 둔다)
+    """
+    registry = get_metrics()
+    if registry is None:
+        return jsonify({"error": "METRICS_ENABLED 설정이 꺼져 있습니다."}), 404
+
+    registry.flush()
+    return current_app.response_class(
+        render_prometheus(*registry.collect()),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -1,5 +1,11 @@
-from flask import Blueprint, jsonify, request
-from app.models import Question, Choices
+from flask import Blueprint, current_app, jsonify, request
+from app.catalog import (
+    get_active_question_count,
+    get_question_payload,
+    get_survey_payload,
+    invalidate_catalog,
+)
+from app.models import Question
 from config import db
 
 questions_blp = Blueprint('questions', __name__, url_prefix='/questions')
@@ -11,19 +17,37 @@ def get_question_by_sqe(question_sqe):
     GET /questions/<int:question_sqe>
     설명: sqe 기준으로 질문 1개 + 선택지 배열 반환
     """
-    question = Question.query.filter_by(sqe=question_sqe, is_active=True).first()
+    # 질문/이미지/선택지는 관리자 수정 시에만 바뀌므로 카탈로그 캐시에서 읽는다
+    question = get_question_payload(question_sqe)
 
     if not question:
         return jsonify({"error": "존재하지 않는 질문입니다."}), 404
 
-    choices = Choices.query.filter_by(question_id=question.id, is_active=True).order_by(Choices.sqe).all()
+    return jsonify(question), 200
 
-    return jsonify({
-        "id": question.id,
-        "title": question.title,
-        "image": question.image.url if question.image else None,
-        "choices": [c.to_dict() for c in choices]
-    }), 200
+
+@questions_blp.route('/all', methods=['GET'])
+def get_all_questions():
+    """
+    GET /questions/all
+    설명: 활성 질문 전체 + 선택지 배열을 한 번에 반환 (설문 전체를 한 번의 요청으로 로딩)
+    미리 직렬화/gzip 압축해 둔 본문을 그대로 내려주고, ETag 가 같으면 304 반환
+    """
+    survey = get_survey_payload()
+    use_gzip = "gzip" in request.accept_encodings
+    etag = survey.gzip_etag if use_gzip else survey.etag
+
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        body = survey.gzip_body if use_gzip else survey.body
+        response = current_app.response_class(body, mimetype="application/json")
+        if use_gzip:
+            response.headers["Content-Encoding"] = "gzip"
+
+    response.set_etag(etag)
+    response.vary.add("Accept-Encoding")
+    return response
 
 
 @questions_blp.route('/count', methods=['GET'])
@@ -32,7 +56,7 @@ def question_count():
     GET /questions/count
     설명: 전체 질문 개수 반환
     """
-    total = Question.query.filter_by(is_active=True).count()
+    total = get_active_question_count()
     return jsonify({"total": total})
 
 
@@ -52,6 +76,7 @@ def create_question():
         )
         db.session.add(question)
         db.session.commit()
+        invalidate_catalog()
         return jsonify({
             "message": f"Title: {question.title} question Success Create"
         }), 201
@@ -1,36 +1,69 @@
-from flask import jsonify, Blueprint
-from sqlalchemy import func
-from config import db
-from app.models import Answer, Choices, Question
+import hmac
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import Response, current_app, jsonify, Blueprint, request, send_file, url_for
+from app.analytics import DIMENSIONS, AnalyticsUnavailable, AnswerMatrix, analytics_result, get_analytics
+from app.answer_log import get_answer_buffer
+from app.catalog import get_catalog
+from app.db_routing import get_replica_router
+from app.export import FORMATS, get_export_jobs, resolve_format
+from app.live_stats import SubscriberDropped, get_live_stats, sse_event
+from app.models import KST, AgeStatus, GenderStatus
+from app.progress import get_user_progress
+from app.shared_counters import get_shared_counters, load_choice_counts
+from app.snapshots import get_snapshots, snapshot_response
+from app.tallies import load_demographic_cube
+from app.timeseries import GRANULARITIES, bucket_start, load_timeseries
 
 stats_routes_blp = Blueprint('stats_routes', __name__)
 
+
+# 시간대별 조회 기본 구간 / 최대 구간 (구간 수가 너무 많아지지 않도록)
+TIMESERIES_DEFAULT_RANGE = {"hour": timedelta(days=1), "day": timedelta(days=30)}
+TIMESERIES_MAX_RANGE = {"hour": timedelta(days=31), "day": timedelta(days=366)}
+
+
+def _parse_kst(value):
+    """ISO 형식 날짜/시각 파싱, 시간대가 없으면 KST 로 본다."""
+    parsed = datetime.fromisoformat(value)
+    return parsed.replace(tzinfo=KST) if parsed.tzinfo is None else parsed.astimezone(KST)
+
+
+def _rate_rows(rows, totals):
+    return [
+        {
+            "question_id": row.question_id,
+            "choice_id": row.choice_id,
+            "answer_count": row.answer_count,
+            "percentage": round(row.answer_count * 100 / totals(row), 2)  # 소수점 2자리 반올림
+        }
+        for row in rows
+    ]
+
+
+def _answer_rate_data():
+    # answers 전체 대신 워커들이 공유하는 선택지별 응답 수 배열(없으면 choice_tallies)만 읽는다
+    rows = load_choice_counts()
+    total = sum(row.answer_count for row in rows)
+    return _rate_rows(rows, lambda row: total)
+
+
+def _answer_distribution_data():
+    rows = load_choice_counts()
+    question_totals = defaultdict(int)
+    for row in rows:
+        question_totals[row.question_id] += row.answer_count
+    return _rate_rows(rows, lambda row: question_totals[row.question_id])
+
+
 # 1. 사용 중인 유저의 각 질문당 선택지 선택 비율
 @stats_routes_blp.route('/stats/answer_rate_by_choice', methods=['GET'])
 def user_answer_rate():
+    # 대시보드 폴링마다 다시 계산하지 않고, 워커들이 공유하는 스냅샷(STATS_SNAPSHOT_TTL)을 내려준다
     try:
-        result = db.session.query(
-            Question.id.label('question_id'),
-            Choices.id.label('choice_id'),
-            func.count(Answer.id).label('answer_count'),
-            (func.count(Answer.id) * 100 / func.sum(func.count(Answer.id)).over()).label('percentage')
-        ).join(Choices, Choices.id == Answer.choice_id) \
-         .join(Question, Question.id == Choices.question_id) \
-         .group_by(Question.id, Choices.id) \
-         .order_by(Question.id, Choices.id) \
-         .all()
-
-        data = [
-            {
-                "question_id": row.question_id,
-                "choice_id": row.choice_id,
-                "answer_count": row.answer_count,
-                "percentage": round(row.percentage, 2)  # 소수점 2자리 반올림
-            }
-            for row in result
-        ]
-
-        return jsonify(data), 200
+        return snapshot_response("answer_rate_by_choice", _answer_rate_data)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -39,27 +72,397 @@ def user_answer_rate():
 @stats_routes_blp.route('/stats/answer_count_by_question', methods=['GET'])
 def question_answer_distribution():
     try:
-        result = db.session.query(
-            Question.id.label('question_id'),
-            Choices.id.label('choice_id'),
-            func.count(Answer.id).label('answer_count'),
-            (func.count(Answer.id) * 100 / func.sum(func.count(Answer.id)).over(partition_by=Question.id)).label('percentage')
-        ).join(Choices, Choices.id == Answer.choice_id) \
-         .join(Question, Question.id == Choices.question_id) \
-         .group_by(Question.id, Choices.id) \
-         .order_by(Question.id, Choices.id) \
-         .all()
-
-        data = [
-            {
-                "question_id": row.question_id,
-                "choice_id": row.choice_id,
-                "answer_count": row.answer_count,
-                "percentage": round(row.percentage, 2)  # 소수점 2자리 반올림
-            }
-            for row in result
-        ]
-
-        return jsonify(data), 200
+        return snapshot_response("answer_count_by_question", _answer_distribution_data)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# 3. 질문/선택지 카탈로그 캐시 적중률 (모니터링용, 워커별 값)
+@stats_routes_blp.route('/stats/catalog_cache', methods=['GET'])
+def catalog_cache_stats():
+    return jsonify(get_catalog().stats()), 200
+
+
+# 3-1. 사용자별 응답 목록(이어서 응답하기) 캐시 적중률 (워커별 값)
+@stats_routes_blp.route('/stats/user_progress_cache', methods=['GET'])
+def user_progress_cache_stats():
+    return jsonify(get_user_progress().stats()), 200
+
+
+# 4. write-behind 응답 버퍼 상태 (대기 중인 제출 수, flush 지연시간, 워커별 값)
+@stats_routes_blp.route('/stats/answer_buffer', methods=['GET'])
+def answer_buffer_stats():
+    answer_buffer = get_answer_buffer()
+    if answer_buffer is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify(answer_buffer.stats()), 200
+
+
+# 5. 통계 스냅샷 갱신 횟수 / 오래된 스냅샷 응답 수 (워커별 값)
+@stats_routes_blp.route('/stats/snapshots', methods=['GET'])
+def stats_snapshot_stats():
+    return jsonify(get_snapshots().stats()), 200
+
+
+# 5-1. 읽기 전용 replica 상태 (연결/복제 지연, 보낸 요청 수, primary 로 대신 보낸 수)
+@stats_routes_blp.route('/stats/replicas', methods=['GET'])
+def replica_stats():
+    router = get_replica_router()
+    if router is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify(router.stats()), 200
+
+
+# 5-2. 선택지 하나의 전체 응답 수 (공유 배열에서 O(1) 로 읽음, DB 조회 없음)
+@stats_routes_blp.route('/stats/choices/<int:choice_id>/count', methods=['GET'])
+def choice_answer_count(choice_id):
+    counters = get_shared_counters()
+    if counters is None:
+        return jsonify({"error": "SHARED_COUNTERS_ENABLED 설정이 꺼져 있습니다."}), 404
+    return jsonify({"choice_id": choice_id, "answer_count": counters.count(choice_id)}), 200
+
+
+# 5-3. 응답 수 공유 배열 상태 (capacity, 마지막 체크포인트 시각, DB 대조 보정 횟수)
+@stats_routes_blp.route('/stats/shared_counters', methods=['GET'])
+def shared_counters_stats():
+    counters = get_shared_counters()
+    if counters is None:
+        return jsonify({"enabled": False}), 200
+    return jsonify(counters.stats()), 200
+
+
+# 6. 선택지별 응답 수 실시간 스트림 (SSE, 폴링 대신 사용)
+@stats_routes_blp.route('/stats/stream', methods=['GET'])
+def answer_count_stream():
+    """
+    GET /stats/stream (Accept: text/event-stream)
+    설명: 연결 직후 event: snapshot 으로 선택지별 전체 응답 수를 보내고,
+          이후 STATS_STREAM_INTERVAL 마다 바뀐 선택지만 event: delta 로 보낸다. (변화가 없으면 보내지 않음)
+          이벤트를 제때 받지 못해 STATS_STREAM_MAX_PENDING 개가 쌓이면 event: dropped 후 연결을 끊는다.
+    """
+    feed = get_live_stats()
+    subscriber, snapshot = feed.subscribe()
+    if subscriber is None:
+        return jsonify({"error": "실시간 통계 연결 수가 너무 많습니다. 잠시 후 다시 시도해주세요."}), 503
+
+    heartbeat = current_app.config.get("STATS_STREAM_HEARTBEAT", 15)
+
+    def stream():
+        try:
+            yield sse_event("snapshot", snapshot, snapshot["seq"])
+            while True:
+                try:
+                    event = subscriber.next(heartbeat)
+                except SubscriberDropped:
+                    yield sse_event("dropped", {"reason": "too slow"})
+                    return
+                if event is None:
+                    # 프록시/브라우저가 유휴 연결을 끊지 않도록 주석 줄 전송
+                    yield ": keep-alive\n\n"
+                    continue
+                yield sse_event("delta", event, event["seq"])
+        finally:
+            feed.unsubscribe(subscriber)
+
+    response = Response(stream(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # nginx 가 이벤트를 모아서 보내지 않도록
+    return response
+
+
+# 7. 실시간 통계 스트림 구독자 수 / 끊은 느린 클라이언트 수 (워커별 값)
+@stats_routes_blp.route('/stats/stream/status', methods=['GET'])
+def answer_count_stream_status():
+    return jsonify(get_live_stats().stats()), 200
+
+
+# 8. 질문/선택지별 응답 수를 연령대 × 성별로 나눈 큐브 (집계 테이블에서 O(선택지 × 10) 행만 읽음)
+@stats_routes_blp.route('/stats/demographics', methods=['GET'])
+def demographic_distribution():
+    """
+    GET /stats/demographics?question_id=<id>&age=<teen..fifty>&gender=<male|female>&by=age,gender
+    설명: by 로 나눌 차원(age, gender, 둘 다 기본) 을 고르고 나머지 파라미터로 필터
+    """
+    dimensions = [d for d in request.args.get('by', 'age,gender').split(',') if d]
+    if any(d not in ('age', 'gender') for d in dimensions):
+        return jsonify({"error": "by 는 age, gender 중에서 골라야 합니다."}), 400
+
+    try:
+        question_id = request.args.get('question_id', type=int)
+        age = AgeStatus(request.args['age']) if 'age' in request.args else None
+        gender = GenderStatus(request.args['gender']) if 'gender' in request.args else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        cells, population = load_demographic_cube(dimensions, question_id, age, gender)
+
+        return jsonify({
+            "dimensions": dimensions,
+            "cells": [
+                {
+                    "question_id": row.question_id,
+                    "choice_id": row.choice_id,
+                    **{d: getattr(row, d).value for d in dimensions},
+                    "answer_count": int(row.answer_count)
+                }
+                for row in cells
+            ],
+            "population": [
+                {**{d: getattr(row, d).value for d in dimensions}, "user_count": int(row.user_count)}
+                for row in population
+            ]
+        }), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# 9. 질문/선택지별 시간대(hour/day) 응답 수 (answers 대신 롤업 테이블만 읽음)
+@stats_routes_blp.route('/stats/timeseries', methods=['GET'])
+def answer_timeseries():
+    """
+    GET /stats/timeseries?question_id=<id>|choice_id=<id>&bucket=<hour|day>&start=<ISO>&end=<ISO>
+    설명: KST 기준 구간별 응답 수. start/end 에 시간대가 없으면 KST 로 보고, end 는 포함하지 않는다.
+          응답이 없는 구간은 0 으로 채우며, compacted_through_answer_id 까지의 응답만 반영되어 있다.
+    """
+    granularity = request.args.get('bucket', 'hour')
+    if granularity not in GRANULARITIES:
+        return jsonify({"error": "bucket 은 hour, day 중 하나여야 합니다."}), 400
+
+    question_id = request.args.get('question_id', type=int)
+    choice_id = request.args.get('choice_id', type=int)
+    if question_id is None and choice_id is None:
+        return jsonify({"error": "question_id 또는 choice_id 가 필요합니다."}), 400
+
+    try:
+        end = _parse_kst(request.args['end']) if 'end' in request.args else datetime.now(tz=KST)
+        start = (
+            _parse_kst(request.args['start']) if 'start' in request.args
+            else end - TIMESERIES_DEFAULT_RANGE[granularity]
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if start >= end:
+        return jsonify({"error": "start 는 end 보다 이전이어야 합니다."}), 400
+    if end - start > TIMESERIES_MAX_RANGE[granularity]:
+        return jsonify({"error": f"{granularity} 단위 조회는 최대 {TIMESERIES_MAX_RANGE[granularity].days}일까지 가능합니다."}), 400
+
+    try:
+        rows, compacted_through = load_timeseries(granularity, start, end, question_id, choice_id)
+
+        # 구간 시작 시각 목록 (start 가 걸친 구간부터)
+        step = timedelta(hours=1) if granularity == 'hour' else timedelta(days=1)
+        buckets = []
+        current = bucket_start(start, granularity)
+        end_naive = end.replace(tzinfo=None)
+        while current < end_naive:
+            buckets.append(current)
+            current += step
+
+        series = {}
+        for row in rows:
+            entry = series.setdefault(row.choice_id, {"question_id": row.question_id, "counts": {}})
+            entry["counts"][row.bucket_start] = row.answer_count
+
+        return jsonify({
+            "bucket": granularity,
+            "timezone": "Asia/Seoul",
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "compacted_through_answer_id": compacted_through,
+            "series": [
+                {
+                    "question_id": entry["question_id"],
+                    "choice_id": series_choice_id,
+                    "points": [
+                        {
+                            "bucket_start": bucket.replace(tzinfo=KST).isoformat(),
+                            "answer_count": entry["counts"].get(bucket, 0)
+                        }
+                        for bucket in buckets
+                    ]
+                }
+                for series_choice_id, entry in series.items()
+            ]
+        }), 200
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+
+# 10. 분석용 응답 내보내기 (answers.id keyset 페이지 단위, Parquet 또는 gzip CSV)
+# 최대 EXPORT_MAX_ROWS_PER_REQUEST 건을 읽으므로 요청 스레드에서 실행하지 않고 작업을 만든 뒤 상태를 조회하게 한다.
+JOB_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+def _check_export_token():
+    """내보내기 API 토큰 확인 (문제가 없으면 None, 있으면 오류 응답)"""
+    token = current_app.config.get("EXPORT_API_TOKEN")
+    if not token:
+        return jsonify({"error": "EXPORT_API_TOKEN 설정이 없어 내보내기 API 가 꺼져 있습니다."}), 404
+    if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return jsonify({"error": "내보내기 토큰이 올바르지 않습니다."}), 401
+    return None
+
+
+def _export_job_or_404(job_id):
+    job = get_export_jobs().get(job_id) if JOB_ID_PATTERN.fullmatch(job_id) else None
+    if job is None:
+        return None, (jsonify({"error": "내보내기 작업을 찾을 수 없습니다."}), 404)
+    return job, None
+
+
+def _export_job_body(job):
+    body = {key: job[key] for key in (
+        "job_id", "status", "format", "after_id", "max_rows",
+        "rows", "first_answer_id", "last_answer_id", "error",
+    )}
+    body["status_url"] = url_for("stats_routes.export_answers_status", job_id=job["job_id"])
+    if job["status"] == "done":
+        body["file_url"] = url_for("stats_routes.export_answers_download", job_id=job["job_id"])
+    return body
+
+
+@stats_routes_blp.route('/stats/export/answers', methods=['POST'])
+def export_answers_file():
+    """
+    POST /stats/export/answers?after_id=<id>&format=<auto|parquet|csv>&max_rows=<n>
+    Header: Authorization: Bearer <EXPORT_API_TOKEN>
+    설명: after_id 보다 큰 answers.id 를 최대 max_rows 건 내보내는 작업을 백그라운드에서 시작하고 202 와 job_id 를 반환한다.
+          (replica 가 설정되어 있으면 replica 에서 읽음) status_url 을 조회해서 status 가 done 이면 file_url 로 받고,
+          새 응답이 없으면 status 는 empty 가 된다. last_answer_id 를 다음 요청의 after_id 로 넘기면 이어서 받을 수 있다.
+          정기 작업은 watermark 를 관리하는 flask export answers 를 사용한다.
+    """
+    error = _check_export_token()
+    if error is not None:
+        return error
+
+    limit = current_app.config.get("EXPORT_MAX_ROWS_PER_REQUEST", 1000000)
+    try:
+        after_id = request.args.get('after_id', 0, type=int)
+        max_rows = min(request.args.get('max_rows', limit, type=int), limit)
+        fmt = resolve_format(request.args.get('format', 'auto'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if max_rows <= 0:
+        return jsonify({"error": "max_rows 는 1 이상이어야 합니다."}), 400
+
+    job = get_export_jobs().start(
+        fmt, after_id, max_rows,
+        chunk_size=current_app.config.get("EXPORT_CHUNK_SIZE", 50000),
+        safety_lag=current_app.config.get("EXPORT_SAFETY_LAG", 60),
+    )
+    if job is None:
+        return jsonify({"error": "이미 실행 중인 내보내기 작업이 있습니다. 잠시 후 다시 시도해 주세요."}), 409
+    response = jsonify(_export_job_body(job))
+    response.headers["Location"] = response.json["status_url"]
+    return response, 202
+
+
+@stats_routes_blp.route('/stats/export/answers/<job_id>', methods=['GET'])
+def export_answers_status(job_id):
+    """
+    GET /stats/export/answers/<job_id>
+    Header: Authorization: Bearer <EXPORT_API_TOKEN>
+    설명: 내보내기 작업 상태 (running / done / empty / failed)
+    """
+    error = _check_export_token()
+    if error is not None:
+        return error
+    job, error = _export_job_or_404(job_id)
+    if error is not None:
+        return error
+    return jsonify(_export_job_body(job)), 200
+
+
+@stats_routes_blp.route('/stats/export/answers/<job_id>/file', methods=['GET'])
+def export_answers_download(job_id):
+    """
+    GET /stats/export/answers/<job_id>/file
+    Header: Authorization: Bearer <EXPORT_API_TOKEN>
+    설명: 끝난(done) 내보내기 작업의 결과 파일 (EXPORT_JOB_TTL 동안 다시 받을 수 있음)
+    """
+    error = _check_export_token()
+    if error is not None:
+        return error
+    job, error = _export_job_or_404(job_id)
+    if error is not None:
+        return error
+    if job["status"] != "done":
+        return jsonify({"error": f"내보내기 작업이 끝나지 않았습니다: {job['status']}", **_export_job_body(job)}), 409
+
+    extension = FORMATS[job["format"]].extension
+    response = send_file(
+        get_export_jobs().file_path(job),
+        mimetype=FORMATS[job["format"]].mimetype,
+        as_attachment=True,
+        download_name=f"answers-after-{job['after_id']}.{extension}",
+    )
+    response.headers["X-Export-Rows"] = str(job["rows"])
+    response.headers["X-Export-First-Answer-Id"] = str(job["first_answer_id"])
+    response.headers["X-Export-Last-Answer-Id"] = str(job["last_answer_id"])
+    return response
+
+
+# 11. 선택지 × 인구통계 카이제곱 독립성 검정 (워커 메모리의 응답 행렬로 계산, 데이터 버전별 캐시)
+@stats_routes_blp.route('/stats/chi_square', methods=['GET'])
+def choice_demographic_chi_square():
+    """
+    GET /stats/chi_square?question_id=<id>&by=<age|gender|age_gender>
+    설명: 질문의 선택지 분포가 연령대/성별과 독립인지 검정 (p_value 가 작을수록 인구통계에 따라 선택이 다름)
+          ANALYTICS_SAFETY_LAG 초 이전 응답까지, 질문당 사용자의 마지막 응답 기준
+    """
+    question_id = request.args.get('question_id', type=int)
+    dimension = request.args.get('by', 'age')
+    if question_id is None:
+        return jsonify({"error": "question_id 가 필요합니다."}), 400
+    if dimension not in DIMENSIONS:
+        return jsonify({"error": f"by 는 {', '.join(DIMENSIONS)} 중 하나여야 합니다."}), 400
+
+    try:
+        result, meta = analytics_result("chi_square", AnswerMatrix.chi_square, question_id, dimension)
+    except AnalyticsUnavailable as e:
+        return jsonify({"error": str(e)}), 503
+    if result is None:
+        return jsonify({"error": "응답이 없는 질문입니다."}), 404
+    return jsonify({**result, **meta}), 200
+
+
+# 12. 질문별 응답 엔트로피 (선택이 고르게 퍼질수록 normalized_entropy 가 1 에 가까움)
+@stats_routes_blp.route('/stats/entropy', methods=['GET'])
+def question_entropy():
+    try:
+        result, meta = analytics_result("entropy", AnswerMatrix.entropy)
+    except AnalyticsUnavailable as e:
+        return jsonify({"error": str(e)}), 503
+    return jsonify({"questions": result, **meta}), 200
+
+
+# 13. 선택지 동시 선택 (choice_id 를 고른 사용자가 다른 질문에서 고른 선택지 비율과 lift)
+@stats_routes_blp.route('/stats/cooccurrence', methods=['GET'])
+def choice_cooccurrence():
+    """
+    GET /stats/cooccurrence?choice_id=<id>&question_id=<다른 질문 id, 생략하면 모든 질문>
+    설명: lift = P(다른 선택지 | choice_id 선택) / P(다른 선택지), 1 보다 크면 함께 고르는 경향
+    """
+    choice_id = request.args.get('choice_id', type=int)
+    other_question_id = request.args.get('question_id', type=int)
+    if choice_id is None:
+        return jsonify({"error": "choice_id 가 필요합니다."}), 400
+
+    try:
+        result, meta = analytics_result("cooccurrence", AnswerMatrix.cooccurrence, choice_id, other_question_id)
+    except AnalyticsUnavailable as e:
+        return jsonify({"error": str(e)}), 503
+    if result is None:
+        return jsonify({"error": "응답이 없는 선택지 또는 질문입니다."}), 404
+    return jsonify({**result, **meta}), 200
+
+
+# 14. 분석용 응답 행렬 상태 (반영한 answers.id, 사용자 수, 메모리 사용량, 워커별 값)
+@stats_routes_blp.route('/stats/analytics', methods=['GET'])
+def analytics_status():
+    try:
+        return jsonify(get_analytics().stats()), 200
+    except AnalyticsUnavailable as e:
+        return jsonify({"error": str(e)}), 503
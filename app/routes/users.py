@@ -1,7 +1,10 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from sqlalchemy.exc import IntegrityError
 
 from app.models import User
+from app.progress import get_resume_point, get_user_answers
+from app.signup_import import SignupImportError, import_signups, read_csv_rows, summarize_results
+from app.tallies import increment_user_population
 from config import db
 
 user_blp = Blueprint("users", __name__)
@@ -35,6 +38,8 @@ def signup_page():
         )
 
         db.session.add(user)
+        # 연령대/성별 가입자 수 집계도 같은 트랜잭션에서 함께 증가
+        increment_user_population([(user.age, user.gender)])
         db.session.commit()
 
         return (
@@ -51,3 +56,91 @@ def signup_page():
     except IntegrityError:
         db.session.rollback()
         return jsonify({"message": "이미 존재하는 계정 입니다."}), 400
+
+
+
+@user_blp.route("/signup/bulk", methods=["POST"])
+def bulk_signup():
+    """
+    제휴사 응답자 일괄 가입
+
+    Request Body (둘 중 하나):
+    - Content-Type: application/json
+      [{ "name": "kim", "age": "teen", "gender": "male", "email": "a@b.c" }, ...]
+    - Content-Type: text/csv (첫 줄은 헤더, 본문을 한 줄씩 읽으며 처리)
+      name,age,gender,email
+      kim,teen,male,a@b.c
+
+    Response:
+    {
+      "created": 2, "duplicate": 1, "invalid": 1,
+      "results": [
+        { "row": 1, "email": "a@b.c", "status": "created", "user_id": 10 },
+        { "row": 2, "email": "b@b.c", "status": "duplicate", "message": "이미 존재하는 계정 입니다." },
+        ...
+      ]
+    }
+
+    본문 전체를 검사한 뒤(SIGNUP_IMPORT_MAX_ROWS 초과 시 아무것도 저장하지 않고 400)
+    SIGNUP_IMPORT_CHUNK_SIZE 건씩 이메일 중복 조회(IN) 1번, INSERT 1번, commit 1번으로 저장합니다.
+    """
+    chunk_size = current_app.config.get("SIGNUP_IMPORT_CHUNK_SIZE", 1000)
+    max_rows = current_app.config.get("SIGNUP_IMPORT_MAX_ROWS", 100000)
+
+    if request.mimetype == "text/csv":
+        records = read_csv_rows(request.stream, request.mimetype_params.get("charset", "utf-8-sig"))
+    elif request.is_json:
+        records = request.get_json(silent=True)
+        if not isinstance(records, list) or not records:
+            return jsonify({"message": "가입 목록이 비어 있거나 배열 형식이 아닙니다."}), 400
+        if len(records) > max_rows:
+            return jsonify({"message": f"한 번에 가입할 수 있는 최대 인원은 {max_rows}명입니다."}), 400
+    else:
+        return jsonify({"message": "요청은 JSON 배열 또는 CSV 형식이어야 합니다."}), 400
+
+    try:
+        results = import_signups(records, chunk_size=chunk_size, max_rows=max_rows)
+    except SignupImportError as e:
+        return jsonify({"message": str(e)}), 400
+
+    return jsonify({**summarize_results(results), "results": results}), 200
+
+
+@user_blp.route("/users/<int:user_id>/answers", methods=["GET"])
+def user_answers(user_id):
+    """
+    사용자가 이미 응답한 선택지 목록 (질문 순)
+
+    Response:
+    {
+      "user_id": 1,
+      "answers": [{ "question_id": 1, "choice_id": 2 }, ...]
+    }
+    """
+    answers = get_user_answers(user_id)
+    if answers is None:
+        return jsonify({"message": "존재하지 않는 사용자입니다."}), 404
+    return jsonify({
+        "user_id": user_id,
+        "answers": [{"question_id": question_id, "choice_id": choice_id} for question_id, choice_id in answers],
+    }), 200
+
+
+@user_blp.route("/users/<int:user_id>/resume", methods=["GET"])
+def user_resume(user_id):
+    """
+    이어서 응답할 질문 (아직 응답하지 않은 활성 질문 중 sqe 가 가장 작은 질문)
+
+    Response:
+    {
+      "user_id": 1,
+      "next_sqe": 3,          // 모두 응답했으면 null
+      "answered_count": 2,
+      "total_count": 10,
+      "completed": false
+    }
+    """
+    resume = get_resume_point(user_id)
+    if resume is None:
+        return jsonify({"message": "존재하지 않는 사용자입니다."}), 404
+    return jsonify(resume), 200
@@ -0,0 +1,62 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson 이 없으면 표준 json 으로 직렬화 (결과는 같음)
+    orjson = None
+
+
+def _default(value):
+    """
+    표준 json 이 모르는 값 변환 (orjson 과 같은 결과가 나오도록)
+    datetime → isoformat, Enum → value, Decimal(MySQL SUM 결과) → int/float, 나머지는 Flask 기본 변환
+    """
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return DefaultJSONProvider.default(value)
+
+
+def dumps(data, sort_keys=False):
+    """JSON bytes (orjson 이 있으면 orjson 사용)"""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(data, default=_default, option=option)
+    return json.dumps(
+        data, default=_default, ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys
+    ).encode("utf-8")
+
+
+def rows_as_dicts(result):
+    """
+    select(컬럼...) 결과(튜플 행)를 {컬럼명: 값} 목록으로 변환
+    ORM 객체를 만들지 않고 to_dict() 의 hasattr/.value/isoformat 호출도 없이 그대로 직렬화할 수 있다.
+    (Enum, datetime 은 dumps 에서 value, isoformat 으로 변환)
+    """
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    jsonify 가 orjson 으로 직렬화하도록 바꾼 JSON provider
+    datetime 은 Flask 기본(HTTP 날짜 형식) 대신 isoformat 으로 내보내 모델 to_dict() 결과와 맞춘다.
+    """
+
+    def dumps(self, obj, **kwargs):
+        kwargs.setdefault("default", _default)
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if orjson is None or self._app.debug:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj, sort_keys=self.sort_keys) + b"\n", mimetype=self.mimetype)
@@ -0,0 +1,343 @@
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from app.models import ChoiceTally, Choices
+from app.tallies import load_choice_tallies
+from config import db
+
+logger = logging.getLogger(__name__)
+
+# 파일 구조: 헤더 64 bytes + 슬롯 capacity 개 (슬롯 = int64 [question_id, answer_count], choice_id 가 곧 슬롯 번호)
+MAGIC = b"OZCNT001"
+HEADER_SIZE = 64
+SLOT_SIZE = 16
+CAPACITY_OFFSET = 8
+CHECKPOINT_OFFSET = 16  # 마지막 체크포인트(msync) 시각 (unix ms)
+RECONCILES_OFFSET = 24  # DB 대조 횟수
+INT64 = struct.Struct("<q")
+MIN_CAPACITY = 1024
+
+ChoiceCount = namedtuple("ChoiceCount", "question_id choice_id answer_count")
+
+
+def _capacity_for(choice_id):
+    capacity = MIN_CAPACITY
+    while capacity <= choice_id:
+        capacity *= 2
+    return capacity
+
+
+class SharedAnswerCounters:
+    """
+    선택지별 응답 수를 모든 gunicorn 워커가 mmap 으로 공유하는 int64 배열 파일
+    - 읽기: 8 bytes 정렬된 int64 를 잠금 없이 그대로 읽는다. (선택지 하나는 O(1), 전체는 배열 한 번 훑기)
+    - 쓰기: submit 커밋 후 슬롯 단위 fcntl.lockf(다른 프로세스) + 스레드 락(같은 프로세스)으로 read-modify-write
+    - 배열보다 큰 choice_id 가 오면 파일을 두 배씩 늘리고, 다른 워커는 헤더의 capacity 를 보고 다시 매핑한다.
+    - choice_tallies(트랜잭션으로 관리되는 원본)와 주기적으로 대조해서, 두 번 연속 같은 차이가 나는 슬롯만 보정한다.
+      (커밋 직후 아직 증가시키지 못한 요청 때문에 잠깐 생기는 차이는 보정하지 않음)
+    """
+
+    def __init__(self, path, lock_stripes=64):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self.reconcile_lock_path = f"{path}.reconcile.lock"
+        self.drift_path = f"{path}.drift.json"
+        self._local_locks = [threading.Lock() for _ in range(lock_stripes)]
+        self._map_lock = threading.Lock()
+        self._pid = None
+        self._state = None  # (fd, mmap, int64 memoryview, capacity)
+        self._pending_drift = {}
+        self.corrections = 0
+
+    # ---- 파일 열기 / 매핑 ----
+
+    @contextmanager
+    def _flock(self, path, blocking=True):
+        with open(path, "a") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _valid(self):
+        try:
+            with open(self.path, "rb") as f:
+                header = f.read(HEADER_SIZE)
+        except FileNotFoundError:
+            return False
+        if len(header) < HEADER_SIZE or header[:8] != MAGIC:
+            return False
+        capacity = INT64.unpack_from(header, CAPACITY_OFFSET)[0]
+        return os.path.getsize(self.path) >= HEADER_SIZE + capacity * SLOT_SIZE
+
+    def _create_from_db(self):
+        """choice_tallies 로 새 파일을 만든다. (앱 컨텍스트 안, 파일 락을 잡은 상태에서 호출)"""
+        rows = db.session.execute(
+            select(ChoiceTally.choice_id, ChoiceTally.question_id, ChoiceTally.answer_count)
+        ).all()
+        max_choice_id = max(
+            [db.session.scalar(select(func.max(Choices.id))) or 0] + [row.choice_id for row in rows]
+        )
+        capacity = _capacity_for(max_choice_id)
+        data = bytearray(HEADER_SIZE + capacity * SLOT_SIZE)
+        data[:8] = MAGIC
+        INT64.pack_into(data, CAPACITY_OFFSET, capacity)
+        INT64.pack_into(data, CHECKPOINT_OFFSET, int(time.time() * 1000))
+        for row in rows:
+            offset = HEADER_SIZE + row.choice_id * SLOT_SIZE
+            struct.pack_into("<qq", data, offset, row.question_id or 0, row.answer_count)
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        logger.info("응답 수 공유 배열 생성: 선택지 %d개, capacity %d", len(rows), capacity)
+
+    def _map(self):
+        fd = os.open(self.path, os.O_RDWR)
+        mm = mmap.mmap(fd, os.fstat(fd).st_size)
+        capacity = INT64.unpack_from(mm, CAPACITY_OFFSET)[0]
+        view = memoryview(mm)[HEADER_SIZE:HEADER_SIZE + capacity * SLOT_SIZE].cast("q")
+        # 다른 스레드가 이전 매핑을 읽는 중일 수 있으므로 닫지 않고 참조만 바꾼다 (GC 가 정리)
+        self._state = (fd, mm, view, capacity)
+        self._pid = os.getpid()
+
+    def _attach(self):
+        """파일을 (없으면 만들어서) 매핑한다. 이번 호출에서 DB 로 새로 만들었으면 True (_map_lock 을 잡은 상태에서 호출)"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        created = False
+        with self._flock(self.lock_path):
+            if not self._valid():
+                self._create_from_db()
+                created = True
+        self._map()
+        return created
+
+    def _ensure(self, choice_id=0):
+        """현재 프로세스에 매핑된 상태를 반환 (fork 후/파일이 커진 경우 다시 매핑, 필요하면 파일을 늘림)"""
+        state = self._state
+        if state is not None and self._pid == os.getpid() and choice_id < state[3]:
+            return state
+
+        with self._map_lock:
+            state = self._state
+            if state is None or self._pid != os.getpid():
+                self._attach()
+                state = self._state
+            if choice_id < state[3]:
+                return state
+
+            if INT64.unpack_from(state[1], CAPACITY_OFFSET)[0] <= choice_id:
+                with self._flock(self.lock_path):
+                    fd = state[0]
+                    capacity = INT64.unpack(os.pread(fd, 8, CAPACITY_OFFSET))[0]
+                    if capacity <= choice_id:
+                        capacity = _capacity_for(choice_id)
+                        os.ftruncate(fd, HEADER_SIZE + capacity * SLOT_SIZE)
+                        os.pwrite(fd, INT64.pack(capacity), CAPACITY_OFFSET)
+            self._map()
+            return self._state
+
+    # ---- 쓰기 ----
+
+    def _add(self, state, choice_id, question_id, delta):
+        fd, _, view, _ = state
+        offset = HEADER_SIZE + choice_id * SLOT_SIZE
+        with self._local_locks[choice_id % len(self._local_locks)]:
+            fcntl.lockf(fd, fcntl.LOCK_EX, SLOT_SIZE, offset)
+            try:
+                if question_id is not None:
+                    view[choice_id * 2] = question_id
+                view[choice_id * 2 + 1] += delta
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN, SLOT_SIZE, offset)
+
+    def increment(self, choice_ids, question_ids):
+        """
+        choice_ids: 커밋된 응답의 choice_id 목록, question_ids: {choice_id: question_id}
+        선택지마다 슬롯 하나씩만 잠그므로 서로 다른 선택지에 대한 증가는 기다리지 않는다.
+        """
+        if self._state is None or self._pid != os.getpid():
+            with self._map_lock:
+                if (self._state is None or self._pid != os.getpid()) and self._attach():
+                    # 방금 choice_tallies 로 만든 파일에는 이미 커밋된 이번 응답이 들어 있다
+                    return
+        counts = {}
+        for choice_id in choice_ids:
+            counts[choice_id] = counts.get(choice_id, 0) + 1
+        for choice_id, count in counts.items():
+            self._add(self._ensure(choice_id), choice_id, question_ids.get(choice_id), count)
+
+    # ---- 읽기 (잠금 없음) ----
+
+    def count(self, choice_id):
+        state = self._ensure()
+        if choice_id < 0 or choice_id >= state[3]:
+            return 0
+        return state[2][choice_id * 2 + 1]
+
+    def counts(self):
+        """answer_count > 0 인 선택지를 (question_id, choice_id) 순으로 (load_choice_tallies 와 같은 형태)"""
+        values = self._ensure()[2].tolist()
+        rows = [
+            ChoiceCount(values[index], index // 2, values[index + 1])
+            for index in range(0, len(values), 2)
+            if values[index + 1] > 0
+        ]
+        rows.sort(key=lambda row: (row.question_id, row.choice_id))
+        return rows
+
+    # ---- DB 대조 / 체크포인트 ----
+
+    def _load_pending_drift(self):
+        try:
+            with open(self.drift_path) as f:
+                return {int(choice_id): delta for choice_id, delta in json.load(f).items()}
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_pending_drift(self, pending):
+        tmp_path = f"{self.drift_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(pending, f)
+        os.replace(tmp_path, self.drift_path)
+        self._pending_drift = pending
+
+    def reconcile(self, force=False):
+        """
+        choice_tallies 와 비교해서 차이를 보정하고 파일을 디스크에 기록(msync)한다. (한 워커만 실행)
+        force=False 면 이전 대조 때와 같은 차이가 난 슬롯만, force=True 면 모든 차이를 바로 보정한다.
+        반환값: 보정한 슬롯 수 (다른 워커가 대조 중이면 None)
+        """
+        with self._flock(self.reconcile_lock_path, blocking=force) as locked:
+            if not locked:
+                return None
+            # DB 를 먼저 읽고 배열을 읽는다 (그 사이에 커밋된 응답은 배열에만 있어서 이번 차이는 음수로 보일 수 있음)
+            expected = {
+                row.choice_id: (row.question_id, row.answer_count)
+                for row in db.session.execute(
+                    select(ChoiceTally.choice_id, ChoiceTally.question_id, ChoiceTally.answer_count)
+                ).all()
+            }
+            db.session.rollback()
+            state = self._ensure(max(expected, default=0))
+            values = state[2].tolist()
+            actual = {index // 2: values[index + 1] for index in range(0, len(values), 2) if values[index + 1]}
+
+            drift = {}
+            for choice_id in expected.keys() | actual.keys():
+                question_id, answer_count = expected.get(choice_id, (None, 0))
+                delta = answer_count - actual.get(choice_id, 0)
+                if delta:
+                    drift[choice_id] = (question_id, delta)
+
+            # 직전 대조 결과는 대조를 실행한 워커가 매번 다를 수 있으므로 파일로 넘겨받는다
+            previous = self._load_pending_drift()
+            corrected = 0
+            pending = {}
+            for choice_id, (question_id, delta) in drift.items():
+                if force or previous.get(choice_id) == delta:
+                    self._add(self._ensure(choice_id), choice_id, question_id, delta)
+                    corrected += 1
+                else:
+                    pending[choice_id] = delta
+            self._save_pending_drift(pending)
+            if corrected:
+                self.corrections += corrected
+                logger.warning("응답 수 공유 배열 보정: 선택지 %d개", corrected)
+
+            state = self._ensure()
+            INT64.pack_into(state[1], CHECKPOINT_OFFSET, int(time.time() * 1000))
+            INT64.pack_into(state[1], RECONCILES_OFFSET, INT64.unpack_from(state[1], RECONCILES_OFFSET)[0] + 1)
+            state[1].flush()
+            return corrected
+
+    def stats(self):
+        state = self._ensure()
+        return {
+            "path": self.path,
+            "capacity": state[3],
+            "choices": len(self.counts()),
+            "checkpoint_at": INT64.unpack_from(state[1], CHECKPOINT_OFFSET)[0] / 1000,
+            "reconciles": INT64.unpack_from(state[1], RECONCILES_OFFSET)[0],
+            "pending_drift": len(self._pending_drift),
+            "corrections": self.corrections,
+        }
+
+
+def init_app(application):
+    """
+    SHARED_COUNTERS_ENABLED 면 STATE_DIR/answer_counts.bin 을 공유 배열로 사용하고,
+    워커마다 SHARED_COUNTERS_RECONCILE_INTERVAL 초마다 (한 워커만 실제로) DB 대조 + 체크포인트를 실행한다.
+    """
+    if not application.config.get("SHARED_COUNTERS_ENABLED", True):
+        return
+    counters = SharedAnswerCounters(os.path.join(application.config.get("STATE_DIR", "./var"), "answer_counts.bin"))
+    application.extensions["shared_counters"] = counters
+
+    interval = application.config.get("SHARED_COUNTERS_RECONCILE_INTERVAL", 30)
+    if interval <= 0:
+        return
+    started = {"pid": None}
+    lock = threading.Lock()
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                with application.app_context():
+                    counters.reconcile()
+            except Exception:
+                logger.exception("응답 수 공유 배열 대조 실패")
+
+    @application.before_request
+    def start_reconciler():
+        if started["pid"] == os.getpid():
+            return
+        with lock:
+            if started["pid"] != os.getpid():
+                threading.Thread(target=run, name="shared-counters-reconcile", daemon=True).start()
+                started["pid"] = os.getpid()
+
+
+def get_shared_counters():
+    return current_app.extensions.get("shared_counters")
+
+
+def record_answer_counts(choice_ids, question_ids):
+    """
+    submit 커밋 후 호출. 응답 저장은 이미 끝났으므로 어떤 예외든 기록만 하고 다음 대조 때 보정한다.
+    (여기서 예외가 올라가면 커밋된 제출이 500 으로 응답되거나 write-behind 에서 재시도/dead letter 처리된다)
+    """
+    try:
+        counters = get_shared_counters()
+        if counters is not None:
+            counters.increment(choice_ids, question_ids)
+    except Exception:
+        logger.exception("응답 수 공유 배열 증가 실패")
+
+
+def load_choice_counts():
+    """선택지별 응답 수 (공유 배열이 있으면 DB 를 읽지 않음, 없으면 choice_tallies)"""
+    counters = get_shared_counters()
+    if counters is None:
+        return load_choice_tallies()
+    return counters.counts()
@@ -0,0 +1,160 @@
+import codecs
+import csv
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app.models import KST, AgeStatus, GenderStatus, User
+from app.tallies import increment_user_population
+from config import db
+
+SIGNUP_FIELDS = ("name", "age", "gender", "email")
+AGES = {status.value: status for status in AgeStatus}
+GENDERS = {status.value: status for status in GenderStatus}
+NAME_MAX_LENGTH = User.__table__.c.name.type.length
+EMAIL_MAX_LENGTH = User.__table__.c.email.type.length
+
+
+class SignupImportError(ValueError):
+    """요청 본문 전체가 잘못된 경우 (400 응답)"""
+
+
+def validate_signup(data):
+    """
+    가입 정보 한 건 검사 (DB 조회 없이 필수 항목/Enum 값/길이만 확인)
+    반환값: (INSERT 할 dict, None) 또는 (None, 오류 메시지)
+    """
+    if not isinstance(data, dict):
+        return None, "객체 형식이 아닙니다."
+    missing = [field for field in SIGNUP_FIELDS if data.get(field) in (None, "")]
+    if missing:
+        return None, f"필수 입력 항목이 없습니다: {', '.join(missing)}"
+
+    name, email = str(data["name"]), str(data["email"])
+    age = AGES.get(data["age"]) if isinstance(data["age"], str) else None
+    gender = GENDERS.get(data["gender"]) if isinstance(data["gender"], str) else None
+    if age is None:
+        return None, f"age 는 {list(AGES)} 중 하나여야 합니다: {data['age']}"
+    if gender is None:
+        return None, f"gender 는 {list(GENDERS)} 중 하나여야 합니다: {data['gender']}"
+    if len(name) > NAME_MAX_LENGTH:
+        return None, f"name 은 {NAME_MAX_LENGTH}자 이하여야 합니다."
+    if len(email) > EMAIL_MAX_LENGTH:
+        return None, f"email 은 {EMAIL_MAX_LENGTH}자 이하여야 합니다."
+    return {"name": name, "age": age, "gender": gender, "email": email}, None
+
+
+def read_csv_rows(stream, encoding="utf-8-sig"):
+    """
+    요청 본문(CSV, 첫 줄은 헤더)을 한 줄씩 읽어서 dict 로 반환 (본문 전체를 메모리에 올리지 않는다)
+    기본 인코딩 utf-8-sig 는 엑셀에서 저장한 CSV 의 BOM 을 건너뛴다.
+    """
+    for row in csv.DictReader(codecs.iterdecode(stream, encoding)):
+        yield {key.strip(): (value.strip() if value is not None else None) for key, value in row.items() if key}
+
+
+def existing_emails_statement(emails):
+    """이미 가입된 이메일 (소문자로 비교해서 DB collation 과 상관없이 대소문자를 구분하지 않음)"""
+    return select(User.email, User.id).where(func.lower(User.email).in_([email.lower() for email in emails]))
+
+
+def _insert_rows_one_by_one(rows):
+    """
+    multi-row INSERT 가 두 번 연속 unique 제약에 걸린 경우, 행마다 SAVEPOINT 로 INSERT 해서
+    걸리는 행만 중복으로 처리한다. commit 은 호출한 쪽에서 한다.
+    반환값: 실제로 INSERT 한 행 목록
+    """
+    now = datetime.now(tz=KST)
+    inserted = []
+    for row in rows:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(User), [{**row, "created_at": now, "updated_at": now}])
+        except IntegrityError:
+            continue
+        inserted.append(row)
+    return inserted
+
+
+def _insert_chunk(chunk):
+    """
+    chunk: [(행 번호, INSERT 할 dict)]
+    이메일 중복은 IN 쿼리 한 번으로 미리 거르고, 나머지를 multi-row INSERT 한 뒤 한 번에 commit 한다.
+    이메일은 대소문자를 구분하지 않고 lower(email) 로 비교한다. (ix_users_email_lower 인덱스 사용)
+    반환값: {행 번호: user_id 또는 None(이미 가입된 이메일)}
+    """
+    emails = [row["email"] for _, row in chunk]
+    # 검사와 INSERT 사이에 다른 요청이 같은 이메일로 가입하면 unique 제약에서 걸리므로 한 번 더 확인 후 재시도
+    for attempt in range(2):
+        existing = {email.lower() for email, _ in db.session.execute(existing_emails_statement(emails))}
+        new_rows = [row for _, row in chunk if row["email"].lower() not in existing]
+        if not new_rows:
+            return {index: None for index, _ in chunk}
+
+        now = datetime.now(tz=KST)
+        try:
+            if attempt:
+                new_rows = _insert_rows_one_by_one(new_rows)
+            else:
+                db.session.execute(insert(User), [{**row, "created_at": now, "updated_at": now} for row in new_rows])
+            increment_user_population([(row["age"], row["gender"]) for row in new_rows])
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            continue
+        break
+
+    user_ids = {
+        email.lower(): user_id
+        for email, user_id in db.session.execute(existing_emails_statement([row["email"] for row in new_rows]))
+    }
+    created = {id(row) for row in new_rows}
+    return {index: user_ids[row["email"].lower()] if id(row) in created else None for index, row in chunk}
+
+
+def import_signups(records, chunk_size=1000, max_rows=None):
+    """
+    가입 정보 목록(JSON 배열 또는 read_csv_rows 결과)을 먼저 끝까지 읽어서 검사한 뒤 chunk_size 건씩 저장한다.
+    최대 행 수 초과나 CSV 디코딩 오류는 아무것도 저장하기 전에 SignupImportError 로 알린다.
+    행마다 commit 하지 않고 chunk 마다 IN 조회 1번 + INSERT 1번 + commit 1번으로 처리한다.
+    (같은 파일을 다시 보내면 이미 저장된 행은 duplicate 로 표시)
+    반환값: 행별 결과 목록 [{"row": 1, "status": "created" | "duplicate" | "invalid", ...}]
+    """
+    results = []
+    seen_emails = set()
+    rows = []
+
+    try:
+        for index, data in enumerate(records, start=1):
+            if max_rows is not None and index > max_rows:
+                raise SignupImportError(f"한 번에 가입할 수 있는 최대 인원은 {max_rows}명입니다.")
+
+            row, message = validate_signup(data)
+            result = {"row": index, "email": row["email"] if row else (data.get("email") if isinstance(data, dict) else None)}
+            results.append(result)
+            if row is None:
+                result.update(status="invalid", message=message)
+                continue
+            if row["email"].lower() in seen_emails:
+                result.update(status="duplicate", message="같은 요청 안에 중복된 이메일입니다.")
+                continue
+            seen_emails.add(row["email"].lower())
+            rows.append((index, row))
+    except (UnicodeDecodeError, LookupError) as e:
+        raise SignupImportError(f"CSV 를 읽을 수 없습니다: {e}")
+
+    for start in range(0, len(rows), chunk_size):
+        for index, user_id in _insert_chunk(rows[start:start + chunk_size]).items():
+            result = results[index - 1]
+            if user_id is None:
+                result.update(status="duplicate", message="이미 존재하는 계정 입니다.")
+            else:
+                result.update(status="created", user_id=user_id)
+    return results
+
+
+def summarize_results(results):
+    counts = Counter(result["status"] for result in results)
+    return {status: counts.get(status, 0) for status in ("created", "duplicate", "invalid")}
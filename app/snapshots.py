@@ -0,0 +1,185 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+
+from flask import current_app
+
+from app.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+
+class Snapshot:
+    """스냅샷 파일 하나를 읽어 둔 것 (계산 시각 + 미리 직렬화한 JSON 본문)"""
+
+    def __init__(self, computed_at, data):
+        self.computed_at = computed_at
+        self.body = dumps(data)
+
+    def age(self, now=None):
+        return max(0.0, (now or time.time()) - self.computed_at)
+
+
+class StatsSnapshots:
+    """
+    무거운 통계 결과를 STATE_DIR/snapshots/<이름>.json 에 저장해 두고 모든 워커가 같이 읽는다.
+    - ttl 이내: 저장된 스냅샷을 그대로 반환
+    - ttl 초과 ~ max_stale 이내: 오래된 스냅샷을 바로 반환하고, 백그라운드 스레드에서 갱신 (stale-while-revalidate)
+    - 스냅샷이 없거나 max_stale 초과: 요청 안에서 갱신이 끝날 때까지 기다림
+    갱신은 <이름>.lock 파일 flock 을 잡은 한 곳(워커)에서만 실행되고, 나머지는 결과 파일을 읽기만 한다.
+    """
+
+    def __init__(self, application, folder, ttl, max_stale):
+        self.app = application
+        self.folder = folder
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._lock = threading.Lock()
+        self._loaded = {}
+        self._refreshing = set()
+        self.refreshes = 0
+        self.stale_hits = 0
+
+    def _path(self, name):
+        return os.path.join(self.folder, f"{name}.json")
+
+    def _read(self, name):
+        """스냅샷 파일 읽기 (파일이 바뀌지 않았으면 워커 메모리에 읽어 둔 것을 재사용)"""
+        path = self._path(name)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        key = (st.st_ino, st.st_mtime_ns)
+        with self._lock:
+            loaded = self._loaded.get(name)
+            if loaded and loaded[0] == key:
+                return loaded[1]
+
+        with open(path, encoding="utf-8") as f:
+            stored = json.load(f)
+        snapshot = Snapshot(stored["computed_at"], stored["data"])
+        with self._lock:
+            self._loaded[name] = (key, snapshot)
+        return snapshot
+
+    def _write(self, name, data):
+        os.makedirs(self.folder, exist_ok=True)
+        path = self._path(name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"computed_at": time.time(), "data": data}, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def _refresh(self, name, compute, blocking):
+        """
+        잠금을 잡고 다시 계산해서 저장. blocking=False 면 다른 곳에서 계산 중일 때 바로 포기한다.
+        잠금을 기다리는 동안 다른 워커가 이미 갱신했으면 다시 계산하지 않는다.
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        with open(os.path.join(self.folder, f"{name}.lock"), "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                return
+            try:
+                snapshot = self._read(name)
+                if snapshot is not None and snapshot.age() <= self.ttl:
+                    return
+                self._write(name, compute())
+                with self._lock:
+                    self.refreshes += 1
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _refresh_in_background(self, name, compute):
+        with self._lock:
+            if name in self._refreshing:
+                return
+            self._refreshing.add(name)
+
+        def run():
+            try:
+                with self.app.app_context():
+                    self._refresh(name, compute, blocking=False)
+            except Exception:
+                logger.exception("통계 스냅샷 %s 갱신 실패", name)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(name)
+
+        threading.Thread(target=run, name=f"snapshot-{name}", daemon=True).start()
+
+    def peek(self, name):
+        """ttl 이내의 스냅샷만 반환 (갱신이 필요하면 None, DB 를 건드리지 않음)"""
+        snapshot = self._read(name)
+        if snapshot is None or snapshot.age() > self.ttl:
+            return None
+        return snapshot
+
+    def get(self, name, compute):
+        """
+        name 스냅샷을 반환. compute 는 요청/앱 컨텍스트 안에서 호출되는 JSON 직렬화 가능한 값을 만드는 함수
+        반환값: Snapshot
+        """
+        snapshot = self._read(name)
+        if snapshot is None or snapshot.age() > self.max_stale:
+            self._refresh(name, compute, blocking=True)
+            return self._read(name)
+
+        if snapshot.age() > self.ttl:
+            with self._lock:
+                self.stale_hits += 1
+            self._refresh_in_background(name, compute)
+        return snapshot
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ttl": self.ttl,
+                "max_stale": self.max_stale,
+                "refreshes": self.refreshes,
+                "stale_hits": self.stale_hits,
+                "refreshing": sorted(self._refreshing),
+            }
+
+
+def init_app(application):
+    application.extensions["stats_snapshots"] = StatsSnapshots(
+        application,
+        os.path.join(application.config.get("STATE_DIR", "./var"), "snapshots"),
+        ttl=application.config.get("STATS_SNAPSHOT_TTL", 5),
+        max_stale=application.config.get("STATS_SNAPSHOT_MAX_STALE", 60),
+    )
+
+
+def get_snapshots():
+    return current_app.extensions["stats_snapshots"]
+
+
+def snapshot_headers(snapshots, snapshot):
+    """
+    Age: 스냅샷 계산 후 지난 초
+    Cache-Control: 계산 후 ttl 초 동안 신선 + 이후 max_stale 까지는 갱신 중 오래된 값 사용 허용
+    """
+    return {
+        "Age": str(int(snapshot.age())),
+        "Cache-Control": (
+            f"public, max-age={int(snapshots.ttl)}, "
+            f"stale-while-revalidate={int(snapshots.max_stale - snapshots.ttl)}"
+        ),
+    }
+
+
+def snapshot_response(name, compute):
+    """스냅샷 본문을 그대로 내려주는 JSON 응답"""
+    snapshots = get_snapshots()
+    snapshot = snapshots.get(name, compute)
+
+    response = current_app.response_class(snapshot.body, mimetype="application/json")
+    response.headers.update(snapshot_headers(snapshots, snapshot))
+    return response
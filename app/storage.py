@@ -0,0 +1,78 @@
+import hashlib
+import os
+import tempfile
+
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    """업로드 크기가 MAX_UPLOAD_BYTES 를 넘은 경우 (413 응답)"""
+
+
+def content_path(sha256, extension):
+    """sha256 기반 저장 경로 (upload 폴더 기준 상대 경로): ab/cd/abcd....png"""
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}.{extension}"
+
+
+def store_stream(stream, upload_folder, extension, max_bytes):
+    """
+    stream 을 CHUNK_SIZE 단위로 읽으면서 sha256 을 계산해 임시 파일에 쓰고,
+    다 쓰면 content_path() 위치로 원자적으로 옮긴다. (같은 내용이 이미 있으면 임시 파일만 지움)
+    max_bytes 를 넘는 순간 읽기를 멈추고 UploadTooLarge 를 발생시킨다.
+    반환값: (sha256, 상대 경로, 크기)
+    """
+    tmp_folder = os.path.join(upload_folder, "tmp")
+    os.makedirs(tmp_folder, exist_ok=True)
+
+    hasher = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_folder)
+    try:
+        with os.fdopen(fd, "wb") as tmp:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"파일 크기는 {max_bytes} bytes 를 넘을 수 없습니다.")
+                hasher.update(chunk)
+                tmp.write(chunk)
+
+        sha256 = hasher.hexdigest()
+        relative_path = content_path(sha256, extension)
+        final_path = os.path.join(upload_folder, relative_path)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+
+        if os.path.exists(final_path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, final_path)
+        return sha256, relative_path, size
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def stored_path(upload_folder, url):
+    """이미지 URL 에서 upload 폴더 기준 파일 경로를 찾는다 (이전 방식의 평평한 파일명도 지원)"""
+    marker = "static/uploads/"
+    if marker in url:
+        relative_path = url.split(marker, 1)[1]
+    else:
+        relative_path = os.path.basename(url)
+
+    path = os.path.normpath(os.path.join(upload_folder, relative_path))
+    if not path.startswith(os.path.normpath(upload_folder) + os.sep):
+        return None
+    return path
+
+
+def discard_duplicate(upload_folder, relative_path, existing_url):
+    """
+    같은 내용이 다른 확장자로 이미 등록돼 있으면(기존 행 재사용) 이번 업로드로 생긴 파일은 참조되지 않으므로 지운다.
+    """
+    path = os.path.normpath(os.path.join(upload_folder, relative_path))
+    if stored_path(upload_folder, existing_url) != path and os.path.exists(path):
+        os.remove(path)
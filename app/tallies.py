@@ -0,0 +1,300 @@
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import and_, func, insert, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.models import (
+    KST,
+    Answer,
+    AnswerTimeRollup,
+    Choices,
+    ChoiceDemographicTally,
+    ChoiceTally,
+    User,
+    UserDemographicTally,
+)
+from config import db
+
+# 집계 테이블별 (유니크 키 컬럼, 카운트 컬럼)
+TALLY_KEYS = {
+    ChoiceTally: (("choice_id",), "answer_count"),
+    ChoiceDemographicTally: (("choice_id", "age", "gender"), "answer_count"),
+    UserDemographicTally: (("age", "gender"), "user_count"),
+    AnswerTimeRollup: (("granularity", "bucket_start", "choice_id"), "answer_count"),
+}
+
+# rebuild_tallies 로 answers/users 에서 바로 재집계하는 테이블 (시간대별 롤업은 app/timeseries.py 에서 따로 관리)
+REBUILT_TALLIES = (ChoiceTally, ChoiceDemographicTally, UserDemographicTally)
+
+
+def _upsert_statement(model, rows, increment, dialect):
+    """
+    유니크 키 기준 upsert 구문 생성 (MySQL/SQLite 만, 그 외 DB 는 None)
+    increment=True 이면 기존 카운트에 더하고, False 이면 값을 덮어쓴다.
+    """
+    key_columns, count_column = TALLY_KEYS[model]
+
+    if dialect == "mysql":
+        stmt = mysql_insert(model).values(rows)
+        new_count = getattr(stmt.inserted, count_column)
+        return stmt.on_duplicate_key_update({
+            count_column: getattr(model, count_column) + new_count if increment else new_count,
+            "updated_at": stmt.inserted.updated_at,
+        })
+
+    if dialect == "sqlite":
+        stmt = sqlite_insert(model).values(rows)
+        new_count = getattr(stmt.excluded, count_column)
+        return stmt.on_conflict_do_update(
+            index_elements=[getattr(model, column) for column in key_columns],
+            set_={
+                count_column: getattr(model, count_column) + new_count if increment else new_count,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+
+    return None
+
+
+def _update_or_insert(model, rows, increment):
+    """
+    upsert 구문이 없는 DB 용: 행마다 UPDATE 하고, 바뀐 행이 없으면 INSERT 한다.
+    (같은 키를 동시에 처음 INSERT 하면 unique 제약에서 걸리므로 호출한 쪽 트랜잭션이 실패한다)
+    """
+    key_columns, count_column = TALLY_KEYS[model]
+    for row in rows:
+        count = getattr(model, count_column) + row[count_column] if increment else row[count_column]
+        result = db.session.execute(
+            update(model)
+            .where(and_(*(getattr(model, column) == row[column] for column in key_columns)))
+            .values({count_column: count, "updated_at": row["updated_at"]})
+        )
+        if result.rowcount == 0:
+            db.session.execute(insert(model).values(row))
+
+
+def upsert_counts(model, counts, increment=True, **extra_columns):
+    """
+    counts: {유니크 키 튜플: 카운트}
+    extra_columns: {컬럼명: {유니크 키 튜플: 값}} (question_id 처럼 키 외에 같이 저장할 값)
+    """
+    key_columns, count_column = TALLY_KEYS[model]
+    now = datetime.now(tz=KST)
+    rows = [
+        {
+            **dict(zip(key_columns, key)),
+            **{column: values[key] for column, values in extra_columns.items()},
+            count_column: count,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for key, count in counts.items()
+    ]
+    if not rows:
+        return
+    stmt = _upsert_statement(model, rows, increment, db.session.get_bind(model).dialect.name)
+    if stmt is None:
+        _update_or_insert(model, rows, increment)
+    else:
+        db.session.execute(stmt)
+
+
+def increment_choice_tallies(choice_ids, question_ids=None):
+    """
+    응답으로 들어온 choice_id 목록만큼 choice_tallies 를 증가시킨다.
+    호출한 쪽의 트랜잭션 안에서 실행되며 commit 은 호출한 쪽에서 한다.
+
+    question_ids: {choice_id: question_id} (이미 알고 있으면 넘겨서 조회 생략)
+    """
+    counts = Counter(choice_ids)
+    if not counts:
+        return
+
+    if question_ids is None:
+        question_ids = dict(
+            db.session.execute(
+                select(Choices.id, Choices.question_id).where(Choices.id.in_(counts))
+            ).all()
+        )
+
+    counts = {(choice_id,): count for choice_id, count in counts.items() if question_ids.get(choice_id) is not None}
+    upsert_counts(
+        ChoiceTally, counts,
+        question_id={key: question_ids[key[0]] for key in counts},
+    )
+
+
+def increment_demographic_tallies(rows, question_ids):
+    """
+    응답 행들({"user_id", "choice_id"})을 응답자 연령대/성별 기준으로 choice_demographic_tallies 에 더한다.
+    (응답자 조회 쿼리 1번 + upsert 1번, commit 은 호출한 쪽에서)
+    """
+    user_ids = {row["user_id"] for row in rows}
+    if not user_ids:
+        return
+
+    demographics = {
+        user_id: (age, gender)
+        for user_id, age, gender in db.session.execute(
+            select(User.id, User.age, User.gender).where(User.id.in_(user_ids))
+        )
+    }
+
+    counts = Counter(
+        (row["choice_id"], *demographics[row["user_id"]])
+        for row in rows
+        if row["user_id"] in demographics and question_ids.get(row["choice_id"]) is not None
+    )
+    upsert_counts(
+        ChoiceDemographicTally, counts,
+        question_id={key: question_ids[key[0]] for key in counts},
+    )
+
+
+def increment_user_population(demographics):
+    """가입자들의 (age, gender) 목록만큼 user_demographic_tallies 를 증가시킨다. (commit 은 호출한 쪽에서)"""
+    upsert_counts(UserDemographicTally, Counter(demographics))
+
+
+def choice_tallies_statement():
+    return (
+        select(ChoiceTally.question_id, ChoiceTally.choice_id, ChoiceTally.answer_count)
+        .where(ChoiceTally.answer_count > 0)
+        .order_by(ChoiceTally.question_id, ChoiceTally.choice_id)
+    )
+
+
+def load_choice_tallies():
+    """answer_count > 0 인 집계 행을 (question_id, choice_id) 순으로 반환"""
+    return db.session.execute(choice_tallies_statement()).all()
+
+
+def load_demographic_cube(dimensions, question_id=None, age=None, gender=None):
+    """
+    choice_demographic_tallies 를 dimensions(("age", "gender") 의 부분집합) 기준으로 합산
+    반환값: (셀 행 목록, 같은 기준의 가입자 수 행 목록)
+    """
+    model = ChoiceDemographicTally
+    filters = []
+    population_filters = []
+    if question_id is not None:
+        filters.append(model.question_id == question_id)
+    if age is not None:
+        filters.append(model.age == age)
+        population_filters.append(UserDemographicTally.age == age)
+    if gender is not None:
+        filters.append(model.gender == gender)
+        population_filters.append(UserDemographicTally.gender == gender)
+
+    group_columns = [model.question_id, model.choice_id] + [getattr(model, d) for d in dimensions]
+    cells = db.session.execute(
+        select(*group_columns, func.sum(model.answer_count).label("answer_count"))
+        .where(*filters)
+        .group_by(*group_columns)
+        .order_by(*group_columns)
+    ).all()
+
+    population_columns = [getattr(UserDemographicTally, d) for d in dimensions]
+    population = db.session.execute(
+        select(*population_columns, func.sum(UserDemographicTally.user_count).label("user_count"))
+        .where(*population_filters)
+        .group_by(*population_columns)
+        .order_by(*population_columns)
+    ).all()
+    return cells, population
+
+
+def _reconcile(model, actual, dry_run, **extra_columns):
+    """
+    집계 테이블의 현재 값과 실제 재집계 값(actual: {유니크 키 튜플: 카운트})을 비교해서 보정한다.
+    반환값: 차이가 난 행 목록 [(유니크 키, 기존값, 실제값), ...] (실제값 None = 삭제 대상)
+    """
+    key_columns, count_column = TALLY_KEYS[model]
+    keys = [getattr(model, column) for column in key_columns]
+
+    current = {
+        tuple(row[:-1]): row[-1]
+        for row in db.session.execute(select(*keys, getattr(model, count_column)))
+    }
+
+    # 집계 행이 아직 없는 것(응답 0건)은 0 과 같은 것으로 본다
+    diffs = [(key, current.get(key), count) for key, count in actual.items() if current.get(key, 0) != count]
+    diffs += [(key, count, None) for key, count in current.items() if key not in actual]
+
+    if dry_run:
+        return diffs
+
+    upsert_counts(
+        model,
+        {key: new for key, _, new in diffs if new is not None},
+        increment=False,
+        **extra_columns,
+    )
+
+    removed = [key for key, _, new in diffs if new is None]
+    for key in removed:
+        db.session.execute(
+            model.__table__.delete().where(*(column == value for column, value in zip(keys, key)))
+        )
+    return diffs
+
+
+def rebuild_tallies(dry_run=False):
+    """
+    answers / users 전체를 다시 집계해서 모든 집계 테이블을 비교/보정한다.
+    반환값: {테이블명: 차이 목록}
+    """
+    # 기존 집계 행을 먼저 잠가서, 재집계 도중 들어온 submit/signup 은 보정이 끝난 뒤에 증가하도록 한다
+    for model in REBUILT_TALLIES:
+        db.session.execute(select(model.id).with_for_update()).all()
+
+    choice_rows = db.session.execute(
+        select(Choices.id, Choices.question_id, func.count(Answer.id))
+        .outerjoin(Answer, Answer.choice_id == Choices.id)
+        .where(Choices.question_id.isnot(None))
+        .group_by(Choices.id, Choices.question_id)
+    ).all()
+    question_ids = {(choice_id,): question_id for choice_id, question_id, _ in choice_rows}
+
+    demographic_rows = db.session.execute(
+        select(Choices.id, Choices.question_id, User.age, User.gender, func.count(Answer.id))
+        .join(Answer, Answer.choice_id == Choices.id)
+        .join(User, User.id == Answer.user_id)
+        .where(Choices.question_id.isnot(None))
+        .group_by(Choices.id, Choices.question_id, User.age, User.gender)
+    ).all()
+
+    population_rows = db.session.execute(
+        select(User.age, User.gender, func.count(User.id)).group_by(User.age, User.gender)
+    ).all()
+
+    results = {
+        ChoiceTally.__tablename__: _reconcile(
+            ChoiceTally,
+            {(choice_id,): count for choice_id, _, count in choice_rows},
+            dry_run,
+            question_id=question_ids,
+        ),
+        ChoiceDemographicTally.__tablename__: _reconcile(
+            ChoiceDemographicTally,
+            {(choice_id, age, gender): count for choice_id, _, age, gender, count in demographic_rows},
+            dry_run,
+            question_id={
+                (choice_id, age, gender): question_id
+                for choice_id, question_id, age, gender, _ in demographic_rows
+            },
+        ),
+        UserDemographicTally.__tablename__: _reconcile(
+            UserDemographicTally,
+            {(age, gender): count for age, gender, count in population_rows},
+            dry_run,
+        ),
+    }
+
+    if dry_run:
+        db.session.rollback()
+    else:
+        db.session.commit()
+    return results
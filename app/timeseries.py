@@ -0,0 +1,184 @@
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from app.models import KST, Answer, AnswerTimeRollup, Choices, RollupWatermark
+from app.tallies import upsert_counts
+from config import db
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("hour", "day")
+WATERMARK_NAME = "answer_time_rollups"
+
+
+def to_kst(dt):
+    """DB 에서 읽은 naive datetime 은 KST 벽시계 시각으로 저장된 값이다."""
+    return dt.replace(tzinfo=KST) if dt.tzinfo is None else dt.astimezone(KST)
+
+
+def bucket_start(dt, granularity):
+    """KST 기준으로 구간 시작 시각(naive, KST 벽시계 시각)을 계산"""
+    dt = to_kst(dt).replace(tzinfo=None)
+    if granularity == "hour":
+        return dt.replace(minute=0, second=0, microsecond=0)
+    return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _lock_watermark():
+    """
+    롤업 watermark 행을 잠그고 반환 (없으면 만든다)
+    다른 워커/cron 이 이미 잠그고 작업 중이면 None (skip locked)
+    """
+    watermark = db.session.scalars(
+        select(RollupWatermark).where(RollupWatermark.name == WATERMARK_NAME).with_for_update(skip_locked=True)
+    ).first()
+    if watermark is not None:
+        return watermark
+
+    exists = db.session.scalar(select(RollupWatermark.id).where(RollupWatermark.name == WATERMARK_NAME))
+    if exists is not None:
+        return None
+
+    db.session.execute(insert(RollupWatermark).values(name=WATERMARK_NAME, last_answer_id=0))
+    return db.session.scalars(
+        select(RollupWatermark).where(RollupWatermark.name == WATERMARK_NAME).with_for_update()
+    ).first()
+
+
+def compact_answer_timeseries(batch_size=50000, safety_lag=60, max_batches=None):
+    """
+    watermark(answers.id) 이후의 응답을 batch_size 단위로 읽어 시간대별 롤업에 더한다.
+    safety_lag 초보다 최근 응답은 아직 커밋되지 않은 앞 번호 id 가 있을 수 있으므로 다음 작업 때 반영한다.
+    배치마다 롤업 증가 + watermark 이동을 한 트랜잭션으로 커밋하므로 중간에 실패해도 중복 집계되지 않는다.
+    반환값: 반영한 응답 수
+    """
+    cutoff = datetime.now(tz=KST) - timedelta(seconds=safety_lag)
+    processed = 0
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        watermark = _lock_watermark()
+        if watermark is None:
+            db.session.rollback()
+            logger.info("다른 작업이 시간대별 롤업을 갱신 중이라 건너뜁니다.")
+            break
+
+        rows = db.session.execute(
+            select(Answer.id, Answer.choice_id, Answer.created_at, Choices.question_id)
+            .outerjoin(Choices, Choices.id == Answer.choice_id)
+            .where(Answer.id > watermark.last_answer_id)
+            .order_by(Answer.id)
+            .limit(batch_size)
+        ).all()
+
+        # cutoff 보다 최근 응답이 나오면 그 앞까지만 반영 (그 뒤는 다음 작업 때)
+        for index, row in enumerate(rows):
+            if to_kst(row.created_at) > cutoff:
+                rows = rows[:index]
+                break
+        if not rows:
+            db.session.rollback()
+            break
+
+        counts = Counter()
+        question_ids = {}
+        for row in rows:
+            if row.question_id is None:
+                continue
+            for granularity in GRANULARITIES:
+                key = (granularity, bucket_start(row.created_at, granularity), row.choice_id)
+                counts[key] += 1
+                question_ids[key] = row.question_id
+
+        upsert_counts(AnswerTimeRollup, counts, question_id=question_ids)
+        watermark.last_answer_id = rows[-1].id
+        db.session.commit()
+
+        processed += len(rows)
+        batches += 1
+        if len(rows) < batch_size:
+            break
+
+    return processed
+
+
+def reset_answer_timeseries():
+    """롤업과 watermark 를 지워서 다음 작업이 answers 처음부터 다시 집계하게 한다."""
+    db.session.execute(AnswerTimeRollup.__table__.delete())
+    db.session.execute(RollupWatermark.__table__.delete().where(RollupWatermark.name == WATERMARK_NAME))
+    db.session.commit()
+
+
+def timeseries_statement(granularity, start, end, question_id=None, choice_id=None):
+    filters = [
+        AnswerTimeRollup.granularity == granularity,
+        AnswerTimeRollup.bucket_start >= to_kst(start).replace(tzinfo=None),
+        AnswerTimeRollup.bucket_start < to_kst(end).replace(tzinfo=None),
+    ]
+    if question_id is not None:
+        filters.append(AnswerTimeRollup.question_id == question_id)
+    if choice_id is not None:
+        filters.append(AnswerTimeRollup.choice_id == choice_id)
+    return (
+        select(
+            AnswerTimeRollup.question_id,
+            AnswerTimeRollup.choice_id,
+            AnswerTimeRollup.bucket_start,
+            AnswerTimeRollup.answer_count,
+        )
+        .where(*filters)
+        .order_by(AnswerTimeRollup.choice_id, AnswerTimeRollup.bucket_start)
+    )
+
+
+def load_timeseries(granularity, start, end, question_id=None, choice_id=None):
+    """
+    롤업에서 구간별 응답 수를 읽는다. start/end 는 KST 기준 (end 미포함)
+    반환값: ([(question_id, choice_id, bucket_start, answer_count), ...], 반영된 마지막 answers.id)
+    """
+    rows = db.session.execute(timeseries_statement(granularity, start, end, question_id, choice_id)).all()
+
+    compacted_through = db.session.scalar(
+        select(RollupWatermark.last_answer_id).where(RollupWatermark.name == WATERMARK_NAME)
+    )
+    return rows, compacted_through or 0
+
+
+def init_app(application):
+    """
+    TIMESERIES_COMPACT_INTERVAL 초마다 롤업 작업을 실행하는 데몬 스레드를 워커마다 첫 요청 때 시작
+    (워커가 여러 개여도 watermark 행 잠금으로 한 번에 한 곳만 실행된다)
+    """
+    interval = application.config.get("TIMESERIES_COMPACT_INTERVAL", 0)
+    if not interval:
+        return
+
+    started = {"pid": None}
+    lock = threading.Lock()
+
+    def run():
+        while True:
+            try:
+                with application.app_context():
+                    compact_answer_timeseries(
+                        batch_size=application.config.get("TIMESERIES_BATCH_SIZE", 50000),
+                        safety_lag=application.config.get("TIMESERIES_SAFETY_LAG", 60),
+                    )
+            except Exception:
+                logger.exception("시간대별 롤업 작업 실패")
+            time.sleep(interval)
+
+    @application.before_request
+    def start_compactor():
+        if started["pid"] == os.getpid():
+            return
+        with lock:
+            if started["pid"] != os.getpid():
+                threading.Thread(target=run, name="timeseries-compactor", daemon=True).start()
+                started["pid"] = os.getpid()
@@ -0,0 +1,151 @@
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app
+from sqlalchemy import select
+
+from app.models import ImageVariant
+from app.storage import stored_path
+from config import db
+
+try:
+    from PIL import Image as PILImage
+    from PIL import ImageOps
+except ImportError:  # pillow 가 없으면 파생 이미지 없이 원본만 사용
+    PILImage = None
+
+logger = logging.getLogger(__name__)
+
+VARIANT_FORMAT = "webp"
+
+
+def variant_path(sha256, width):
+    """파생 이미지 상대 경로: 원본과 같은 폴더의 <sha256>-w<너비>.webp (내용이 같으면 이름도 같음)"""
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}-w{width}.{VARIANT_FORMAT}"
+
+
+def render_variants(source_path, sha256, upload_folder, widths, quality):
+    """
+    (프로세스 풀에서 실행) 원본을 너비별로 줄여 WebP 로 저장
+    원본보다 큰 너비는 만들지 않고, 대신 원본 너비 그대로의 WebP 를 하나 만든다.
+    반환값: [(너비, 상대 경로), ...]
+    """
+    with PILImage.open(source_path) as original:
+        source = ImageOps.exif_transpose(original)
+        source = source.convert("RGBA" if "A" in source.getbands() else "RGB")
+
+        targets = sorted({width for width in widths if width < source.width} | {source.width})
+        results = []
+        for width in targets:
+            relative_path = variant_path(sha256, width)
+            final_path = os.path.join(upload_folder, relative_path)
+            if not os.path.exists(final_path):
+                height = max(1, round(source.height * width / source.width))
+                resized = source if width == source.width else source.resize((width, height), PILImage.LANCZOS)
+                tmp_path = f"{final_path}.{os.getpid()}.tmp"
+                resized.save(tmp_path, format="WEBP", quality=quality, method=4)
+                os.replace(tmp_path, final_path)
+            results.append((width, relative_path))
+        return results
+
+
+class VariantGenerator:
+    """
+    요청 스레드 밖(프로세스 풀)에서 파생 이미지를 만들고, 완료되면 image_variants 에 기록한다.
+    기록 후 카탈로그 캐시를 무효화해서 질문 응답에 srcset 이 반영되게 한다.
+    """
+
+    def __init__(self, application):
+        self.app = application
+        self.widths = application.config.get("IMAGE_VARIANT_WIDTHS", (320, 640, 1280))
+        self.quality = application.config.get("IMAGE_VARIANT_QUALITY", 80)
+        self.max_workers = application.config.get("IMAGE_VARIANT_WORKERS", 2)
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+        self._in_flight = set()
+
+    def _get_pool(self):
+        # gunicorn 워커마다 따로 만든다 (fork 이전에 만든 풀은 쓰지 않음)
+        if self._pid != os.getpid():
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            self._pid = os.getpid()
+            self._in_flight = set()
+        return self._pool
+
+    def schedule(self, image):
+        """업로드된(sha256 이 있는) 이미지의 파생 이미지 생성을 예약. 이미 진행 중이면 무시"""
+        if PILImage is None or not image.sha256:
+            return False
+
+        upload_folder = os.path.abspath(current_app.config.get("UPLOAD_FOLDER", "./static/uploads"))
+        source_path = stored_path(upload_folder, image.url)
+        if not source_path or not os.path.exists(source_path):
+            return False
+
+        base_url = image.url[: -len(os.path.basename(image.url))]
+        shard = f"{image.sha256[:2]}/{image.sha256[2:4]}/"
+        if base_url.endswith(shard):
+            base_url = base_url[: -len(shard)]
+
+        with self._lock:
+            if image.id in self._in_flight:
+                return False
+            future = self._get_pool().submit(
+                render_variants, source_path, image.sha256, upload_folder, self.widths, self.quality
+            )
+            self._in_flight.add(image.id)
+
+        future.add_done_callback(lambda f, image_id=image.id: self._record(image_id, base_url, f))
+        return True
+
+    def _record(self, image_id, base_url, future):
+        try:
+            results = future.result()
+            with self.app.app_context():
+                existing = set(
+                    db.session.scalars(select(ImageVariant.width).where(ImageVariant.image_id == image_id))
+                )
+                for width, relative_path in results:
+                    if width not in existing:
+                        db.session.add(ImageVariant(
+                            image_id=image_id,
+                            width=width,
+                            format=VARIANT_FORMAT,
+                            url=f"{base_url}{relative_path}",
+                        ))
+                db.session.commit()
+
+                from app.catalog import invalidate_catalog
+                invalidate_catalog()
+        except Exception:
+            logger.exception("image %s 파생 이미지 생성 실패", image_id)
+        finally:
+            with self._lock:
+                self._in_flight.discard(image_id)
+
+
+def init_app(application):
+    application.extensions["image_variants"] = VariantGenerator(application)
+
+
+def schedule_variants(image):
+    return current_app.extensions["image_variants"].schedule(image)
+
+
+def build_srcset(image):
+    """
+    이미지의 파생 이미지들을 srcset 문자열로 반환 ("url 320w, url 640w")
+    아직 없으면 생성을 예약하고 None 반환 (그동안은 원본 URL 만 사용)
+    """
+    if image is None:
+        return None
+    if not image.variants:
+        schedule_variants(image)
+        return None
+    return ", ".join(f"{variant.url} {variant.width}w" for variant in image.variants)
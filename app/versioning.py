@@ -0,0 +1,32 @@
+import os
+import uuid
+
+
+class VersionStamp:
+    """
+    여러 gunicorn 워커가 공유하는 파일 기반 버전 스탬프
+    bump() 는 파일을 새로 만들어 교체하므로 (inode, mtime) 조합이 항상 바뀌고,
+    current() 는 stat 한 번으로 확인할 수 있어 요청마다 호출해도 부담이 없다.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def current(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+    def bump(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(uuid.uuid4().hex)
+        os.replace(tmp_path, self.path)
+        return self.current()
+
+
+def stamp_path(application, name):
+    return os.path.join(application.config.get("STATE_DIR", "./var"), f"{name}.version")
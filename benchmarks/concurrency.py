@@ -0,0 +1,154 @@
+"""
+동시 접속 부하 측정 스크립트 (표준 라이브러리만 사용)
+
+keep-alive 연결 N 개를 열어 두고, 각 연결이 지정한 경로들을 돌아가며 GET 요청을 계속 보낸다.
+sync(gunicorn gthread) 모드와 ASGI(uvicorn) 모드를 같은 조건으로 비교할 때 사용한다.
+
+    # 1) 기본 모드
+    gunicorn --workers 4 --worker-class gthread --threads 32 --bind 127.0.0.1:8000 wsgi:app
+    python benchmarks/concurrency.py --url http://127.0.0.1:8000 --concurrency 1000 --duration 30
+
+    # 2) ASGI 모드
+    gunicorn --workers 4 --worker-class uvicorn.workers.UvicornWorker --bind 127.0.0.1:8000 asgi:app
+    python benchmarks/concurrency.py --url http://127.0.0.1:8000 --concurrency 1000 --duration 30
+
+연결 수가 많으면 먼저 ulimit -n 을 늘려야 한다. (서버/클라이언트 모두)
+
+측정 예 (1 vCPU, SQLite + benchmarks.seed --scale small, 워커 2개, --concurrency 200 --duration 15, 기본 경로)
+                                   req/s    p50 ms   p95 ms   p99 ms
+    카탈로그 캐시 사용  gthread    1027.4    169.4    415.9    509.4
+                        ASGI       2788.4     68.0    116.4    140.1
+    캐시 끔(매번 DB)    gthread     242.2    783.8   1364.4   1704.4
+    (CATALOG_CACHE      ASGI        191.4   1067.4   1966.7   2253.0
+     _MAX_ENTRIES=0)
+캐시/304 로 답하는 요청은 ASGI 가 빠르지만, aiosqlite 는 연결마다 스레드를 거치므로 매번 DB 를 읽으면 더 느리다.
+MySQL(aiomysql) 에서는 따로 측정해야 한다.
+"""
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = (
+    "/questions/1",
+    "/questions/count",
+    "/questions/all",
+    "/choices/question/1",
+    "/stats/answer_count_by_question",
+)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def read_response(reader):
+    """HTTP/1.1 응답 하나를 읽고 상태 코드 반환 (Content-Length / chunked 모두 처리)"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("서버가 연결을 닫았습니다.")
+    status = int(status_line.split()[1])
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+
+    return status, headers.get("connection", "").lower() == "close"
+
+
+async def client(host, port, paths, offset, deadline, latencies, errors, statuses):
+    reader = writer = None
+    index = offset
+    while time.perf_counter() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept-Encoding: gzip\r\n\r\n"
+            started = time.perf_counter()
+            writer.write(request.encode("latin-1"))
+            status, closed = await read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+            if closed:
+                writer.close()
+                writer = None
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            errors.append(path)
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.05)
+    if writer is not None:
+        writer.close()
+
+
+async def run(url, paths, concurrency, duration, warmup):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+
+    if warmup:
+        await asyncio.gather(*(
+            client(host, port, paths, i, time.perf_counter() + warmup, [], [], {})
+            for i in range(min(concurrency, 50))
+        ))
+
+    latencies, errors, statuses = [], [], {}
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(
+        client(host, port, paths, i, deadline, latencies, errors, statuses)
+        for i in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "url": url,
+        "paths": list(paths),
+        "concurrency": concurrency,
+        "duration": round(elapsed, 2),
+        "requests": len(latencies),
+        "errors": len(errors),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "rps": round(len(latencies) / elapsed, 1),
+        "latency_ms": {
+            name: round(percentile(latencies, fraction) * 1000, 2) if latencies else None
+            for name, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="동시 접속 GET 부하 측정")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", action="append", dest="paths", help="요청할 경로 (여러 번 지정 가능)")
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=3)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.url, args.paths or DEFAULT_PATHS, args.concurrency, args.duration, args.warmup))
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+설문 흐름(가입 → 질문 sqe 순서대로 조회 → 응답 제출 → 통계 조회)을 여러 가상 사용자로 반복하는 부하 테스트
+
+    # 같은 프로세스 안에서 create_app() 을 직접 호출 (네트워크/gunicorn 제외한 앱 자체 성능)
+    python -m benchmarks.load run --mode inprocess --database-uri sqlite:///bench.sqlite --output baseline.json
+
+    # 실행 중인 서버에 HTTP 로 요청
+    python -m benchmarks.load run --mode http --url http://127.0.0.1:8000 --concurrency 50 --output candidate.json
+
+    # 두 결과 비교 (req/s 감소나 p95/p99 증가가 --threshold % 를 넘는 엔드포인트가 있으면 exit 1)
+    python -m benchmarks.load compare baseline.json candidate.json --threshold 10
+
+데이터는 benchmarks/seed.py 로 먼저 만들어 둔다.
+"""
+import argparse
+import http.client
+import json
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from benchmarks.concurrency import percentile
+
+AGES = ("teen", "twenty", "thirty", "forty", "fifty")
+GENDERS = ("male", "female")
+
+
+class InProcessClient:
+    """Flask test_client 로 요청 (가상 사용자 스레드마다 하나)"""
+
+    def __init__(self, application):
+        self.client = application.test_client()
+
+    def request(self, method, path, body=None, headers=None):
+        response = self.client.open(path, method=method, json=body, headers=headers)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpClient:
+    """keep-alive HTTP 연결로 요청 (가상 사용자 스레드마다 하나)"""
+
+    def __init__(self, url, timeout=30):
+        parts = urlsplit(url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.connection = connection_class(parts.hostname, parts.port, timeout=timeout)
+
+    def request(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        try:
+            self.connection.request(method, path, body=payload, headers=headers)
+            response = self.connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            raise
+        try:
+            return response.status, json.loads(data) if data else None
+        except ValueError:
+            return response.status, None
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.statuses = {}
+        self.errors = {}
+
+    def record(self, name, elapsed, status):
+        with self._lock:
+            self.latencies.setdefault(name, []).append(elapsed)
+            counts = self.statuses.setdefault(name, {})
+            counts[status] = counts.get(status, 0) + 1
+            if status is None or status >= 400:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    def timed(self, name, client, method, path, body=None, headers=None):
+        started = time.perf_counter()
+        try:
+            status, data = client.request(method, path, body, headers)
+        except (OSError, http.client.HTTPException):
+            status, data = None, None
+        self.record(name, time.perf_counter() - started, status)
+        return status, data
+
+
+def user_session(client, recorder, rng, question_count, questions_per_session):
+    """가상 사용자 1명의 설문 흐름"""
+    status, data = recorder.timed("POST /signup", client, "POST", "/signup", {
+        "name": f"b{rng.getrandbits(24):x}"[:10],
+        "age": rng.choice(AGES),
+        "gender": rng.choice(GENDERS),
+        "email": f"{uuid.uuid4().hex}@load.example",
+    })
+    if status != 201:
+        return
+    user_id = data["user_id"]
+
+    count = min(question_count, questions_per_session or question_count)
+    answers = []
+    for sqe in sorted(rng.sample(range(1, question_count + 1), count)):
+        status, data = recorder.timed("GET /questions/<sqe>", client, "GET", f"/questions/{sqe}")
+        if status == 200 and data.get("choices"):
+            answers.append({"user_id": user_id, "choice_id": rng.choice(data["choices"])["id"]})
+
+    if answers:
+        recorder.timed(
+            "POST /submit", client, "POST", "/submit", answers,
+            headers={"Idempotency-Key": uuid.uuid4().hex},
+        )
+    recorder.timed("GET /stats/answer_count_by_question", client, "GET", "/stats/answer_count_by_question")
+
+
+def summarize(recorder, elapsed):
+    endpoints = {}
+    all_latencies = []
+    for name, latencies in sorted(recorder.latencies.items()):
+        latencies = sorted(latencies)
+        all_latencies.extend(latencies)
+        endpoints[name] = {
+            "requests": len(latencies),
+            "errors": recorder.errors.get(name, 0),
+            "statuses": {str(status): count for status, count in recorder.statuses[name].items()},
+            "rps": round(len(latencies) / elapsed, 2),
+            **{
+                key: round(percentile(latencies, fraction) * 1000, 3)
+                for key, fraction in (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99), ("max_ms", 1.0))
+            },
+        }
+
+    all_latencies.sort()
+    total = {
+        "requests": len(all_latencies),
+        "errors": sum(recorder.errors.values()),
+        "rps": round(len(all_latencies) / elapsed, 2) if elapsed else 0,
+        **{
+            key: round(percentile(all_latencies, fraction) * 1000, 3) if all_latencies else None
+            for key, fraction in (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99))
+        },
+    }
+    return endpoints, total
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    application = None
+    if args.mode == "inprocess":
+        from benchmarks.seed import make_app
+
+        application = make_app(args.database_uri)
+
+        def make_client():
+            return InProcessClient(application)
+    else:
+        def make_client():
+            return HttpClient(args.url)
+
+    status, data = make_client().request("GET", "/questions/count")
+    if status != 200 or not data or not data.get("total"):
+        raise SystemExit("활성 질문이 없습니다. benchmarks/seed.py 로 데이터를 먼저 만들어주세요.")
+    question_count = data["total"]
+
+    def virtual_user(index, deadline, recorder, sessions):
+        rng = random.Random(args.seed * 100003 + index)
+        client = make_client()
+        while time.perf_counter() < deadline:
+            user_session(client, recorder, rng, question_count, args.questions_per_session)
+            with lock:
+                sessions[0] += 1
+
+    lock = threading.Lock()
+    if args.warmup:
+        warmup_deadline = time.perf_counter() + args.warmup
+        threads = [
+            threading.Thread(target=virtual_user, args=(i, warmup_deadline, Recorder(), [0]))
+            for i in range(args.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    recorder = Recorder()
+    sessions = [0]
+    started = time.perf_counter()
+    deadline = started + args.duration
+    threads = [
+        threading.Thread(target=virtual_user, args=(args.concurrency + i, deadline, recorder, sessions))
+        for i in range(args.concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    endpoints, total = summarize(recorder, elapsed)
+    result = {
+        "meta": {
+            "created_at": datetime.now(tz=timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "mode": args.mode,
+            "target": args.url if args.mode == "http" else args.database_uri or "config.Config",
+            "concurrency": args.concurrency,
+            "duration": round(elapsed, 2),
+            "question_count": question_count,
+            "questions_per_session": args.questions_per_session,
+            "sessions": sessions[0],
+            "seed": args.seed,
+        },
+        "endpoints": endpoints,
+        "total": total,
+    }
+
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+def _change(before, after):
+    if not before or after is None:
+        return None
+    return round((after - before) * 100 / before, 1)
+
+
+def compare(args):
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    regressions = []
+    names = sorted(set(baseline["endpoints"]) | set(candidate["endpoints"]))
+    print(f"{'endpoint':40} {'rps':>22} {'p50 ms':>22} {'p95 ms':>22} {'p99 ms':>22}")
+    for name in names + ["(total)"]:
+        before = baseline["total"] if name == "(total)" else baseline["endpoints"].get(name)
+        after = candidate["total"] if name == "(total)" else candidate["endpoints"].get(name)
+        if before is None or after is None:
+            print(f"{name:40} {'(한쪽 결과에만 있음)':>22}")
+            continue
+
+        cells = []
+        for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            change = _change(before[key], after[key])
+            cells.append(f"{before[key]} → {after[key]} ({'' if change is None else f'{change:+}%'})")
+            if change is None or name == "(total)":
+                continue
+            if key == "rps" and change < -args.threshold:
+                regressions.append(f"{name} {key} {change:+}%")
+            if key in ("p95_ms", "p99_ms") and change > args.threshold:
+                regressions.append(f"{name} {key} {change:+}%")
+        print(f"{name:40} " + " ".join(f"{cell:>22}" for cell in cells))
+
+    if regressions:
+        print(f"\n{args.threshold}% 넘게 느려진 항목 {len(regressions)}개:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        sys.exit(1)
+    print(f"\n{args.threshold}% 넘게 느려진 항목이 없습니다.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="설문 흐름 부하 테스트")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="부하 테스트 실행 후 결과 JSON 출력")
+    run_parser.add_argument("--mode", choices=("inprocess", "http"), default="inprocess")
+    run_parser.add_argument("--url", default="http://127.0.0.1:8000", help="--mode http 대상 서버")
+    run_parser.add_argument("--database-uri", help="--mode inprocess 에서 config.py 대신 사용할 DB")
+    run_parser.add_argument("--concurrency", type=int, default=20, help="동시에 설문을 진행하는 가상 사용자 수")
+    run_parser.add_argument("--duration", type=float, default=30)
+    run_parser.add_argument("--warmup", type=float, default=3)
+    run_parser.add_argument("--questions-per-session", type=int, default=0, help="0 이면 모든 질문에 응답")
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--output", help="결과 JSON 을 저장할 파일")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser("compare", help="두 결과 JSON 비교")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=10, help="허용할 성능 저하 비율(%%)")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+벤치마크용 로컬 DB 데이터 생성
+
+    python -m benchmarks.seed --scale small --database-uri sqlite:///bench.sqlite --create-schema
+    python -m benchmarks.seed --questions 100 --choices 500 --users 1000000 --answers 10000000
+
+같은 --seed 값이면 항상 같은 데이터가 만들어진다. (응답 시각은 최근 --days 일에 고르게 분포)
+생성 후 집계 테이블(choice_tallies 등)과 시간대별 롤업을 다시 계산하고 카탈로그 캐시를 무효화한다.
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+
+SCALES = {
+    "small": {"questions": 10, "choices": 50, "users": 1000, "answers": 10000},
+    "medium": {"questions": 100, "choices": 500, "users": 100000, "answers": 1000000},
+    "large": {"questions": 100, "choices": 500, "users": 1000000, "answers": 10000000},
+}
+
+
+def make_app(database_uri=None):
+    """--database-uri 가 있으면 config.Config 대신 그 DB 로 앱을 만든다."""
+    import config
+
+    if database_uri:
+        config.Config.SQLALCHEMY_DATABASE_URI = database_uri
+    from app import create_app
+
+    return create_app()
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _insert(model, rows, batch_size, label):
+    from config import db
+
+    started = time.perf_counter()
+    total = 0
+    for chunk in _chunks(rows, batch_size):
+        db.session.execute(insert(model), chunk)
+        db.session.commit()
+        total += len(chunk)
+    print(f"{label}: {total}행 ({time.perf_counter() - started:.1f}s)")
+
+
+def seed(questions, choices, users, answers, seed_value=42, days=30, batch_size=10000):
+    """앱 컨텍스트 안에서 호출. 기존 데이터 뒤에 이어서 추가한다."""
+    from app.catalog import invalidate_catalog
+    from app.models import KST, AgeStatus, Answer, Choices, GenderStatus, Image, ImageStatus, Question, User
+    from app.tallies import rebuild_tallies
+    from app.timeseries import compact_answer_timeseries
+    from config import db
+
+    rng = random.Random(seed_value)
+    now = datetime.now(tz=KST)
+    run_id = rng.getrandbits(32)
+
+    _insert(Image, [{
+        "url": f"https://bench.example/{run_id}/main.png",
+        "type": ImageStatus.main,
+        "created_at": now,
+        "updated_at": now,
+    }], batch_size, "images")
+    image_id = db.session.scalar(select(func.max(Image.id)))
+
+    first_sqe = (db.session.scalar(select(func.max(Question.sqe))) or 0) + 1
+    _insert(Question, ({
+        "title": f"벤치마크 질문 {first_sqe + i}",
+        "sqe": first_sqe + i,
+        "is_active": True,
+        "image_id": image_id,
+        "created_at": now,
+        "updated_at": now,
+    } for i in range(questions)), batch_size, "questions")
+    question_ids = list(db.session.scalars(
+        select(Question.id).where(Question.sqe >= first_sqe).order_by(Question.sqe)
+    ))
+
+    # 선택지는 질문마다 고르게 나눠 배정 (질문 수보다 적으면 질문당 1개)
+    per_question = max(1, choices // max(1, questions))
+    _insert(Choices, ({
+        "content": f"선택지 {sqe}",
+        "sqe": sqe,
+        "is_active": True,
+        "question_id": question_id,
+        "created_at": now,
+        "updated_at": now,
+    } for question_id in question_ids for sqe in range(1, per_question + 1)), batch_size, "choices")
+    choice_rows = db.session.execute(
+        select(Choices.id, Choices.question_id).where(Choices.question_id.in_(question_ids))
+    ).all()
+    choices_by_question = {}
+    for choice_id, question_id in choice_rows:
+        choices_by_question.setdefault(question_id, []).append(choice_id)
+
+    first_user_id = (db.session.scalar(select(func.max(User.id))) or 0) + 1
+    ages, genders = list(AgeStatus), list(GenderStatus)
+    _insert(User, ({
+        "name": f"user{i}"[:10],
+        "age": rng.choice(ages),
+        "gender": rng.choice(genders),
+        "email": f"bench-{run_id}-{i}@bench.example",
+        "created_at": now,
+        "updated_at": now,
+    } for i in range(users)), batch_size, "users")
+    last_user_id = db.session.scalar(select(func.max(User.id)))
+
+    # 응답: 사용자마다 (answers / users) 개 질문을 골라 질문당 선택지 1개씩
+    def answer_rows():
+        span = timedelta(days=days).total_seconds()
+        question_pool = list(choices_by_question)
+        remaining = answers
+        user_id = first_user_id
+        while remaining > 0:
+            count = min(remaining, len(question_pool), max(1, round(answers / max(1, users))))
+            for question_id in rng.sample(question_pool, count):
+                created_at = now - timedelta(seconds=rng.random() * span)
+                yield {
+                    "user_id": user_id,
+                    "choice_id": rng.choice(choices_by_question[question_id]),
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                }
+            remaining -= count
+            user_id = first_user_id if user_id >= last_user_id else user_id + 1
+
+    _insert(Answer, answer_rows(), batch_size, "answers")
+
+    started = time.perf_counter()
+    rebuild_tallies()
+    compact_answer_timeseries(safety_lag=0)
+    invalidate_catalog()
+    print(f"집계 테이블/롤업 재계산 ({time.perf_counter() - started:.1f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="벤치마크용 데이터 생성")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--questions", type=int)
+    parser.add_argument("--choices", type=int)
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--answers", type=int)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--days", type=int, default=30, help="응답 시각을 분포시킬 최근 일 수")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--database-uri", help="config.py 대신 사용할 DB (예: sqlite:///bench.sqlite)")
+    parser.add_argument("--create-schema", action="store_true", help="테이블이 없으면 모델 기준으로 생성 (로컬 SQLite 용)")
+    args = parser.parse_args()
+
+    scale = dict(SCALES[args.scale])
+    for key in scale:
+        if getattr(args, key) is not None:
+            scale[key] = getattr(args, key)
+
+    application = make_app(args.database_uri)
+    with application.app_context():
+        if args.create_schema:
+            from config import db
+
+            db.create_all()
+        print(f"데이터 생성: {scale}")
+        seed(seed_value=args.seed, days=args.days, batch_size=args.batch_size, **scale)
+
+
+if __name__ == "__main__":
+    main()
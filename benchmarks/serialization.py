@@ -0,0 +1,90 @@
+"""
+선택지 목록 직렬화 micro-benchmark
+
+    python -m benchmarks.serialization --rows 5000 --repeat 20
+
+같은 선택지 N 개를 메모리 SQLite 에 넣고 아래 세 방식으로 JSON 응답 본문을 만드는 시간을 비교한다.
+  - orm_to_dict_json : ORM 객체 조회 → to_dict() → Flask 기본 jsonify 와 같은 json.dumps (기존 방식)
+  - projection_json  : 컬럼 튜플 조회 → rows_as_dicts → 표준 json (orjson 이 없을 때)
+  - projection_dumps : 컬럼 튜플 조회 → rows_as_dicts → app.serialization.dumps (orjson)
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+
+def main():
+    parser = argparse.ArgumentParser(description="선택지 목록 직렬화 micro-benchmark")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    from app.catalog import CHOICE_COLUMNS
+    from app.models import KST, Choices
+    from app.serialization import _default, dumps, orjson, rows_as_dicts
+    from config import db
+
+    engine = create_engine("sqlite://")
+    db.metadata.create_all(engine)
+    now = datetime.now(tz=KST)
+    with engine.begin() as connection:
+        connection.execute(insert(Choices), [
+            {
+                "content": f"선택지 {i}",
+                "sqe": i % 10 + 1,
+                "is_active": True,
+                "question_id": None,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for i in range(args.rows)
+        ])
+
+    def orm_to_dict_json():
+        with Session(engine) as session:
+            choices = session.scalars(select(Choices)).all()
+            data = {"choices": [choice.to_dict() for choice in choices]}
+        # Flask DefaultJSONProvider 기본값 (sort_keys=True, ensure_ascii=True)
+        return json.dumps(data, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+    def projection_json():
+        with Session(engine) as session:
+            data = {"choices": rows_as_dicts(session.execute(select(*CHOICE_COLUMNS)))}
+        return json.dumps(data, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    def projection_dumps():
+        with Session(engine) as session:
+            data = {"choices": rows_as_dicts(session.execute(select(*CHOICE_COLUMNS)))}
+        return dumps(data)
+
+    cases = [("orm_to_dict_json", orm_to_dict_json), ("projection_json", projection_json)]
+    if orjson is not None:
+        cases.append(("projection_dumps", projection_dumps))
+
+    # 세 방식이 같은 내용을 만드는지 먼저 확인
+    expected = json.loads(orm_to_dict_json())
+    for name, case in cases:
+        assert json.loads(case()) == expected, f"{name} 결과가 기존 to_dict() 결과와 다릅니다."
+
+    results = {}
+    for name, case in cases:
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            case()
+            timings.append(time.perf_counter() - started)
+        results[name] = statistics.median(timings)
+
+    baseline = results["orm_to_dict_json"]
+    print(f"rows={args.rows} repeat={args.repeat} orjson={'yes' if orjson else 'no'}")
+    for name, seconds in results.items():
+        print(f"{name:18} {seconds * 1000:8.2f} ms  x{baseline / seconds:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -25,7 +25,15 @@ else
 fi
 
 # Gunicorn 실행
-gunicorn --workers 4 --bind 127.0.0.1:8000 wsgi:app --daemon --log-file gunicorn.log
+# SERVER_MODE=asgi 이면 uvicorn 워커로 asgi:app 실행 (질문/선택지/통계 조회를 async 엔진으로 처리)
+# 기본값은 /stats/stream(SSE) 연결이 워커 전체를 붙잡지 않도록 워커마다 스레드를 여러 개 사용 (gthread)
+# 스트림 연결 수는 이 스레드 수의 1/4 이하로 제한된다 (config.py STATS_STREAM_MAX_CLIENTS / WORKER_THREADS)
+export GUNICORN_THREADS=${GUNICORN_THREADS:-32}
+if [ "$SERVER_MODE" = "asgi" ]; then
+    gunicorn --workers 4 --worker-class uvicorn.workers.UvicornWorker --bind 127.0.0.1:8000 asgi:app --daemon --log-file gunicorn.log
+else
+    gunicorn --workers 4 --worker-class gthread --threads "$GUNICORN_THREADS" --bind 127.0.0.1:8000 wsgi:app --daemon --log-file gunicorn.log
+fi
 
 if [ $? -eq 0 ]; then
     echo "Flask app launched successfully with Gunicorn."
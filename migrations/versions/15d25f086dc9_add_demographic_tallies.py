@@ -0,0 +1,63 @@
+"""add demographic tallies
+
+Revision ID: 15d25f086dc9
+Revises: 26ec6a497515
+Create Date: 2026-10-18 18:10:37.660912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '15d25f086dc9'
+down_revision = '26ec6a497515'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('choice_demographic_tallies',
+    sa.Column('choice_id', sa.Integer(), nullable=False),
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('age', sa.Enum('teen', 'twenty', 'thirty', 'forty', 'fifty', name='agestatus'), nullable=False),
+    sa.Column('gender', sa.Enum('male', 'female', name='genderstatus'), nullable=False),
+    sa.Column('answer_count', sa.BigInteger(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['choice_id'], ['choices.id'], ),
+    sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('choice_id', 'age', 'gender')
+    )
+    op.create_index('ix_choice_demographic_tallies_question_id_choice_id', 'choice_demographic_tallies', ['question_id', 'choice_id'], unique=False)
+    op.create_table('user_demographic_tallies',
+    sa.Column('age', sa.Enum('teen', 'twenty', 'thirty', 'forty', 'fifty', name='agestatus'), nullable=False),
+    sa.Column('gender', sa.Enum('male', 'female', name='genderstatus'), nullable=False),
+    sa.Column('user_count', sa.BigInteger(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('age', 'gender')
+    )
+    # 기존 데이터로 초기 집계를 채운다 (이후엔 submit/signup 시 증분 갱신)
+    op.execute(
+        "INSERT INTO choice_demographic_tallies (choice_id, question_id, age, gender, answer_count, created_at, updated_at) "
+        "SELECT c.id, c.question_id, u.age, u.gender, COUNT(a.id), CURRENT_TIMESTAMP, CURRENT_TIMESTAMP "
+        "FROM answers a JOIN choices c ON c.id = a.choice_id JOIN users u ON u.id = a.user_id "
+        "WHERE c.question_id IS NOT NULL "
+        "GROUP BY c.id, c.question_id, u.age, u.gender"
+    )
+    op.execute(
+        "INSERT INTO user_demographic_tallies (age, gender, user_count, created_at, updated_at) "
+        "SELECT age, gender, COUNT(id), CURRENT_TIMESTAMP, CURRENT_TIMESTAMP "
+        "FROM users GROUP BY age, gender"
+    )
+
+
+def downgrade():
+    op.drop_table('user_demographic_tallies')
+    op.drop_index('ix_choice_demographic_tallies_question_id_choice_id', table_name='choice_demographic_tallies')
+    op.drop_table('choice_demographic_tallies')
@@ -0,0 +1,28 @@
+"""add image sha256
+
+Revision ID: 1d40dacc8eac
+Revises: f15fe4d0ba4d
+Create Date: 2026-10-18 16:21:09.774105
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1d40dacc8eac'
+down_revision = 'f15fe4d0ba4d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('images', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sha256', sa.String(length=64), nullable=True))
+        batch_op.create_unique_constraint('uq_images_sha256', ['sha256'])
+
+
+def downgrade():
+    with op.batch_alter_table('images', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_images_sha256', type_='unique')
+        batch_op.drop_column('sha256')
@@ -0,0 +1,35 @@
+"""add image variants
+
+Revision ID: 26ec6a497515
+Revises: 1d40dacc8eac
+Create Date: 2026-10-18 17:05:52.118430
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '26ec6a497515'
+down_revision = '1d40dacc8eac'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('image_variants',
+    sa.Column('image_id', sa.Integer(), nullable=False),
+    sa.Column('width', sa.Integer(), nullable=False),
+    sa.Column('format', sa.String(length=10), nullable=False),
+    sa.Column('url', sa.String(length=255), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['image_id'], ['images.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('image_id', 'width', 'format')
+    )
+
+
+def downgrade():
+    op.drop_table('image_variants')
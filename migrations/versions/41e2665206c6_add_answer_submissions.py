@@ -0,0 +1,34 @@
+"""add answer submissions
+
+Revision ID: 41e2665206c6
+Revises: f8a7ea37ce4b
+Create Date: 2026-10-18 13:40:07.915362
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '41e2665206c6'
+down_revision = 'f8a7ea37ce4b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('answer_submissions',
+    sa.Column('idempotency_key', sa.String(length=64), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('answer_count', sa.Integer(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('idempotency_key')
+    )
+
+
+def downgrade():
+    op.drop_table('answer_submissions')
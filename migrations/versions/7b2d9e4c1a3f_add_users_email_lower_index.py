@@ -0,0 +1,25 @@
+"""add users email lower index
+
+Revision ID: 7b2d9e4c1a3f
+Revises: c5c432b0690b
+Create Date: 2026-10-18 23:41:07.512384
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2d9e4c1a3f'
+down_revision = 'c5c432b0690b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 일괄 가입 이메일 중복 조회: lower(email) IN (...) (MySQL 8.0.13+ 함수 인덱스)
+    op.create_index('ix_users_email_lower', 'users', [sa.func.lower(sa.column('email'))], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_users_email_lower', table_name='users')
@@ -0,0 +1,50 @@
+"""add answer time rollups
+
+Revision ID: c5c432b0690b
+Revises: 15d25f086dc9
+Create Date: 2026-10-18 19:24:15.038551
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5c432b0690b'
+down_revision = '15d25f086dc9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('answer_time_rollups',
+    sa.Column('granularity', sa.String(length=4), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('choice_id', sa.Integer(), nullable=False),
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('answer_count', sa.BigInteger(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['choice_id'], ['choices.id'], ),
+    sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('granularity', 'bucket_start', 'choice_id')
+    )
+    op.create_index('ix_answer_time_rollups_question_id_granularity_bucket_start', 'answer_time_rollups', ['question_id', 'granularity', 'bucket_start'], unique=False)
+    # 롤업은 watermark 0 부터 백그라운드 작업(flask stats compact-timeseries)이 채운다
+    op.create_table('rollup_watermarks',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('last_answer_id', sa.BigInteger(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('rollup_watermarks')
+    op.drop_index('ix_answer_time_rollups_question_id_granularity_bucket_start', table_name='answer_time_rollups')
+    op.drop_table('answer_time_rollups')
@@ -0,0 +1,63 @@
+"""add hot query indexes
+
+Revision ID: f15fe4d0ba4d
+Revises: 41e2665206c6
+Create Date: 2026-10-18 15:02:44.301257
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f15fe4d0ba4d'
+down_revision = '41e2665206c6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # get_main_image: type = 'main' ORDER BY id DESC LIMIT 1
+    op.create_index('ix_images_type_id', 'images', ['type', 'id'], unique=False)
+    # get_question_by_sqe: sqe = ? AND is_active = 1
+    op.create_index('ix_questions_sqe_is_active', 'questions', ['sqe', 'is_active'], unique=False)
+    # get_choices_by_question / 설문 전체 조회: question_id = ? AND is_active = 1 ORDER BY sqe
+    op.create_index('ix_choices_question_id_is_active_sqe', 'choices', ['question_id', 'is_active', 'sqe'], unique=False)
+    # 통계 재집계(answers ⨝ choices) / 사용자별 응답 조회
+    op.create_index('ix_answers_choice_id', 'answers', ['choice_id'], unique=False)
+    op.create_index('ix_answers_user_id_choice_id', 'answers', ['user_id', 'choice_id'], unique=False)
+    # /stats 조회: 집계 테이블을 인덱스만으로 (question_id, choice_id) 순서대로 읽는다
+    op.create_index('ix_choice_tallies_question_id_choice_id_answer_count', 'choice_tallies', ['question_id', 'choice_id', 'answer_count'], unique=False)
+
+
+def _drop_fk_covering_index(index_name, table_name, leftmost_column):
+    """
+    MySQL 은 외래 키가 사용하는 (맨 앞 컬럼이 같은) 인덱스를 지울 수 없고, upgrade 에서 새 인덱스를 만들 때
+    외래 키용으로 자동 생성됐던 인덱스도 지워졌으므로, 외래 키를 잠시 지웠다가 다시 만든다. (이때 MySQL 이 인덱스를 다시 만듦)
+    """
+    bind = op.get_bind()
+    if bind.dialect.name != 'mysql':
+        op.drop_index(index_name, table_name=table_name)
+        return
+
+    foreign_keys = [
+        fk for fk in sa.inspect(bind).get_foreign_keys(table_name)
+        if fk['constrained_columns'][0] == leftmost_column
+    ]
+    for fk in foreign_keys:
+        op.drop_constraint(fk['name'], table_name, type_='foreignkey')
+    op.drop_index(index_name, table_name=table_name)
+    for fk in foreign_keys:
+        op.create_foreign_key(
+            fk['name'], table_name, fk['referred_table'],
+            fk['constrained_columns'], fk['referred_columns'], **fk.get('options', {}),
+        )
+
+
+def downgrade():
+    _drop_fk_covering_index('ix_choice_tallies_question_id_choice_id_answer_count', 'choice_tallies', 'question_id')
+    _drop_fk_covering_index('ix_answers_user_id_choice_id', 'answers', 'user_id')
+    _drop_fk_covering_index('ix_answers_choice_id', 'answers', 'choice_id')
+    _drop_fk_covering_index('ix_choices_question_id_is_active_sqe', 'choices', 'question_id')
+    op.drop_index('ix_questions_sqe_is_active', table_name='questions')
+    op.drop_index('ix_images_type_id', table_name='images')
@@ -0,0 +1,43 @@
+"""add choice tallies
+
+Revision ID: f8a7ea37ce4b
+Revises: 463f8b9fee51
+Create Date: 2026-10-18 10:12:31.482913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f8a7ea37ce4b'
+down_revision = '463f8b9fee51'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('choice_tallies',
+    sa.Column('choice_id', sa.Integer(), nullable=False),
+    sa.Column('question_id', sa.Integer(), nullable=False),
+    sa.Column('answer_count', sa.BigInteger(), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['choice_id'], ['choices.id'], ),
+    sa.ForeignKeyConstraint(['question_id'], ['questions.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('choice_id')
+    )
+    # 기존 answers 데이터로 초기 집계를 채운다 (이후엔 submit 시 증분 갱신)
+    op.execute(
+        "INSERT INTO choice_tallies (choice_id, question_id, answer_count, created_at, updated_at) "
+        "SELECT c.id, c.question_id, COUNT(a.id), CURRENT_TIMESTAMP, CURRENT_TIMESTAMP "
+        "FROM choices c LEFT JOIN answers a ON a.choice_id = c.id "
+        "WHERE c.question_id IS NOT NULL "
+        "GROUP BY c.id, c.question_id"
+    )
+
+
+def downgrade():
+    op.drop_table('choice_tallies')
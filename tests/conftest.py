@@ -0,0 +1,34 @@
+import os
+
+import pytest
+from flask_migrate import upgrade
+
+from app import create_app
+from config import Config, db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """마이그레이션을 끝까지 적용한 임시 SQLite DB 를 쓰는 앱 (상태 파일도 임시 폴더에 기록)"""
+    monkeypatch.setattr(Config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'form.sqlite'}")
+    monkeypatch.setattr(Config, "STATE_DIR", str(tmp_path / "var"))
+    monkeypatch.setattr(Config, "ANSWER_LOG_DIR", str(tmp_path / "var" / "answer_log"))
+    monkeypatch.setattr(Config, "EXPORT_DIR", str(tmp_path / "var" / "exports"))
+    monkeypatch.setattr(Config, "UPLOAD_FOLDER", str(tmp_path / "uploads"))
+
+    application = create_app()
+    application.config.update(TESTING=True)
+    with application.app_context():
+        upgrade(directory=MIGRATIONS_DIR)
+    yield application
+    with application.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
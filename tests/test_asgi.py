@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from app.catalog import invalidate_catalog
+from app.query_audit import query_budget
+
+pytest.importorskip("asgiref")
+pytest.importorskip("aiosqlite")
+
+
+@pytest.fixture
+def asgi_app(app, client):
+    from app.asgi import create_asgi_app
+
+    client.post("/image", json={"url": "http://localhost/main.png", "type": "main"})
+    client.post("/questions/question", json={"title": "q1", "sqe": 1, "image_id": 1})
+    for sqe in (1, 2):
+        client.post("/choices", json={"content": f"c{sqe}", "sqe": sqe, "question_id": 1})
+    with app.app_context():
+        invalidate_catalog()
+
+    asgi = create_asgi_app(app)
+    yield asgi
+    asyncio.run(asgi.engine.dispose())
+
+
+def call(asgi, path, headers=()):
+    """ASGI 앱에 GET 요청 하나를 보내고 (상태 코드, 헤더, 본문) 반환"""
+    scope = {
+        "type": "http", "method": "GET", "path": path, "query_string": b"",
+        "headers": [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi(scope, receive, send))
+    response_headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in messages[0]["headers"]}
+    return messages[0]["status"], response_headers, messages[1]["body"]
+
+
+def test_cache_miss_reads_through_async_engine(asgi_app):
+    """캐시가 비어 있으면 async 엔진으로 읽고 (query_audit 에 집계됨), 두 번째 요청은 캐시에서 응답"""
+    with query_budget() as audit:
+        status, headers, body = call(asgi_app, "/choices/question/1")
+    assert status == 200
+    assert audit.count == 1
+    assert b'"c2"' in body
+    assert headers["etag"].startswith('W/"')
+    assert "max-age=" in headers["cache-control"]
+
+    with query_budget() as audit:
+        assert call(asgi_app, "/choices/question/1")[0] == 200
+    assert audit.count == 0
+
+
+def test_matching_etag_returns_304(asgi_app):
+    _, headers, _ = call(asgi_app, "/questions/count")
+    status, not_modified_headers, body = call(asgi_app, "/questions/count", [("if-none-match", headers["etag"])])
+    assert status == 304
+    assert body == b""
+    assert not_modified_headers["etag"] == headers["etag"]
+    assert not_modified_headers["vary"] == "Accept-Encoding"
@@ -0,0 +1,53 @@
+import time
+
+import pytest
+
+HEADERS = {"Authorization": "Bearer export-token"}
+
+
+@pytest.fixture
+def export_client(client):
+    client.application.config.update(EXPORT_API_TOKEN="export-token", EXPORT_SAFETY_LAG=0)
+    client.post("/image", json={"url": "http://localhost/main.png", "type": "main"})
+    client.post("/questions/question", json={"title": "q1", "sqe": 1, "image_id": 1})
+    client.post("/choices", json={"content": "c1", "sqe": 1, "question_id": 1})
+    client.post("/signup", json={"name": "kim", "age": "teen", "gender": "male", "email": "kim@example.com"})
+    assert client.post("/submit", json=[{"user_id": 1, "choice_id": 1}]).status_code == 201
+    return client
+
+
+def wait_for_job(client, status_url, timeout=5):
+    deadline = time.time() + timeout
+    while True:
+        job = client.get(status_url, headers=HEADERS).get_json()
+        if job["status"] != "running" or time.time() > deadline:
+            return job
+        time.sleep(0.05)
+
+
+def test_export_runs_as_background_job(export_client):
+    """POST 는 바로 202 + job_id 를 반환하고, 작업이 끝나면 결과 파일을 받을 수 있다"""
+    response = export_client.post("/stats/export/answers?format=csv", headers=HEADERS)
+    assert response.status_code == 202
+
+    job = wait_for_job(export_client, response.get_json()["status_url"])
+    assert job["status"] == "done"
+    assert job["rows"] == 1
+
+    download = export_client.get(job["file_url"], headers=HEADERS)
+    assert download.status_code == 200
+    assert download.headers["X-Export-Last-Answer-Id"] == str(job["last_answer_id"])
+    download.close()
+
+    # 이어서 요청하면 새 응답이 없으므로 empty, 파일은 없다
+    response = export_client.post(
+        f"/stats/export/answers?format=csv&after_id={job['last_answer_id']}", headers=HEADERS
+    )
+    job = wait_for_job(export_client, response.get_json()["status_url"])
+    assert job["status"] == "empty"
+    assert export_client.get(f"{job['status_url']}/file", headers=HEADERS).status_code == 409
+
+
+def test_export_requires_token(export_client):
+    assert export_client.post("/stats/export/answers").status_code == 401
+    assert export_client.get("/stats/export/answers/" + "0" * 32, headers=HEADERS).status_code == 404
@@ -0,0 +1,38 @@
+import pytest
+
+from app.catalog import invalidate_catalog
+from app.progress import get_user_progress
+from app.query_audit import query_budget
+from config import Config
+
+
+@pytest.fixture
+def seeded_client(client):
+    """질문 2개(선택지 3개씩), 사용자 2명, 응답 1건을 만들고 캐시를 채워 둔다"""
+    client.post("/image", json={"url": "http://localhost/main.png", "type": "main"})
+    for question in (1, 2):
+        client.post("/questions/question", json={"title": f"q{question}", "sqe": question, "image_id": 1})
+        for sqe in (1, 2, 3):
+            client.post("/choices", json={"content": f"c{question}{sqe}", "sqe": sqe, "question_id": question})
+    client.post("/signup", json={"name": "kim", "age": "teen", "gender": "male", "email": "kim@example.com"})
+    client.post("/signup", json={"name": "lee", "age": "twenty", "gender": "female", "email": "lee@example.com"})
+    assert client.post("/submit", json=[{"user_id": 1, "choice_id": 1}]).status_code == 201
+    client.get("/users/1/answers")
+    client.get("/questions/all")
+    return client
+
+
+@pytest.mark.parametrize("endpoint", sorted(Config.QUERY_BUDGETS))
+def test_endpoint_within_query_budget(app, seeded_client, endpoint):
+    """QUERY_BUDGETS 의 엔드포인트를 워커 캐시를 모두 비운 상태(콜드 캐시)로 호출해서 SQL 수와 N+1 을 검사"""
+    rule = next(rule for rule in app.url_map.iter_rules() if rule.endpoint == endpoint and "GET" in rule.methods)
+    path = rule.build({name: 1 for name in rule.arguments}, append_unknown=False)[1]
+    with app.app_context():
+        invalidate_catalog()
+        get_user_progress().clear()
+
+    with query_budget(Config.QUERY_BUDGETS[endpoint], app.config["QUERY_AUDIT_REPEAT_THRESHOLD"]) as audit:
+        response = seeded_client.get(path)
+
+    assert response.status_code == 200
+    assert audit.count > 0, "캐시를 비웠는데 SQL 이 실행되지 않았습니다."
@@ -0,0 +1,12 @@
+from app.query_plans import HOT_QUERIES, check_query_plans
+from config import db
+
+
+def test_hot_queries_use_indexes(app):
+    """flask check query-plans 와 같은 검사를 마이그레이션한 DB 에서 실행 (인덱스가 빠지면 실패)"""
+    with app.app_context(), db.engine.connect() as connection:
+        results = check_query_plans(connection)
+
+    assert [name for name, _, _ in results] == [name for name, _, _ in HOT_QUERIES]
+    failed = {name: details for name, details, ok in results if not ok}
+    assert not failed, f"전체 스캔으로 실행되는 쿼리: {failed}"